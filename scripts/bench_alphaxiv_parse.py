@@ -0,0 +1,38 @@
+"""Micro-benchmark AlphaXiv explore-page parsing backends.
+
+Parses a saved explore.html (the test fixture by default) repeatedly with
+the lxml and BeautifulSoup backends and reports time per page.
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+from pathlib import Path
+
+from src.alphaxiv import _parse_trending_html
+
+DEFAULT_FIXTURE = Path(__file__).parent.parent / "tests" / "fixtures" / "alphaxiv_explore.html"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--html", default=str(DEFAULT_FIXTURE))
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--limit", type=int, default=100)
+    args = parser.parse_args()
+
+    html = Path(args.html).read_text(encoding="utf-8")
+    timings = {}
+    for backend in ("bs4", "lxml"):
+        entries = _parse_trending_html(html, limit=args.limit, backend=backend)
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            _parse_trending_html(html, limit=args.limit, backend=backend)
+        timings[backend] = (time.perf_counter() - start) / args.repeat * 1000
+        print(f"{backend:5s}: {timings[backend]:7.2f} ms/page ({len(entries)} entries, {len(html) / 1024:.0f} KiB)")
+    print(f"speedup: {timings['bs4'] / timings['lxml']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
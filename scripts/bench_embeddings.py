@@ -0,0 +1,111 @@
+"""Benchmark token-budget embedding batching against a plain model.encode call.
+
+Builds a synthetic story corpus with the length mix we see in practice
+(short titles, long Reddit selftexts, arXiv abstracts) and reports
+throughput for both paths plus the worst cosine deviation between them.
+
+With --onnx, compares the int8 ONNX backend against fp32 torch instead:
+throughput, single-query latency and a cosine parity check that fails
+below ONNX_MIN_COSINE.
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import statistics
+import sys
+import time
+
+import numpy as np
+
+from src.embeddings import ONNX_MIN_COSINE, _encode_local, _get_model
+
+WORDS = (
+    "model weights inference token context attention layer training dataset benchmark "
+    "agent reasoning latency quantized open release paper arxiv gpu cluster scaling "
+    "alignment eval sparse mixture expert distillation compute memory throughput"
+).split()
+
+
+def build_corpus(count: int, seed: int = 7) -> list[str]:
+    rng = random.Random(seed)
+
+    def words(low: int, high: int) -> str:
+        return " ".join(rng.choice(WORDS) for _ in range(rng.randint(low, high)))
+
+    corpus = []
+    for _ in range(count):
+        roll = rng.random()
+        if roll < 0.6:
+            corpus.append(words(6, 18))
+        elif roll < 0.85:
+            corpus.append(words(80, 900))
+        else:
+            corpus.append(words(150, 260))
+    return corpus
+
+
+def _timed_encode(corpus: list[str], backend: str) -> tuple[np.ndarray, float, list[float]]:
+    _encode_local(corpus[:8], backend=backend)
+    start = time.perf_counter()
+    vectors = np.asarray(_encode_local(corpus, backend=backend), dtype=np.float32)
+    elapsed = time.perf_counter() - start
+
+    latencies = []
+    for text in corpus[:50]:
+        start = time.perf_counter()
+        _encode_local([text], backend=backend)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return vectors, elapsed, latencies
+
+
+def compare_onnx(corpus: list[str]) -> int:
+    results = {backend: _timed_encode(corpus, backend) for backend in ("torch", "onnx")}
+    for backend, (_, elapsed, latencies) in results.items():
+        p95 = statistics.quantiles(latencies, n=20)[-1]
+        print(
+            f"{backend:5s}: {len(corpus) / elapsed:.1f} texts/s, "
+            f"single-query p50 {statistics.median(latencies):.1f} ms, p95 {p95:.1f} ms"
+        )
+
+    cosine = np.sum(results["torch"][0] * results["onnx"][0], axis=1)
+    print(f"cosine vs fp32: min {cosine.min():.4f}, mean {cosine.mean():.4f} (tolerance {ONNX_MIN_COSINE})")
+    if cosine.min() < ONNX_MIN_COSINE:
+        print("FAIL: int8 ONNX vectors drift past tolerance")
+        return 1
+    return 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--count", type=int, default=500)
+    parser.add_argument("--batch-size", type=int, default=32, help="Fixed batch size for the baseline")
+    parser.add_argument("--onnx", action="store_true", help="Compare int8 ONNX against fp32 torch")
+    args = parser.parse_args()
+
+    corpus = build_corpus(args.count)
+    if args.onnx:
+        sys.exit(compare_onnx(corpus))
+
+    model = _get_model("torch")
+    _encode_local(corpus[:8], backend="torch")
+
+    start = time.perf_counter()
+    baseline = model.encode(corpus, batch_size=args.batch_size, normalize_embeddings=True)
+    baseline_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    scheduled = np.asarray(_encode_local(corpus, backend="torch"), dtype=np.float32)
+    scheduled_s = time.perf_counter() - start
+
+    cosine = np.sum(baseline * scheduled, axis=1)
+    print(f"texts: {len(corpus)}")
+    print(f"baseline encode:  {baseline_s:.2f}s ({len(corpus) / baseline_s:.1f} texts/s)")
+    print(f"token-budget:     {scheduled_s:.2f}s ({len(corpus) / scheduled_s:.1f} texts/s)")
+    print(f"speedup:          {baseline_s / scheduled_s:.2f}x")
+    print(f"min cosine vs baseline: {cosine.min():.6f}")
+
+
+if __name__ == "__main__":
+    main()
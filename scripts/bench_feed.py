@@ -0,0 +1,81 @@
+"""Benchmark the incremental RSS feed against full rebuilds for a long-running show.
+
+Seeds an item store with `--years` of daily episodes, builds the feed once
+from scratch, then times `--days` further daily publishes, each of which
+renders one item and splices it into the cached feed. A full rebuild (as
+the old approach would do every day) is timed again at the end for
+comparison.
+"""
+
+from __future__ import annotations
+
+import argparse
+import datetime as dt
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from src.feed import ARCHIVE_PAGE_SIZE, MAX_FEED_ITEMS, FeedBuilder, FeedItem, render_item
+
+START = dt.date(2020, 1, 1)
+
+
+def make_item(day: int) -> FeedItem:
+    date = START + dt.timedelta(days=day)
+    titles = [f"Story {idx} about model {day % 97} and the frontier of scaling" for idx in range(1, 6)]
+    return FeedItem(
+        guid=f"dtfftl-{date.isoformat()}",
+        title=f"DTF:FTL — {date.isoformat()}",
+        description="Today: " + "; ".join(titles),
+        pub_date=dt.datetime.combine(date, dt.time(), dt.timezone.utc).isoformat(),
+        url=f"https://dtfftl.example.com/episodes/{date.isoformat()}/episode.mp3",
+        length=40_000_000 + day,
+        duration=2400.0,
+        chapters_url=f"https://dtfftl.example.com/episodes/{date.isoformat()}/chapters.json",
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--years", type=float, default=5.0)
+    parser.add_argument("--days", type=int, default=30, help="Daily publishes to time")
+    parser.add_argument("--max-items", type=int, default=MAX_FEED_ITEMS)
+    parser.add_argument("--page-size", type=int, default=ARCHIVE_PAGE_SIZE)
+    args = parser.parse_args()
+
+    history = int(args.years * 365)
+    with tempfile.TemporaryDirectory() as tmp:
+        builder = FeedBuilder(Path(tmp) / "feed", max_items=args.max_items, page_size=args.page_size)
+        for day in range(history):
+            item = make_item(day)
+            builder.store.append(item, render_item(item))
+
+        started = time.perf_counter()
+        builder.rebuild()
+        initial = time.perf_counter() - started
+
+        timings = []
+        for day in range(history, history + args.days):
+            started = time.perf_counter()
+            builder.publish(make_item(day))
+            timings.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        builder.rebuild()
+        rebuild = time.perf_counter() - started
+
+        pages = len(list((builder.feed_dir / "archive").glob("*.xml")))
+        print(f"History:        {history + args.days} episodes ({args.years:g} years + {args.days} days)")
+        print(f"Item store:     {builder.store.path.stat().st_size / 1e6:.1f} MB")
+        print(f"feed.xml:       {builder.feed_path.stat().st_size / 1e3:.0f} KB, {pages} archive pages")
+        print(f"Initial build:  {initial * 1000:.1f} ms")
+        print(
+            f"Daily publish:  median {statistics.median(timings) * 1000:.2f} ms, "
+            f"max {max(timings) * 1000:.2f} ms (over {len(timings)} days)"
+        )
+        print(f"Full rebuild:   {rebuild * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
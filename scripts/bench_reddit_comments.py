@@ -0,0 +1,204 @@
+"""Benchmark the bounded top-K comment fetch against the default comment page.
+
+Replays recorded Reddit threads through PRAW with a counting transport
+adapter, so the request counts and bytes are what PRAW actually asks for.
+Record a thread as PRAW's default fetch sees it (`limit=2048`,
+`sort=confidence`, `more` stubs included) with
+
+    curl -A "dtfftl-bench/0.1" \
+        "https://www.reddit.com/comments/<id>.json?limit=2048&sort=confidence&raw_json=1" > thread.json
+
+and pass one or more recordings. Three fetches are compared per thread:
+
+- default:  the old path, PRAW's default page plus replace_more(limit=0)
+- top:      `_summarize_comments`, one `sort=top&limit=N` page
+- expanded: replace_more(limit=None), i.e. materializing the whole forest
+
+Both summary paths are a single request; the bounded fetch saves bytes and
+comment objects, not round trips. Only `expanded` makes further requests,
+one per MoreComments stub, which is the cost neither summary path pays.
+The top page is derived from the recording (top-level comments by score,
+first N depth-first) unless --top-fixture supplies a recording of
+`?sort=top&limit=N`. MoreComments requests are answered with empty results.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+from collections import Counter
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+
+import requests
+from requests.adapters import BaseAdapter
+from requests.structures import CaseInsensitiveDict
+
+from src.reddit import COMMENT_CANDIDATES_PER_SLOT, _summarize_comments
+
+
+def _trim(children: list, budget: list[int]) -> list:
+    """Copy comments depth-first until the shared budget runs out, dropping `more` stubs."""
+    trimmed = []
+    for child in children:
+        if budget[0] <= 0:
+            break
+        if child.get("kind") != "t1":
+            continue
+        budget[0] -= 1
+        data = dict(child["data"])
+        replies = data.get("replies")
+        data["replies"] = ""
+        if replies:
+            nested = _trim(replies["data"]["children"], budget)
+            if nested:
+                data["replies"] = {"kind": "Listing", "data": {"children": nested}}
+        trimmed.append({"kind": "t1", "data": data})
+    return trimmed
+
+
+def top_sorted_page(thread: list, limit: int) -> list:
+    """Approximate the `sort=top&limit=N` response: first N comments depth-first in score order."""
+    top_level = sorted(
+        thread[1]["data"]["children"],
+        key=lambda child: child.get("data", {}).get("score", 0),
+        reverse=True,
+    )
+    return [thread[0], {"kind": "Listing", "data": {"children": _trim(top_level, [limit])}}]
+
+
+def count_comments(children: list) -> int:
+    total = 0
+    for child in children:
+        if child.get("kind") != "t1":
+            continue
+        total += 1
+        replies = child["data"].get("replies")
+        if replies:
+            total += count_comments(replies["data"]["children"])
+    return total
+
+
+def _find_comment(children: list, comment_id: str) -> dict | None:
+    for child in children:
+        if child.get("kind") != "t1":
+            continue
+        if child["data"]["id"] == comment_id:
+            return child
+        replies = child["data"].get("replies")
+        found = _find_comment(replies["data"]["children"], comment_id) if replies else None
+        if found is not None:
+            return found
+    return None
+
+
+class ReplayAdapter(BaseAdapter):
+    """Serves one recorded thread to PRAW and counts requests and response bytes per endpoint."""
+
+    def __init__(self, thread: list, top_page: list | None = None) -> None:
+        super().__init__()
+        self.thread = thread
+        self.top_page = top_page
+        self.requests: Counter = Counter()
+        self.bytes: Counter = Counter()
+
+    def _payload(self, method: str, path: str, query: dict) -> tuple[str, object]:
+        if path.endswith("/api/v1/access_token"):
+            return "token", {"access_token": "replay", "token_type": "bearer", "expires_in": 3600, "scope": "*"}
+        if path.startswith("/api/morechildren"):
+            return "morechildren", {"json": {"errors": [], "data": {"things": []}}}
+        parts = path.strip("/").split("/")
+        if parts[0] == "comments" and len(parts) > 2:
+            # "Continue this thread": the parent comment, as already recorded, without more replies.
+            found = _find_comment(self.thread[1]["data"]["children"], parts[-1])
+            children = [{"kind": "t1", "data": {**found["data"], "replies": ""}}] if found else []
+            return "continue", [self.thread[0], {"kind": "Listing", "data": {"children": children}}]
+        if parts[0] == "comments":
+            if query.get("sort") == ["top"]:
+                return "comments", self.top_page or top_sorted_page(self.thread, int(query["limit"][0]))
+            return "comments", self.thread
+        raise ValueError(f"unexpected request {method} {path}")
+
+    def send(self, request, **kwargs):
+        url = urlsplit(request.url)
+        endpoint, payload = self._payload(request.method, url.path, parse_qs(url.query))
+        body = json.dumps(payload).encode("utf-8")
+        if endpoint != "token":
+            self.requests[endpoint] += 1
+            self.bytes[endpoint] += len(body)
+        response = requests.Response()
+        response.status_code = 200
+        response.headers = CaseInsensitiveDict({"content-type": "application/json; charset=UTF-8"})
+        response._content = body
+        response.encoding = "utf-8"
+        response.url = request.url
+        response.request = request
+        return response
+
+    def close(self) -> None:
+        pass
+
+
+def replay_reddit(adapter: ReplayAdapter):
+    import praw
+
+    session = requests.Session()
+    session.mount("https://", adapter)
+    return praw.Reddit(
+        client_id="replay", client_secret="replay", user_agent="dtfftl-bench/0.1",
+        requestor_kwargs={"session": session},
+    )
+
+
+def measure(thread: list, top_page: list | None, fetch) -> tuple[ReplayAdapter, int]:
+    adapter = ReplayAdapter(thread, top_page)
+    submission = replay_reddit(adapter).submission(id=thread[0]["data"]["children"][0]["data"]["id"])
+    return adapter, fetch(submission)
+
+
+def _default_page(submission) -> int:
+    submission.comments.replace_more(limit=0)
+    return len(submission.comments.list())
+
+
+def _expanded(submission) -> int:
+    submission.comments.replace_more(limit=None)
+    return len(submission.comments.list())
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("fixture", nargs="+", help="Recorded `<permalink>.json` of a thread's default page")
+    parser.add_argument("--top-fixture", help="Recorded `?sort=top&limit=N` page (single thread only)")
+    parser.add_argument("--max-comments", type=int, default=3)
+    args = parser.parse_args()
+    if args.top_fixture and len(args.fixture) > 1:
+        parser.error("--top-fixture needs exactly one thread fixture")
+
+    top_page = json.loads(Path(args.top_fixture).read_text(encoding="utf-8")) if args.top_fixture else None
+    limit = args.max_comments * COMMENT_CANDIDATES_PER_SLOT
+    for path in args.fixture:
+        thread = json.loads(Path(path).read_text(encoding="utf-8"))
+        runs = {
+            "default": measure(thread, top_page, _default_page),
+            f"top {limit}": measure(
+                thread, top_page,
+                lambda submission: (_summarize_comments(submission, args.max_comments), len(submission.comments.list()))[1],
+            ),
+            "expanded": measure(thread, top_page, _expanded),
+        }
+        print(f"{path} ({count_comments(thread[1]['data']['children'])} comments recorded):")
+        for name, (adapter, comments) in runs.items():
+            requests_made = sum(adapter.requests.values())
+            detail = ", ".join(f"{endpoint} {count}" for endpoint, count in sorted(adapter.requests.items()))
+            print(
+                f"  {name:<9}: {requests_made:3d} requests ({detail}), "
+                f"{sum(adapter.bytes.values()) / 1024:8.1f} KiB, {comments} comments materialized"
+            )
+        default_bytes = sum(runs["default"][0].bytes.values())
+        top_bytes = sum(runs[f"top {limit}"][0].bytes.values())
+        print(f"  top vs default: {100 * (1 - top_bytes / default_bytes):.1f}% fewer bytes, same request count")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Benchmark the streaming WAV stitcher on a synthetic hour-long episode.
+
+Segment WAVs are generated block by block (tones at the TTS server's
+24 kHz mono PCM16 by default) into a temp directory, then stitched with
+`stitch_wavs`. Reports wall time, throughput, realtime factor and peak
+Python heap during stitching (tracemalloc), which should stay at a few
+blocks rather than the size of the episode. `--mixed` writes every other
+segment as 48 kHz stereo so the resample/downmix path is measured too.
+"""
+
+from __future__ import annotations
+
+import argparse
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+
+from src.audio import WavStreamWriter, read_wav_info, stitch_wavs
+from src.audio_processing import DEFAULT_CROSSFADE, process_segments
+
+GEN_BLOCK_FRAMES = 1 << 16
+
+
+def write_segment(path: Path, seconds: float, sample_rate: int, channels: int, freq: float) -> None:
+    total = int(seconds * sample_rate)
+    with WavStreamWriter(path, sample_rate, channels) as writer:
+        for start in range(0, total, GEN_BLOCK_FRAMES):
+            t = np.arange(start, min(start + GEN_BLOCK_FRAMES, total)) / sample_rate
+            tone = (0.3 * np.sin(2 * np.pi * freq * t)).astype(np.float32)[:, None]
+            writer.write_samples(np.repeat(tone, channels, axis=1))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--minutes", type=float, default=60.0)
+    parser.add_argument("--segments", type=int, default=40)
+    parser.add_argument("--sample-rate", type=int, default=24000)
+    parser.add_argument("--silence", type=float, default=1.0)
+    parser.add_argument("--mixed", action="store_true", help="Alternate 48 kHz stereo segments")
+    parser.add_argument("--process", action="store_true", help="Also time loudness/trim processing and crossfades")
+    args = parser.parse_args()
+
+    seconds_each = args.minutes * 60 / args.segments
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        segments = []
+        for idx in range(args.segments):
+            mixed = args.mixed and idx % 2
+            path = root / f"{idx:02d}.wav"
+            write_segment(path, seconds_each, 48000 if mixed else args.sample_rate, 2 if mixed else 1, 220 + idx)
+            segments.append(path)
+        input_bytes = sum(path.stat().st_size for path in segments)
+
+        if args.process:
+            tracemalloc.start()
+            started = time.perf_counter()
+            segments, _ = process_segments(segments, root / "processed")
+            process_elapsed = time.perf_counter() - started
+            _, process_peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            print(f"Process time:  {process_elapsed:.2f}s, peak heap {process_peak / 1e6:.2f} MB")
+
+        tracemalloc.start()
+        started = time.perf_counter()
+        output = stitch_wavs(
+            segments,
+            root / "episode.wav",
+            silence_duration=args.silence,
+            crossfade=DEFAULT_CROSSFADE if args.process else 0.0,
+        )
+        elapsed = time.perf_counter() - started
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        info = read_wav_info(output)
+        print(f"Segments:      {args.segments} x {seconds_each:.0f}s{' (mixed formats)' if args.mixed else ''}")
+        print(f"Input:         {input_bytes / 1e6:.1f} MB")
+        print(f"Output:        {output.stat().st_size / 1e6:.1f} MB, {info.duration / 60:.1f} min")
+        print(f"Stitch time:   {elapsed:.2f}s ({input_bytes / 1e6 / elapsed:.0f} MB/s, {info.duration / elapsed:.0f}x realtime)")
+        print(f"Peak heap:     {peak / 1e6:.2f} MB")
+
+
+if __name__ == "__main__":
+    main()
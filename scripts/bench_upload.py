@@ -0,0 +1,119 @@
+"""Benchmark multipart uploads against a local S3 stand-in.
+
+Starts moto's threaded S3 server on localhost (or uses `--endpoint`, e.g. a
+MinIO container), then uploads a random `--size-mb` file with 1 part worker
+and with `--workers`, and times a re-run (hash skip) and a resume after an
+interruption halfway through. Loopback throughput is bounded by the stand-in
+server rather than the network; `--rtt-ms` adds a fixed delay per part to
+approximate the per-request latency of a remote store.
+"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from src.uploader import DEFAULT_PART_WORKERS, PART_SIZE, Uploader, UploadJob, make_client
+
+BUCKET = "dtfftl-bench"
+
+
+class _Latency:
+    """Client proxy that adds a fixed delay to each part upload, standing in for a WAN round trip."""
+
+    def __init__(self, client, seconds: float) -> None:
+        self._client = client
+        self.seconds = seconds
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+    def upload_part(self, **kwargs):
+        time.sleep(self.seconds)
+        return self._client.upload_part(**kwargs)
+
+
+class _Interrupt:
+    """Client proxy that fails every part upload after the first `budget`."""
+
+    def __init__(self, client, budget: int) -> None:
+        self._client = client
+        self.budget = budget
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+    def upload_part(self, **kwargs):
+        if self.budget <= 0:
+            raise ConnectionError("simulated interruption")
+        self.budget -= 1
+        return self._client.upload_part(**kwargs)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size-mb", type=int, default=100)
+    parser.add_argument("--workers", type=int, default=DEFAULT_PART_WORKERS)
+    parser.add_argument("--endpoint", help="Existing S3 endpoint; default starts moto locally")
+    parser.add_argument("--rtt-ms", type=float, default=0.0, help="Simulated extra latency per part upload")
+    args = parser.parse_args()
+
+    server = None
+    endpoint = args.endpoint
+    if endpoint is None:
+        from moto.server import ThreadedMotoServer
+
+        logging.getLogger("werkzeug").setLevel(logging.ERROR)
+        server = ThreadedMotoServer(port=0, verbose=False)
+        server.start()
+        host, port = server.get_host_and_port()
+        endpoint = f"http://{host}:{port}"
+    os.environ.setdefault("R2_ACCESS_KEY_ID", "bench")
+    os.environ.setdefault("R2_SECRET_ACCESS_KEY", "bench")
+    os.environ.setdefault("R2_REGION", "us-east-1")
+
+    try:
+        client = make_client(endpoint)
+        client.create_bucket(Bucket=BUCKET)
+        part_client = _Latency(client, args.rtt_ms / 1000) if args.rtt_ms else client
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            path = root / "episode.mp3"
+            path.write_bytes(os.urandom(args.size_mb * 1024 * 1024))
+            size_mb = path.stat().st_size / 1e6
+            print(
+                f"File: {size_mb:.0f} MB, {PART_SIZE // (1024 * 1024)} MiB parts, endpoint {endpoint}"
+                + (f", +{args.rtt_ms:g} ms per part" if args.rtt_ms else "")
+            )
+
+            for workers in (1, args.workers):
+                uploader = Uploader(part_client, BUCKET, state_dir=root / "state", part_workers=workers)
+                result = uploader.upload(UploadJob(path, f"bench/{workers}.mp3", "audio/mpeg"))
+                print(f"{workers:>2} part workers: {result.seconds:.2f}s ({size_mb / result.seconds:.0f} MB/s)")
+
+            uploader = Uploader(client, BUCKET, state_dir=root / "state", part_workers=args.workers)
+            result = uploader.upload(UploadJob(path, f"bench/{args.workers}.mp3", "audio/mpeg"))
+            print(f"Unchanged re-run: {result.status} in {result.seconds:.2f}s (hashing + HEAD)")
+
+            job = UploadJob(path, "bench/resume.mp3", "audio/mpeg")
+            parts = -(-path.stat().st_size // PART_SIZE)
+            try:
+                Uploader(_Interrupt(client, parts // 2), BUCKET, state_dir=root / "state", part_workers=1).upload(job)
+            except ConnectionError:
+                pass
+            result = Uploader(client, BUCKET, state_dir=root / "state", part_workers=args.workers).upload(job)
+            print(
+                f"Resume after {parts // 2}/{parts} parts: {result.status}, sent {result.bytes_sent / 1e6:.0f} MB "
+                f"in {result.seconds:.2f}s"
+            )
+    finally:
+        if server is not None:
+            server.stop()
+
+
+if __name__ == "__main__":
+    main()
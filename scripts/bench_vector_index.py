@@ -0,0 +1,91 @@
+"""Benchmark IVF-PQ search recall@10 and latency against exact search.
+
+Generates clustered, normalized synthetic vectors shaped like our story
+embeddings, computes exact top-k with NumPy, then measures the indexed
+LanceDB search over a grid of nprobes / refine_factor settings.
+"""
+
+from __future__ import annotations
+
+import argparse
+import statistics
+import tempfile
+import time
+
+import lancedb
+import numpy as np
+
+from src.embeddings import EMBEDDING_DIM
+from src.storage import _create_vector_index
+
+
+def build_vectors(count: int, clusters: int, seed: int = 7) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, EMBEDDING_DIM)).astype(np.float32)
+    labels = rng.integers(0, clusters, size=count)
+    vectors = centers[labels] + 0.6 * rng.standard_normal((count, EMBEDDING_DIM)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors
+
+
+def _run_queries(table, queries: np.ndarray, top_k: int, nprobes=None, refine_factor=None):
+    results = []
+    latencies = []
+    for query in queries:
+        builder = table.search(query).limit(top_k).select(["id"])
+        if nprobes:
+            builder = builder.nprobes(nprobes)
+        if refine_factor:
+            builder = builder.refine_factor(refine_factor)
+        start = time.perf_counter()
+        rows = builder.to_list()
+        latencies.append((time.perf_counter() - start) * 1000)
+        results.append([row["id"] for row in rows])
+    return results, latencies
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=50_000)
+    parser.add_argument("--clusters", type=int, default=400)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--top-k", type=int, default=10)
+    args = parser.parse_args()
+
+    vectors = build_vectors(args.rows, args.clusters)
+    rng = np.random.default_rng(11)
+    query_idx = rng.choice(args.rows, size=args.queries, replace=False)
+    queries = vectors[query_idx] + 0.05 * rng.standard_normal((args.queries, EMBEDDING_DIM)).astype(np.float32)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+
+    exact = np.argsort(-(queries @ vectors.T), axis=1)[:, : args.top_k]
+    truth = [set(int(i) for i in row) for row in exact]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = lancedb.connect(tmp)
+        data = [{"id": idx, "vector": vector} for idx, vector in enumerate(vectors.tolist())]
+        table = db.create_table("bench", data=data)
+
+        _, flat_latencies = _run_queries(table, queries, args.top_k)
+        print(f"rows: {args.rows}, dim: {EMBEDDING_DIM}, queries: {args.queries}")
+        print(f"{'exact scan':24s} recall@{args.top_k} 1.000  p50 {statistics.median(flat_latencies):7.2f} ms")
+
+        start = time.perf_counter()
+        _create_vector_index(table, args.rows)
+        print(f"index build: {time.perf_counter() - start:.1f}s")
+
+        for nprobes in (5, 10, 20, 50):
+            for refine_factor in (None, 10):
+                results, latencies = _run_queries(table, queries, args.top_k, nprobes, refine_factor)
+                recall = statistics.mean(
+                    len(truth[q] & set(ids)) / args.top_k for q, ids in enumerate(results)
+                )
+                label = f"nprobes={nprobes} refine={refine_factor or '-'}"
+                print(
+                    f"{label:24s} recall@{args.top_k} {recall:.3f}  "
+                    f"p50 {statistics.median(latencies):7.2f} ms"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,11 @@
-"""Generate episode audio (stub)."""
+"""Generate episode audio: TTS, level processing, stitching and MP3/Opus encoding, pipelined."""
 
 from __future__ import annotations
 
 import argparse
 from pathlib import Path
 
-from src.audio import stitch_wavs, transcode_to_mp3
-from src.tts import text_to_speech_parallel
+from src.assembler import AssemblyError, render_episode_audio
 
 
 def main() -> None:
@@ -23,11 +22,12 @@ def main() -> None:
         text = segment_path.read_text(encoding="utf-8")
         segments.append((name, text))
 
-    wav_outputs, failures = text_to_speech_parallel(segments, episode_dir / "audio")
-    if failures:
-        raise SystemExit(f"TTS failed for segments: {list(failures.keys())}")
-    stitched = stitch_wavs(wav_outputs, episode_dir / "episode.wav")
-    transcode_to_mp3(stitched, episode_dir / "episode.mp3")
+    try:
+        result = render_episode_audio(segments, episode_dir)
+    except AssemblyError as exc:
+        raise SystemExit(str(exc))
+    for name, path in result.outputs.items():
+        print(f"{name}: {path}")
 
 
 if __name__ == "__main__":
@@ -1,22 +1,54 @@
-"""Generate missing WAVs (stub)."""
+"""Generate missing or stale WAVs for saved episode segments.
+
+A WAV counts as current only when the TTS render cache holds audio for each
+of the segment's lines at their present text, voice and model version;
+current segments are skipped, and only the rest are queued, so edited lines
+and voice changes are re-synthesized and unchanged lines are linked from
+the cache. Without a cache, any existing WAV counts as current.
+"""
 
 from __future__ import annotations
 
 from pathlib import Path
 
-from src.tts import text_to_speech
+from src.tts import build_line_jobs, get_tts_cache, get_tts_voice, text_to_speech_parallel, tts_render_key
+
+
+def is_current(episode: Path, name: str, text: str, cache, voice: str) -> bool:
+    if not (episode / f"{name}.wav").exists():
+        return False
+    if cache is None:
+        return True
+    jobs = build_line_jobs([(name, text)], episode, voice)[name]
+    return bool(jobs) and all(cache.path_for(tts_render_key(job.text, job.voice)).exists() for job in jobs)
 
 
 def main() -> None:
     episode_dir = Path("data/episodes")
+    cache = get_tts_cache()
+    voice = get_tts_voice()
+    failed = skipped = 0
     for episode in episode_dir.glob("*/"):
-        for segment in episode.glob("*.txt"):
+        segments = []
+        for segment in sorted(episode.glob("*.txt")):
             if segment.name in {"episode.txt", "manifest.json"}:
                 continue
-            wav_path = segment.with_suffix(".wav")
-            if not wav_path.exists():
-                text = segment.read_text(encoding="utf-8")
-                text_to_speech(text, wav_path)
+            text = segment.read_text(encoding="utf-8")
+            if is_current(episode, segment.stem, text, cache, voice):
+                skipped += 1
+                continue
+            segments.append((segment.stem, text))
+        if not segments:
+            continue
+        _, failures = text_to_speech_parallel(segments, episode)
+        for name, error in failures.items():
+            failed += 1
+            print(f"TTS failed for {episode / name}: {error}")
+
+    print(f"Segments: {skipped} already current, {failed} failed")
+    if cache is not None:
+        stats = cache.stats()
+        print(f"TTS cache: {stats['hits']} lines reused, {stats['misses']} synthesized")
 
 
 if __name__ == "__main__":
@@ -6,7 +6,7 @@ import argparse
 import datetime as dt
 
 from src.pipeline import collect_stories
-from src.storage import store_stories_batch, StorageUnavailable
+from src.storage import compact_tables, store_stories_batch, StorageUnavailable
 
 
 def main() -> None:
@@ -25,6 +25,8 @@ def main() -> None:
         store_stories_batch(stories, episode_date, use_lancedb=True)
     except StorageUnavailable:
         store_stories_batch(stories, episode_date, use_lancedb=False)
+    else:
+        compact_tables()
     print(f"Stored {len(stories)} stories for {episode_date}")
 
 
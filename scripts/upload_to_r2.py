@@ -1,22 +1,65 @@
-"""Upload episode to Cloudflare R2 (stub)."""
+"""Upload an episode (MP3, transcripts, chapters) and the podcast feed to Cloudflare R2.
+
+Credentials come from R2_ACCOUNT_ID, R2_ACCESS_KEY_ID and R2_SECRET_ACCESS_KEY
+(or DTFFTL_S3_ENDPOINT for another S3-compatible store). Files whose hash
+already matches the remote copy are skipped, and an interrupted multipart
+upload picks up where it stopped when the script is run again.
+"""
 
 from __future__ import annotations
 
 import argparse
+import time
 from pathlib import Path
 
+from src.feed import FEED_DIR
+from src.uploader import (
+    DEFAULT_PART_WORKERS,
+    PART_SIZE,
+    Uploader,
+    UploadUnavailable,
+    episode_upload_jobs,
+    get_bucket,
+    make_client,
+    upload_feed,
+)
+
 
 def main() -> None:
-    parser = argparse.ArgumentParser()
+    parser = argparse.ArgumentParser(description=__doc__)
     parser.add_argument("--episode-dir", required=True)
+    parser.add_argument("--feed-dir", default=str(FEED_DIR))
+    parser.add_argument("--bucket", default=get_bucket(), help="Defaults to R2_BUCKET")
+    parser.add_argument("--endpoint", help="S3 endpoint URL (defaults to the R2 account endpoint)")
+    parser.add_argument("--part-size-mb", type=int, default=PART_SIZE // (1024 * 1024))
+    parser.add_argument("--workers", type=int, default=DEFAULT_PART_WORKERS, help="Parallel part uploads")
+    parser.add_argument("--no-feed", action="store_true", help="Upload the episode files only")
     args = parser.parse_args()
 
     episode_dir = Path(args.episode_dir)
     mp3_path = episode_dir / "episode.mp3"
     if not mp3_path.exists():
         raise SystemExit(f"Missing {mp3_path}")
+    if not args.bucket:
+        raise SystemExit("No bucket: pass --bucket or set R2_BUCKET")
 
-    print(f"Stub upload complete for {mp3_path}")
+    try:
+        client = make_client(args.endpoint)
+    except UploadUnavailable as exc:
+        raise SystemExit(str(exc))
+    uploader = Uploader(
+        client, args.bucket, part_size=args.part_size_mb * 1024 * 1024, part_workers=args.workers,
+    )
+    started = time.perf_counter()
+    # Episode files, then archive pages, then feed.xml: nothing links to an object that isn't up yet.
+    results = uploader.upload_all(episode_upload_jobs(episode_dir, episode_dir.name))
+    if not args.no_feed:
+        results += upload_feed(uploader, Path(args.feed_dir))
+    elapsed = time.perf_counter() - started
+    for result in results:
+        print(f"{result.status:>8}  {result.key}  ({result.size / 1e6:.1f} MB, {result.seconds:.1f}s)")
+    sent = sum(result.bytes_sent for result in results)
+    print(f"Sent {sent / 1e6:.1f} MB in {elapsed:.1f}s ({sent / 1e6 / max(elapsed, 1e-9):.1f} MB/s)")
 
 
 if __name__ == "__main__":
@@ -4,7 +4,8 @@ from .models import Story, SourceMeta
 from .generator import generate_episode_scripts, generate_interstitial
 from .storage import store_stories_batch, store_episode
 from .tts import text_to_speech, text_to_speech_parallel
-from .audio import stitch_wavs, transcode_to_mp3
+from .audio import stitch_wavs
+from .encoder import transcode_to_mp3
 
 __all__ = [
     "Story",
@@ -4,12 +4,28 @@ from __future__ import annotations
 
 import datetime as dt
 import re
+import sqlite3
+import threading
 import time
 from typing import Optional
 import xml.etree.ElementTree as ET
 
+from .arxiv_store import AbstractStore, split_version
+from .daemons import daemon_map
+from .http_cache import get_session
 from .models import Story, SourceMeta
 
+ARXIV_API_URL = "https://export.arxiv.org/api/query"
+ARXIV_CHUNK_SIZE = 50
+ARXIV_MAX_CONCURRENCY = 2
+# arXiv asks clients to stay around one request every three seconds.
+ARXIV_REQUEST_INTERVAL = 3.0
+ARXIV_RETRIES = 3
+ARXIV_BACKOFF = 3.0
+
+ABS_HREF_RE = re.compile(r"^/abs/(\d{4}\.\d{4,5})")
+VOTE_COUNT_RE = re.compile(r"\b(\d+)\b")
+
 
 def fetch_trending(limit: int = 5, use_stub: bool = True) -> list[Story]:
     """Fetch trending AlphaXiv threads (stub)."""
@@ -22,7 +38,7 @@ def fetch_trending(limit: int = 5, use_stub: bool = True) -> list[Story]:
             return []
 
         arxiv_ids = [entry["arxiv_id"] for entry in entries if entry.get("arxiv_id")]
-        abstracts = _fetch_arxiv_abstracts(arxiv_ids)
+        abstracts = get_arxiv_abstracts(arxiv_ids)
 
         stories: list[Story] = []
         for entry in entries:
@@ -86,13 +102,11 @@ def fetch_trending(limit: int = 5, use_stub: bool = True) -> list[Story]:
 
 
 def _fetch_explore_html(retries: int = 3) -> Optional[str]:
-    import requests
-
     url = "https://www.alphaxiv.org/explore"
     headers = {"User-Agent": "dtfftl/0.1 (alphaxiv scraper)"}
     for attempt in range(retries):
         try:
-            resp = requests.get(url, timeout=20, headers=headers)
+            resp = get_session().get(url, timeout=20, headers=headers)
             if resp.status_code == 200:
                 return resp.text
             time.sleep(1 + attempt)
@@ -101,45 +115,125 @@ def _fetch_explore_html(retries: int = 3) -> Optional[str]:
     return None
 
 
-def _parse_trending_html(html: str, limit: int) -> list[dict]:
-    from bs4 import BeautifulSoup
+def _parse_trending_html(html: str, limit: int, backend: str | None = None) -> list[dict]:
+    """Extract trending papers from the explore page.
 
-    soup = BeautifulSoup(html, "html.parser")
+    Uses lxml when installed and falls back to BeautifulSoup; both walk the
+    anchors once and resolve each card only once.
+    """
+    if backend is None:
+        try:
+            import lxml.html  # noqa: F401
+
+            backend = "lxml"
+        except ImportError:
+            backend = "bs4"
+    if backend == "lxml":
+        return _parse_trending_lxml(html, limit)
+    return _parse_trending_bs4(html, limit)
+
+
+def _trending_entry(arxiv_id: str, title: str, card_info: tuple[str, Optional[int]]) -> dict:
+    discussion, score = card_info
+    return {
+        "title": title,
+        "arxiv_id": arxiv_id,
+        "url": f"https://www.alphaxiv.org/abs/{arxiv_id}",
+        "discussion_highlights": discussion,
+        "score": score,
+    }
+
+
+def _has_classes(value: Optional[str], *needles: str) -> bool:
+    return bool(value) and all(needle in value for needle in needles)
+
+
+def _is_title_class(value: Optional[str]) -> bool:
+    return _has_classes(value, "tiptap", "html-renderer")
+
+
+def _is_card_class(value: Optional[str]) -> bool:
+    return _has_classes(value, "rounded-xl")
+
+
+def _is_summary_class(value: Optional[str]) -> bool:
+    return _has_classes(value, "line-clamp-4")
+
+
+def _vote_score(texts) -> Optional[int]:
+    for text in texts:
+        match = VOTE_COUNT_RE.search(text)
+        if match:
+            return int(match.group(1))
+    return None
+
+
+def _lxml_text(element) -> str:
+    return " ".join(part.strip() for part in element.itertext() if part.strip())
+
+
+def _parse_trending_lxml(html: str, limit: int) -> list[dict]:
+    import lxml.html
+
+    root = lxml.html.fromstring(html)
     results: list[dict] = []
     seen_ids: set[str] = set()
+    # Keyed by id(); the card is kept in the value so the id stays unique.
+    cards: dict[int, tuple[object, tuple[str, Optional[int]]]] = {}
 
-    anchors = soup.find_all("a", href=re.compile(r"^/abs/\\d{4}\\.\\d{4,5}"))
-    for anchor in anchors:
-        title_div = anchor.find("div", class_=lambda c: c and "tiptap" in c and "html-renderer" in c)
-        if not title_div:
+    for anchor in root.iter("a"):
+        match = ABS_HREF_RE.match(anchor.get("href") or "")
+        if not match or match.group(1) in seen_ids:
             continue
-        title = title_div.get_text(" ", strip=True)
-        href = anchor.get("href") or ""
-        arxiv_match = re.search(r"/abs/(\\d{4}\\.\\d{4,5})", href)
-        if not arxiv_match:
+        title_div = next((div for div in anchor.iter("div") if _is_title_class(div.get("class"))), None)
+        if title_div is None:
             continue
-        arxiv_id = arxiv_match.group(1)
+        arxiv_id = match.group(1)
+
+        card = next((div for div in anchor.iterancestors("div") if _is_card_class(div.get("class"))), None)
+        card_info: tuple[str, Optional[int]] = ("", None)
+        if card is not None:
+            if id(card) not in cards:
+                summary_p = next((p for p in card.iter("p") if _is_summary_class(p.get("class"))), None)
+                discussion = _lxml_text(summary_p) if summary_p is not None else ""
+                cards[id(card)] = (card, (discussion, _vote_score(_lxml_text(button) for button in card.iter("button"))))
+            card_info = cards[id(card)][1]
+
+        results.append(_trending_entry(arxiv_id, _lxml_text(title_div), card_info))
+        seen_ids.add(arxiv_id)
+        if len(results) >= limit:
+            break
+
+    return results
+
+
+def _parse_trending_bs4(html: str, limit: int) -> list[dict]:
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, "html.parser")
+    results: list[dict] = []
+    seen_ids: set[str] = set()
+    cards: dict[int, tuple[object, tuple[str, Optional[int]]]] = {}
+
+    for anchor in soup.find_all("a", href=ABS_HREF_RE):
+        arxiv_id = ABS_HREF_RE.match(anchor["href"]).group(1)
         if arxiv_id in seen_ids:
             continue
+        title_div = anchor.find("div", class_=_is_title_class)
+        if not title_div:
+            continue
 
-        card = anchor.find_parent("div", class_=lambda c: c and "rounded-xl" in c)
-        discussion = ""
-        score = None
+        card = anchor.find_parent("div", class_=_is_card_class)
+        card_info: tuple[str, Optional[int]] = ("", None)
         if card:
-            summary_p = card.find("p", class_=lambda c: c and "line-clamp-4" in c)
-            if summary_p:
-                discussion = summary_p.get_text(" ", strip=True)
-            score = _extract_vote_score(card)
-
-        results.append(
-            {
-                "title": title,
-                "arxiv_id": arxiv_id,
-                "url": f"https://www.alphaxiv.org/abs/{arxiv_id}",
-                "discussion_highlights": discussion,
-                "score": score,
-            }
-        )
+            if id(card) not in cards:
+                summary_p = card.find("p", class_=_is_summary_class)
+                discussion = summary_p.get_text(" ", strip=True) if summary_p else ""
+                score = _vote_score(button.get_text(" ", strip=True) for button in card.find_all("button"))
+                cards[id(card)] = (card, (discussion, score))
+            card_info = cards[id(card)][1]
+
+        results.append(_trending_entry(arxiv_id, title_div.get_text(" ", strip=True), card_info))
         seen_ids.add(arxiv_id)
         if len(results) >= limit:
             break
@@ -147,32 +241,91 @@ def _parse_trending_html(html: str, limit: int) -> list[dict]:
     return results
 
 
-def _extract_vote_score(card) -> Optional[int]:
-    for button in card.find_all("button"):
-        text = button.get_text(" ", strip=True)
-        match = re.search(r"\\b(\\d+)\\b", text)
-        if match:
+def get_arxiv_abstracts(arxiv_ids: list[str], store: AbstractStore | None = None) -> dict[str, str]:
+    """Abstracts for arxiv_ids, served from the local store and fetched only on a miss."""
+    if not arxiv_ids:
+        return {}
+    try:
+        store = store or AbstractStore()
+        abstracts = store.get_many(arxiv_ids)
+    except sqlite3.Error:
+        store = None
+        abstracts = {}
+
+    missing = [arxiv_id for arxiv_id in dict.fromkeys(arxiv_ids) if arxiv_id not in abstracts]
+    if missing:
+        fetched = _fetch_arxiv_abstracts(missing)
+        versioned = {arxiv_id: text for arxiv_id, text in fetched.items() if split_version(arxiv_id)[1]}
+        if store is not None and versioned:
             try:
-                return int(match.group(1))
-            except ValueError:
-                continue
-    return None
+                store.put_many(versioned)
+            except sqlite3.Error:
+                pass
+        for arxiv_id in missing:
+            base, _ = split_version(arxiv_id)
+            abstract = fetched.get(arxiv_id) or fetched.get(base)
+            if abstract:
+                abstracts[arxiv_id] = abstract
+    return abstracts
+
+
+class _RequestPacer:
+    """Spaces request starts at least `interval` seconds apart across threads."""
+
+    def __init__(self, interval: float) -> None:
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._next_start = 0.0
+
+    def wait(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_start)
+            self._next_start = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+
+def _fetch_arxiv_chunk(arxiv_ids: list[str], pacer: _RequestPacer, retries: int = ARXIV_RETRIES) -> dict[str, str]:
+    params = {"id_list": ",".join(arxiv_ids), "max_results": len(arxiv_ids)}
+    for attempt in range(retries + 1):
+        pacer.wait()
+        try:
+            resp = get_session().get(ARXIV_API_URL, params=params, timeout=20)
+        except Exception:
+            resp = None
+        if resp is not None and resp.status_code == 200:
+            return _parse_arxiv_feed(resp.text)
+        if resp is not None and resp.status_code not in {429, 500, 502, 503, 504}:
+            return {}
+        if attempt < retries:
+            retry_after = resp.headers.get("Retry-After") if resp is not None else None
+            delay = float(retry_after) if retry_after and retry_after.isdigit() else ARXIV_BACKOFF * 2 ** attempt
+            time.sleep(delay)
+    return {}
 
 
 def _fetch_arxiv_abstracts(arxiv_ids: list[str]) -> dict[str, str]:
+    """Fetch abstracts in size-capped id_list chunks with paced, bounded concurrency.
+
+    Chunks run on daemon threads, so a stalled request can't outlive the
+    alphaxiv source timeout. Results are keyed by versioned id and also by the id as requested.
+    """
     if not arxiv_ids:
         return {}
-    import requests
-    base = "https://export.arxiv.org/api/query?id_list="
-    url = base + ",".join(arxiv_ids)
-    try:
-        resp = requests.get(url, timeout=20)
-        resp.raise_for_status()
-    except Exception:
-        return {}
+    chunks = [arxiv_ids[start:start + ARXIV_CHUNK_SIZE] for start in range(0, len(arxiv_ids), ARXIV_CHUNK_SIZE)]
+    pacer = _RequestPacer(ARXIV_REQUEST_INTERVAL)
+    results = daemon_map(lambda chunk: _fetch_arxiv_chunk(chunk, pacer), chunks, ARXIV_MAX_CONCURRENCY, "arxiv")
+
+    abstracts: dict[str, str] = {}
+    for result in results:
+        abstracts.update(result)
+    return abstracts
 
+
+def _parse_arxiv_feed(text: str) -> dict[str, str]:
     try:
-        root = ET.fromstring(resp.text)
+        root = ET.fromstring(text)
     except Exception:
         return {}
 
@@ -183,9 +336,14 @@ def _fetch_arxiv_abstracts(arxiv_ids: list[str]) -> dict[str, str]:
         summary_elem = entry.find("atom:summary", ns)
         if id_elem is None or summary_elem is None:
             continue
-        arxiv_id = id_elem.text.rsplit("/", 1)[-1] if id_elem.text else None
+        arxiv_id = id_elem.text.rsplit("/abs/", 1)[-1] if id_elem.text else None
         if not arxiv_id:
             continue
         summary = summary_elem.text.strip() if summary_elem.text else ""
-        abstracts[arxiv_id] = " ".join(summary.split())
+        if not summary:
+            continue
+        abstract = " ".join(summary.split())
+        abstracts[arxiv_id] = abstract
+        base, _ = split_version(arxiv_id)
+        abstracts.setdefault(base, abstract)
     return abstracts
@@ -0,0 +1,90 @@
+"""Persistent arXiv abstract store for DTF:FTL.
+
+Abstracts for a given arXiv id and version never change, so they are kept
+in SQLite keyed by (arxiv_id, version) and looked up before calling the
+arXiv API. Unversioned lookups return the latest stored version.
+"""
+
+from __future__ import annotations
+
+import re
+import sqlite3
+from contextlib import closing
+from datetime import datetime
+from pathlib import Path
+from typing import Iterable
+
+PROJECT_ROOT = Path(__file__).parent.parent
+ABSTRACT_DB = PROJECT_ROOT / "data" / "arxiv_abstracts.sqlite"
+
+_VERSIONED_ID = re.compile(r"^(?P<base>.+?)(?:v(?P<version>\d+))?$")
+_LOOKUP_CHUNK = 500
+
+
+def split_version(arxiv_id: str) -> tuple[str, int]:
+    """Split "2401.00001v2" into ("2401.00001", 2); unversioned ids get version 0."""
+    match = _VERSIONED_ID.match(arxiv_id.strip())
+    base = match.group("base") if match else arxiv_id
+    version = int(match.group("version")) if match and match.group("version") else 0
+    return base, version
+
+
+class AbstractStore:
+    def __init__(self, path: Path = ABSTRACT_DB) -> None:
+        self.path = path
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS abstracts ("
+                " arxiv_id TEXT NOT NULL,"
+                " version INTEGER NOT NULL,"
+                " abstract TEXT NOT NULL,"
+                " fetched_at TEXT NOT NULL,"
+                " PRIMARY KEY (arxiv_id, version))"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=30)
+
+    def get_many(self, arxiv_ids: Iterable[str]) -> dict[str, str]:
+        """Map each requested id (as given) to its stored abstract; misses are omitted."""
+        wanted: dict[str, list[tuple[str, int]]] = {}
+        for arxiv_id in arxiv_ids:
+            base, version = split_version(arxiv_id)
+            wanted.setdefault(base, []).append((arxiv_id, version))
+        if not wanted:
+            return {}
+
+        rows: dict[str, dict[int, str]] = {}
+        bases = list(wanted)
+        with closing(self._connect()) as conn:
+            for start in range(0, len(bases), _LOOKUP_CHUNK):
+                chunk = bases[start:start + _LOOKUP_CHUNK]
+                placeholders = ",".join("?" for _ in chunk)
+                query = f"SELECT arxiv_id, version, abstract FROM abstracts WHERE arxiv_id IN ({placeholders})"
+                for base, version, abstract in conn.execute(query, chunk):
+                    rows.setdefault(base, {})[version] = abstract
+
+        found: dict[str, str] = {}
+        for base, requested in wanted.items():
+            versions = rows.get(base)
+            if not versions:
+                continue
+            for arxiv_id, version in requested:
+                if version == 0:
+                    found[arxiv_id] = versions[max(versions)]
+                elif version in versions:
+                    found[arxiv_id] = versions[version]
+        return found
+
+    def put_many(self, abstracts: dict[str, str]) -> None:
+        """Store abstracts keyed by (possibly versioned) arXiv id."""
+        if not abstracts:
+            return
+        fetched_at = datetime.utcnow().isoformat()
+        rows = [(*split_version(arxiv_id), abstract, fetched_at) for arxiv_id, abstract in abstracts.items()]
+        with closing(self._connect()) as conn, conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO abstracts (arxiv_id, version, abstract, fetched_at) VALUES (?, ?, ?, ?)",
+                rows,
+            )
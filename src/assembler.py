@@ -0,0 +1,285 @@
+"""Pipelined episode audio: TTS, level processing, stitching and encoding at once.
+
+The line scheduler finishes segments in whatever order its longest-first
+dispatch produces them, but the episode has to be written front to back.
+`OrderedAssembler` sits between the two. Segments are handed in as they
+finish and held in a reorder buffer. As soon as segment N and every
+segment before it are in, N is level-processed and appended to the episode
+WAV, and the MP3/Opus encoders are fed the same blocks. By the time TTS
+renders the last segment almost the whole episode is already written and
+encoded, so end-to-end time is the TTS time plus a tail of processing and
+encoding one segment.
+
+The reorder buffer is bounded from the TTS side: `render_episode_audio`
+passes `reorder_window` to `text_to_speech_parallel`, which only starts
+lines for the first unfinished segment and the few after it.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Iterable, Optional, Sequence
+
+from .audio import DEFAULT_SILENCE_DURATION, WavStreamWriter, append_segment, read_wav_info
+from .audio_processing import DEFAULT_CROSSFADE, TARGET_LOUDNESS_DB, process_segment
+from .encoder import (
+    DEFAULT_FORMATS,
+    CommandBuilder,
+    PipeEncoder,
+    close_encoders,
+    ffmpeg_pipe_command,
+    open_encoders,
+)
+from .tts import text_to_speech_parallel
+
+# Segments TTS may finish ahead of the first one still rendering.
+DEFAULT_REORDER_WINDOW = 4
+
+
+class AssemblyError(RuntimeError):
+    pass
+
+
+@dataclass
+class AssemblyEvent:
+    kind: str  # "ready", "appended", "failed" or "finished"
+    segment: Optional[str]
+    ready: int
+    appended: int
+    buffered: int
+    total: int
+    elapsed: float
+
+
+def print_progress(event: AssemblyEvent) -> None:
+    if event.kind == "appended":
+        print(
+            f"[assemble] {event.appended}/{event.total} appended ({event.segment}), "
+            f"{event.buffered} buffered, {event.elapsed:.1f}s"
+        )
+    elif event.kind == "failed":
+        print(f"[assemble] {event.segment} failed after {event.elapsed:.1f}s")
+    elif event.kind == "finished":
+        print(f"[assemble] episode finished in {event.elapsed:.1f}s")
+
+
+class OrderedAssembler:
+    """Append segments to the episode in `names` order as they are handed in.
+
+    `add` and `fail` may be called from any thread; the appending itself
+    runs on the assembler's own thread so TTS workers never wait on it.
+    With `processed_dir`, each segment is loudness-matched and trimmed into
+    that directory before it is appended. `peak_buffered` is the most
+    segments ever held waiting for an earlier one to arrive.
+    """
+
+    def __init__(
+        self,
+        names: Sequence[str],
+        output_path: Path,
+        processed_dir: Optional[Path] = None,
+        target_db: float = TARGET_LOUDNESS_DB,
+        silence_duration: float | None = DEFAULT_SILENCE_DURATION,
+        crossfade: float = DEFAULT_CROSSFADE,
+        formats: Iterable[str] = DEFAULT_FORMATS,
+        command: CommandBuilder = ffmpeg_pipe_command,
+        on_event: Optional[Callable[[AssemblyEvent], None]] = None,
+    ) -> None:
+        if not names:
+            raise ValueError("no segments to assemble")
+        self.names = list(names)
+        self.output_path = output_path
+        self.processed_dir = processed_dir
+        self.target_db = target_db
+        self.silence_duration = silence_duration
+        self.crossfade = crossfade
+        self.formats = tuple(formats)
+        self.command = command
+        self.on_event = on_event
+        self.processed: list[Path] = []
+        self.levels: dict[str, dict] = {}
+        self.outputs: dict[str, Path] = {}
+        self.peak_buffered = 0
+
+        self._order = {name: idx for idx, name in enumerate(self.names)}
+        self._ready: dict[int, Path] = {}
+        self._arrived: set[int] = set()
+        self._gap = 0  # first segment not handed in yet
+        self._failed: dict[str, str] = {}
+        self._received = 0
+        self._appended = 0
+        self._error: Optional[BaseException] = None
+        self._cond = threading.Condition()
+        self._started = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="assemble", daemon=True)
+
+    def start(self) -> "OrderedAssembler":
+        self._started = time.perf_counter()
+        self._thread.start()
+        return self
+
+    def _emit(self, kind: str, segment: Optional[str]) -> None:
+        if self.on_event is None:
+            return
+        self.on_event(AssemblyEvent(
+            kind=kind,
+            segment=segment,
+            ready=self._received,
+            appended=self._appended,
+            buffered=len(self._ready),
+            total=len(self.names),
+            elapsed=time.perf_counter() - self._started,
+        ))
+
+    def add(self, name: str, path: Path) -> None:
+        with self._cond:
+            idx = self._order[name]
+            self._ready[idx] = path
+            self._arrived.add(idx)
+            self._received += 1
+            while self._gap in self._arrived:
+                self._gap += 1
+            # Only segments waiting on an earlier one count; in-order ones are just queued for processing.
+            held = sum(1 for ready in self._ready if ready > self._gap)
+            self.peak_buffered = max(self.peak_buffered, held)
+            self._emit("ready", name)
+            self._cond.notify_all()
+
+    def fail(self, name: str, error: str) -> None:
+        with self._cond:
+            self._failed[name] = error
+            self._received += 1
+            self._emit("failed", name)
+            self._cond.notify_all()
+
+    def _next(self, idx: int) -> Path:
+        with self._cond:
+            while idx not in self._ready and not self._failed:
+                self._cond.wait()
+            if idx not in self._ready:
+                name, error = next(iter(self._failed.items()))
+                raise AssemblyError(f"segment {name} failed: {error}")
+            return self._ready.pop(idx)
+
+    def _run(self) -> None:
+        writer: Optional[WavStreamWriter] = None
+        encoders: list[PipeEncoder] = []
+        try:
+            for idx, name in enumerate(self.names):
+                path = self._next(idx)
+                if self.processed_dir is not None:
+                    path, self.levels[path.stem] = process_segment(path, self.processed_dir, target_db=self.target_db)
+                self.processed.append(path)
+                if writer is None:
+                    info = read_wav_info(path)
+                    encoders = open_encoders(self.output_path, self.formats, info.sample_rate, info.channels, self.command)
+                    writer = WavStreamWriter(
+                        self.output_path,
+                        info.sample_rate,
+                        info.channels,
+                        crossfade_frames=int(round(self.crossfade * info.sample_rate)),
+                        sinks=encoders,
+                    )
+                append_segment(writer, path, self.silence_duration, first=not idx)
+                with self._cond:
+                    self._appended += 1
+                    self._emit("appended", name)
+            self.outputs = {"wav": writer.close()}
+            writer = None
+            self.outputs.update(close_encoders(encoders))
+            encoders = []
+            with self._cond:
+                self._emit("finished", None)
+        except BaseException as exc:
+            self._error = exc
+            if writer is not None:
+                writer.abort()
+            for encoder in encoders:
+                encoder.abort()
+
+    def wait(self) -> dict[str, Path]:
+        """Block until the episode is written; returns the WAV under "wav" plus each encoded format."""
+        self._thread.join()
+        if self._error is not None:
+            if isinstance(self._error, AssemblyError):
+                raise self._error
+            raise AssemblyError(f"assembly failed: {self._error}") from self._error
+        return self.outputs
+
+
+@dataclass
+class EpisodeAudio:
+    segment_wavs: list[Path]
+    processed_wavs: list[Path]
+    levels: dict[str, dict]
+    outputs: dict[str, Path]
+    peak_buffered: int = 0
+
+
+def render_episode_audio(
+    segments: list[tuple[str, str]],
+    episode_dir: Path,
+    voice: str | None = None,
+    target_db: float = TARGET_LOUDNESS_DB,
+    crossfade: float = DEFAULT_CROSSFADE,
+    formats: Iterable[str] = DEFAULT_FORMATS,
+    reorder_window: int = DEFAULT_REORDER_WINDOW,
+    command: CommandBuilder = ffmpeg_pipe_command,
+    on_event: Optional[Callable[[AssemblyEvent], None]] = print_progress,
+) -> EpisodeAudio:
+    """Render, process, stitch and encode an episode, overlapping all four.
+
+    Segment WAVs go to `episode_dir/audio`, processed ones to
+    `episode_dir/audio_processed` and the episode to `episode_dir/episode.*`.
+    Raises AssemblyError if any segment fails; TTS still runs to the end so
+    the lines that did render are cached for the next attempt.
+    """
+    assembler = OrderedAssembler(
+        [name for name, _ in segments],
+        episode_dir / "episode.wav",
+        processed_dir=episode_dir / "audio_processed",
+        target_db=target_db,
+        crossfade=crossfade,
+        formats=formats,
+        command=command,
+        on_event=on_event,
+    ).start()
+
+    delivered: set[str] = set()
+
+    def on_segment(name: str, path: Optional[Path], error: str) -> None:
+        delivered.add(name)
+        if path is None:
+            assembler.fail(name, error)
+        else:
+            assembler.add(name, path)
+
+    try:
+        wav_files, _ = text_to_speech_parallel(
+            segments,
+            episode_dir / "audio",
+            voice=voice,
+            on_segment=on_segment,
+            reorder_window=reorder_window,
+        )
+    except BaseException as exc:
+        # Unblock the assembler thread so the partial episode and the encoders are cleaned up.
+        for name, _ in segments:
+            if name not in delivered:
+                assembler.fail(name, f"TTS aborted: {exc!r}")
+        try:
+            assembler.wait()
+        except AssemblyError:
+            pass
+        raise
+    outputs = assembler.wait()
+    return EpisodeAudio(
+        segment_wavs=wav_files,
+        processed_wavs=assembler.processed,
+        levels=assembler.levels,
+        outputs=outputs,
+        peak_buffered=assembler.peak_buffered,
+    )
@@ -1,27 +1,383 @@
-"""Audio utilities (stubbed) for DTF:FTL."""
+"""Audio utilities for DTF:FTL.
+
+Segment WAVs are stitched by streaming their PCM data into the output in
+fixed-size blocks; nothing ever holds more than one block of audio in
+memory, so hour-long episodes stitch on a small box. Inputs whose sample
+rate, channel count or sample format differ from the output are converted
+block by block on the way through.
+"""
 
 from __future__ import annotations
 
+import math
+import os
+import struct
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Iterable
+from typing import BinaryIO, Iterable, Iterator, Optional, Protocol, Sequence
 
+import numpy as np
 
 DEFAULT_SILENCE_DURATION = 1.0
+COPY_FRAMES = 1 << 16
+OUTPUT_SAMPLE_WIDTH = 2
+
+WAVE_FORMAT_PCM = 0x0001
+WAVE_FORMAT_IEEE_FLOAT = 0x0003
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+
+class PcmSink(Protocol):
+    def write(self, data: bytes) -> None: ...
+
+
+@dataclass
+class WavInfo:
+    path: Path
+    format_tag: int
+    channels: int
+    sample_rate: int
+    bits_per_sample: int
+    block_align: int
+    data_offset: int
+    data_size: int
+
+    @property
+    def frames(self) -> int:
+        return self.data_size // self.block_align
+
+    @property
+    def duration(self) -> float:
+        return self.frames / self.sample_rate
+
+
+def read_wav_info(path: Path) -> WavInfo:
+    """Parse a WAV header without reading any audio data."""
+    file_size = os.path.getsize(path)
+    with open(path, "rb") as handle:
+        riff = handle.read(12)
+        if len(riff) < 12 or riff[:4] != b"RIFF" or riff[8:12] != b"WAVE":
+            raise ValueError(f"{path} is not a RIFF/WAVE file")
+        fmt = None
+        while True:
+            header = handle.read(8)
+            if len(header) < 8:
+                raise ValueError(f"{path} has no data chunk")
+            chunk_id, chunk_size = struct.unpack("<4sI", header)
+            if chunk_id == b"fmt ":
+                fmt = handle.read(chunk_size)
+                if chunk_size % 2:
+                    handle.seek(1, os.SEEK_CUR)
+            elif chunk_id == b"data":
+                if fmt is None:
+                    raise ValueError(f"{path} has data before fmt")
+                data_offset = handle.tell()
+                # Streamed WAVs may carry a placeholder size; trust the file length then.
+                if chunk_size in (0, 0xFFFFFFFF) or data_offset + chunk_size > file_size:
+                    chunk_size = file_size - data_offset
+                break
+            else:
+                handle.seek(chunk_size + (chunk_size % 2), os.SEEK_CUR)
+
+    format_tag, channels, sample_rate, _, block_align, bits = struct.unpack("<HHIIHH", fmt[:16])
+    if format_tag == WAVE_FORMAT_EXTENSIBLE and len(fmt) >= 26:
+        format_tag = struct.unpack("<H", fmt[24:26])[0]
+    if format_tag not in (WAVE_FORMAT_PCM, WAVE_FORMAT_IEEE_FLOAT):
+        raise ValueError(f"{path} uses unsupported WAV format 0x{format_tag:04x}")
+    return WavInfo(
+        path=Path(path),
+        format_tag=format_tag,
+        channels=channels,
+        sample_rate=sample_rate,
+        bits_per_sample=bits,
+        block_align=block_align,
+        data_offset=data_offset,
+        data_size=chunk_size - chunk_size % block_align,
+    )
+
+
+def decode_frames(raw: bytes, info: WavInfo) -> np.ndarray:
+    """Raw frames to float32 samples in [-1, 1], shaped (frames, channels)."""
+    width = info.block_align // info.channels
+    if info.format_tag == WAVE_FORMAT_IEEE_FLOAT:
+        samples = np.frombuffer(raw, dtype="<f4" if width == 4 else "<f8").astype(np.float32)
+    elif width == 1:
+        samples = (np.frombuffer(raw, dtype=np.uint8).astype(np.float32) - 128.0) / 128.0
+    elif width == 2:
+        samples = np.frombuffer(raw, dtype="<i2").astype(np.float32) / 32768.0
+    elif width == 3:
+        packed = np.frombuffer(raw, dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+        values = packed[:, 0] | (packed[:, 1] << 8) | (packed[:, 2] << 16)
+        values = np.where(values & 0x800000, values - 0x1000000, values)
+        samples = values.astype(np.float32) / 8388608.0
+    elif width == 4:
+        samples = np.frombuffer(raw, dtype="<i4").astype(np.float32) / 2147483648.0
+    else:
+        raise ValueError(f"{info.path} uses unsupported sample width {width}")
+    return samples.reshape(-1, info.channels)
+
+
+def _encode_pcm16(samples: np.ndarray) -> bytes:
+    return (np.clip(samples, -1.0, 1.0) * 32767.0).astype("<i2").tobytes()
+
+
+def _convert_channels(samples: np.ndarray, channels: int) -> np.ndarray:
+    if samples.shape[1] == channels:
+        return samples
+    mono = samples.mean(axis=1, keepdims=True) if samples.shape[1] > 1 else samples
+    return mono if channels == 1 else np.repeat(mono, channels, axis=1)
+
+
+class _LinearResampler:
+    """Streaming linear-interpolation resampler that carries state across blocks."""
+
+    def __init__(self, src_rate: int, dst_rate: int, channels: int) -> None:
+        self.step = src_rate / dst_rate
+        self.pos = 0.0
+        self.tail = np.zeros((0, channels), dtype=np.float32)
+
+    def process(self, block: np.ndarray) -> np.ndarray:
+        data = np.concatenate([self.tail, block]) if len(self.tail) else block
+        last = len(data) - 1
+        if last <= self.pos:
+            self.tail = data
+            return data[:0]
+        count = int(np.ceil((last - self.pos) / self.step))
+        positions = self.pos + self.step * np.arange(count)
+        idx = positions.astype(np.int64)
+        frac = (positions - idx).astype(np.float32)[:, None]
+        out = data[idx] * (1.0 - frac) + data[idx + 1] * frac
+        next_pos = self.pos + self.step * count
+        keep = int(next_pos)
+        self.tail = data[keep:]
+        self.pos = next_pos - keep
+        return out
+
+
+def _read_blocks(handle: BinaryIO, info: WavInfo, block_frames: int) -> Iterator[bytes]:
+    handle.seek(info.data_offset)
+    remaining = info.data_size
+    block_bytes = block_frames * info.block_align
+    while remaining > 0:
+        raw = handle.read(min(block_bytes, remaining))
+        if not raw:
+            break
+        remaining -= len(raw)
+        yield raw
+
+
+def _write_header(handle: BinaryIO, sample_rate: int, channels: int, data_size: int) -> None:
+    block_align = channels * OUTPUT_SAMPLE_WIDTH
+    handle.write(struct.pack(
+        "<4sI4s4sIHHIIHH4sI",
+        b"RIFF", min(36 + data_size, 0xFFFFFFFF), b"WAVE",
+        b"fmt ", 16, WAVE_FORMAT_PCM, channels, sample_rate,
+        sample_rate * block_align, block_align, OUTPUT_SAMPLE_WIDTH * 8,
+        b"data", min(data_size, 0xFFFFFFFF),
+    ))
+
+
+def _crossfade(tail: bytes, head: bytes, channels: int) -> bytes:
+    """Equal-power crossfade between two equally long PCM16 runs."""
+    out_gain = np.frombuffer(tail, dtype="<i2").reshape(-1, channels) / 32768.0
+    in_gain = np.frombuffer(head, dtype="<i2").reshape(-1, channels) / 32768.0
+    ramp = np.linspace(0.0, np.pi / 2, len(out_gain), dtype=np.float32)[:, None]
+    return _encode_pcm16(out_gain * np.cos(ramp) + in_gain * np.sin(ramp))
+
+
+class WavStreamWriter:
+    """Append PCM16 frames to a WAV file and patch the RIFF sizes on close.
+
+    The file is written under a temporary name and renamed into place only
+    when closed cleanly, so an interrupted stitch never leaves a truncated WAV.
+    With `crossfade_frames`, the last frames written are held back so that
+    after `mark_boundary()` they can be crossfaded with what comes next.
+    Every block that reaches the file is also passed to each of `sinks`
+    (anything with a `write(bytes)` method, e.g. an encoder pipe).
+    """
+
+    def __init__(
+        self,
+        output_path: Path,
+        sample_rate: int,
+        channels: int,
+        crossfade_frames: int = 0,
+        sinks: Sequence[PcmSink] = (),
+    ) -> None:
+        self.output_path = output_path
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.block_align = channels * OUTPUT_SAMPLE_WIDTH
+        self.data_size = 0
+        self.fade_bytes = crossfade_frames * self.block_align
+        self.sinks = list(sinks)
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        self.tmp_path = output_path.with_name(f".{output_path.name}.tmp")
+        self._handle = open(self.tmp_path, "wb")
+        _write_header(self._handle, sample_rate, channels, 0)
+        self._silence = memoryview(b"")
+        self._held = b""
+        self._head = b""
+        self._at_boundary = False
+
+    def _emit(self, data: bytes) -> None:
+        self._handle.write(data)
+        self.data_size += len(data)
+        for sink in self.sinks:
+            sink.write(data)
+
+    def write_frames(self, data: bytes) -> None:
+        if not self.fade_bytes:
+            self._emit(data)
+            return
+        if self._at_boundary:
+            self._head += bytes(data)
+            if len(self._head) >= self.fade_bytes:
+                self._flush_boundary()
+            return
+        pending = self._held + bytes(data)
+        split = max(len(pending) - self.fade_bytes, 0)
+        self._emit(pending[:split])
+        self._held = pending[split:]
+
+    def mark_boundary(self) -> None:
+        """Crossfade the held-back tail with the start of the next write."""
+        if self.fade_bytes and self._held:
+            self._at_boundary = True
+
+    def _flush_boundary(self) -> None:
+        head, self._head, self._at_boundary = self._head, b"", False
+        overlap = min(len(self._held), len(head))
+        overlap -= overlap % self.block_align
+        self._emit(self._held[: len(self._held) - overlap])
+        if overlap:
+            self._emit(_crossfade(self._held[len(self._held) - overlap:], head[:overlap], self.channels))
+        self._held = b""
+        self.write_frames(head[overlap:])
+
+    def write_samples(self, samples: np.ndarray) -> None:
+        self.write_frames(_encode_pcm16(samples))
+
+    def write_silence(self, seconds: float, block_frames: int = COPY_FRAMES) -> None:
+        frames = int(round(seconds * self.sample_rate))
+        if not self._silence:
+            self._silence = memoryview(bytes(block_frames * self.block_align))
+        remaining = frames * self.block_align
+        while remaining > 0:
+            chunk = min(remaining, len(self._silence))
+            self.write_frames(self._silence[:chunk])
+            remaining -= chunk
+
+    def close(self) -> Path:
+        if self._at_boundary:
+            self._flush_boundary()
+        self._emit(self._held)
+        self._held = b""
+        if self.data_size % 2:
+            self._handle.write(b"\0")
+        self._handle.seek(0)
+        _write_header(self._handle, self.sample_rate, self.channels, self.data_size)
+        self._handle.close()
+        os.replace(self.tmp_path, self.output_path)
+        return self.output_path
+
+    def abort(self) -> None:
+        self._handle.close()
+        self.tmp_path.unlink(missing_ok=True)
+
+    def __enter__(self) -> "WavStreamWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+def append_wav(writer: WavStreamWriter, path: Path, block_frames: int = COPY_FRAMES) -> int:
+    """Stream one WAV into writer, converting format as needed; returns source frames read."""
+    info = read_wav_info(path)
+    passthrough = (
+        info.format_tag == WAVE_FORMAT_PCM
+        and info.bits_per_sample == OUTPUT_SAMPLE_WIDTH * 8
+        and info.channels == writer.channels
+        and info.sample_rate == writer.sample_rate
+    )
+    resampler = (
+        _LinearResampler(info.sample_rate, writer.sample_rate, writer.channels)
+        if info.sample_rate != writer.sample_rate
+        else None
+    )
+    with open(path, "rb") as handle:
+        for raw in _read_blocks(handle, info, block_frames):
+            if passthrough:
+                writer.write_frames(raw)
+                continue
+            samples = _convert_channels(decode_frames(raw, info), writer.channels)
+            if resampler is not None:
+                samples = resampler.process(samples)
+            writer.write_samples(samples)
+    return info.frames
+
+
+def converted_frames(info: WavInfo, sample_rate: int) -> int:
+    """Frames `append_wav` writes for this input at `sample_rate`, from the header alone."""
+    if info.sample_rate == sample_rate:
+        return info.frames
+    # _LinearResampler emits one frame per step strictly before the last input frame.
+    return max(math.ceil((info.frames - 1) * sample_rate / info.sample_rate), 0)
+
+
+def append_segment(
+    writer: WavStreamWriter,
+    path: Path,
+    silence_duration: float | None,
+    first: bool = False,
+    block_frames: int = COPY_FRAMES,
+) -> None:
+    """Append one segment after `silence_duration` seconds of silence, marking crossfade boundaries."""
+    if not first and silence_duration:
+        writer.mark_boundary()
+        writer.write_silence(silence_duration, block_frames)
+    if not first:
+        writer.mark_boundary()
+    append_wav(writer, path, block_frames)
+
 
+def stitch_wavs(
+    wav_files: Iterable[Path],
+    output_path: Path,
+    silence_duration: float | None = DEFAULT_SILENCE_DURATION,
+    sample_rate: Optional[int] = None,
+    channels: Optional[int] = None,
+    block_frames: int = COPY_FRAMES,
+    crossfade: float = 0.0,
+    sinks: Sequence[PcmSink] = (),
+) -> Path:
+    """Stream segment WAVs into one PCM16 WAV with `silence_duration` seconds between them.
 
-def stitch_wavs(wav_files: Iterable[Path], output_path: Path, silence_duration: float | None = DEFAULT_SILENCE_DURATION) -> Path:
-    """Stub: write a manifest file listing WAV inputs."""
-    output_path.parent.mkdir(parents=True, exist_ok=True)
-    manifest_path = output_path.with_suffix(".manifest.txt")
-    lines = [str(p) for p in wav_files]
-    if silence_duration is not None:
-        lines.append(f"silence_duration={silence_duration}")
-    manifest_path.write_text("\n".join(lines), encoding="utf-8")
+    The output takes the first input's sample rate and channel count unless
+    given; other inputs are converted to match. A `crossfade` (seconds)
+    blends every boundary, including into and out of the silence gaps.
+    """
+    wav_files = list(wav_files)
+    if not wav_files:
+        raise ValueError("no WAV inputs to stitch")
+    first = read_wav_info(wav_files[0])
+    sample_rate = sample_rate or first.sample_rate
+    with WavStreamWriter(
+        output_path,
+        sample_rate,
+        channels or first.channels,
+        crossfade_frames=int(round(crossfade * sample_rate)),
+        sinks=sinks,
+    ) as writer:
+        for idx, path in enumerate(wav_files):
+            append_segment(writer, path, silence_duration, first=not idx, block_frames=block_frames)
     return output_path
 
 
-def transcode_to_mp3(wav_path: Path, mp3_path: Path, bitrate: str = "128k") -> Path:
-    """Stub: write a marker file for MP3 output."""
-    mp3_path.parent.mkdir(parents=True, exist_ok=True)
-    mp3_path.write_text(f"stub mp3 from {wav_path} at {bitrate}", encoding="utf-8")
-    return mp3_path
+def concat_wavs(wav_files: Iterable[Path], output_path: Path) -> Path:
+    """Join WAVs back to back with no gap (e.g. the lines of one segment)."""
+    return stitch_wavs(wav_files, output_path, silence_duration=None)
@@ -0,0 +1,181 @@
+"""Level matching and silence trimming for rendered segment WAVs.
+
+The two quato voices come back at noticeably different levels, with
+uneven leading and trailing silence. Each segment is measured in one pass
+over a memory map of its data (gated loudness in the style of
+ITU-R BS.1770, without the K-weighting filter, plus peak and the first and
+last non-silent 10 ms windows). A second pass then writes the trimmed span
+with a single gain that brings it to the target level without pushing
+peaks over the ceiling. Both passes work in fixed-size blocks, so memory
+stays flat for hour-long audio. Crossfades at segment boundaries are
+applied by `stitch_wavs`.
+"""
+
+from __future__ import annotations
+
+import math
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Iterable, Iterator
+
+import numpy as np
+
+from .audio import WavInfo, WavStreamWriter, decode_frames, read_wav_info
+
+TARGET_LOUDNESS_DB = -16.0
+PEAK_CEILING_DB = -1.0
+MAX_GAIN_DB = 20.0
+SILENCE_THRESHOLD_DB = -50.0
+TRIM_PADDING = 0.05
+DEFAULT_CROSSFADE = 0.03
+
+SILENCE_WINDOW = 0.01
+ENERGY_WINDOW = 0.1
+# Loudness blocks are 400 ms with 75% overlap, i.e. four consecutive energy windows.
+LOUDNESS_BLOCK_WINDOWS = 4
+ABSOLUTE_GATE_DB = -70.0
+RELATIVE_GATE_DB = -10.0
+BLOCK_ENERGY_WINDOWS = 27
+
+
+@dataclass
+class SegmentLevels:
+    frames: int
+    sample_rate: int
+    loudness_db: float
+    peak_db: float
+    start_frame: int
+    end_frame: int
+    gain_db: float = 0.0
+
+
+def _db(value: float) -> float:
+    return 10 * math.log10(value) if value > 0 else float("-inf")
+
+
+def _iter_samples(info: WavInfo, start: int, end: int, block_frames: int) -> Iterator[np.ndarray]:
+    """Decode frames [start, end) block by block from a read-only memory map."""
+    if end <= start:
+        return
+    data = np.memmap(info.path, dtype=np.uint8, mode="r", offset=info.data_offset, shape=(info.data_size,))
+    try:
+        for block_start in range(start, end, block_frames):
+            block_end = min(block_start + block_frames, end)
+            raw = data[block_start * info.block_align: block_end * info.block_align]
+            yield decode_frames(raw.tobytes(), info)
+    finally:
+        del data
+
+
+def measure_levels(path: Path) -> SegmentLevels:
+    info = read_wav_info(path)
+    silence_frames = max(int(info.sample_rate * SILENCE_WINDOW), 1)
+    energy_windows = max(int(round(ENERGY_WINDOW / SILENCE_WINDOW)), 1)
+    energy_frames = silence_frames * energy_windows
+    block_frames = energy_frames * BLOCK_ENERGY_WINDOWS
+
+    window_peaks: list[np.ndarray] = []
+    energies: list[np.ndarray] = []
+    peak = 0.0
+    for samples in _iter_samples(info, 0, info.frames, block_frames):
+        power = np.square(samples).mean(axis=1)
+        magnitude = np.abs(samples).max(axis=1)
+        peak = max(peak, float(magnitude.max(initial=0.0)))
+
+        whole = len(magnitude) // silence_frames * silence_frames
+        peaks = magnitude[:whole].reshape(-1, silence_frames).max(axis=1)
+        if whole < len(magnitude):
+            peaks = np.append(peaks, magnitude[whole:].max())
+        window_peaks.append(peaks)
+
+        whole = len(power) // energy_frames * energy_frames
+        energies.append(power[:whole].reshape(-1, energy_frames).mean(axis=1))
+        if whole < len(power):
+            energies.append(np.array([power[whole:].mean()]))
+
+    peaks = np.concatenate(window_peaks) if window_peaks else np.zeros(0)
+    active = np.nonzero(peaks >= 10 ** (SILENCE_THRESHOLD_DB / 20))[0]
+    if len(active):
+        padding = int(TRIM_PADDING * info.sample_rate)
+        start = max(int(active[0]) * silence_frames - padding, 0)
+        end = min((int(active[-1]) + 1) * silence_frames + padding, info.frames)
+    else:
+        start, end = 0, info.frames
+
+    return SegmentLevels(
+        frames=info.frames,
+        sample_rate=info.sample_rate,
+        loudness_db=_gated_loudness(np.concatenate(energies) if energies else np.zeros(0)),
+        peak_db=20 * math.log10(peak) if peak > 0 else float("-inf"),
+        start_frame=start,
+        end_frame=end,
+    )
+
+
+def _gated_loudness(energies: np.ndarray) -> float:
+    if not len(energies):
+        return float("-inf")
+    if len(energies) >= LOUDNESS_BLOCK_WINDOWS:
+        kernel = np.ones(LOUDNESS_BLOCK_WINDOWS) / LOUDNESS_BLOCK_WINDOWS
+        blocks = np.convolve(energies, kernel, mode="valid")
+    else:
+        blocks = np.array([energies.mean()])
+    blocks = blocks[blocks > 10 ** (ABSOLUTE_GATE_DB / 10)]
+    if not len(blocks):
+        return float("-inf")
+    relative_gate = blocks.mean() * 10 ** (RELATIVE_GATE_DB / 10)
+    gated = blocks[blocks >= relative_gate]
+    return _db(float(gated.mean()))
+
+
+def normalize_wav(
+    src: Path,
+    dst: Path,
+    target_db: float = TARGET_LOUDNESS_DB,
+    trim: bool = True,
+    block_frames: int = 1 << 16,
+) -> SegmentLevels:
+    """Write src's trimmed span to dst as PCM16 with gain toward target_db."""
+    info = read_wav_info(src)
+    levels = measure_levels(src)
+    if math.isfinite(levels.loudness_db):
+        gain_db = min(target_db - levels.loudness_db, MAX_GAIN_DB, PEAK_CEILING_DB - levels.peak_db)
+        levels.gain_db = max(gain_db, -MAX_GAIN_DB)
+    start, end = (levels.start_frame, levels.end_frame) if trim else (0, info.frames)
+    gain = np.float32(10 ** (levels.gain_db / 20))
+
+    with WavStreamWriter(dst, info.sample_rate, info.channels) as writer:
+        for samples in _iter_samples(info, start, end, block_frames):
+            writer.write_samples(samples * gain)
+    return levels
+
+
+def process_segment(
+    path: Path,
+    output_dir: Path,
+    target_db: float = TARGET_LOUDNESS_DB,
+    trim: bool = True,
+) -> tuple[Path, dict]:
+    """Normalize and trim one segment into output_dir; returns its path and JSON-safe levels."""
+    output_path = output_dir / path.name
+    segment_levels = normalize_wav(path, output_path, target_db=target_db, trim=trim)
+    levels = {
+        key: (round(value, 2) if math.isfinite(value) else None) if isinstance(value, float) else value
+        for key, value in asdict(segment_levels).items()
+    }
+    return output_path, levels
+
+
+def process_segments(
+    wav_files: Iterable[Path],
+    output_dir: Path,
+    target_db: float = TARGET_LOUDNESS_DB,
+    trim: bool = True,
+) -> tuple[list[Path], dict[str, dict]]:
+    """Normalize and trim each segment into output_dir; returns paths and per-segment levels."""
+    outputs: list[Path] = []
+    levels: dict[str, dict] = {}
+    for path in wav_files:
+        output_path, levels[path.stem] = process_segment(path, output_dir, target_db=target_db, trim=trim)
+        outputs.append(output_path)
+    return outputs, levels
@@ -1,13 +1,171 @@
-"""Chapters utilities (stub)."""
+"""Chapter markers for DTF:FTL episodes.
+
+Chapter times come from the segment WAVs that were actually stitched, read
+header-only. Each segment's frame count (converted to the episode's sample
+rate), the silence between segments and the frames each crossfade overlaps
+are accumulated in output frames, laid out the way `WavStreamWriter` writes
+them. Nothing is decoded, so chapters for an hour-long episode cost one
+small read per segment.
+
+Chapters are written as Podcasting 2.0 JSON and as ID3v2.3 CHAP frames
+(with a CTOC table of contents) at the front of the MP3.
+"""
 
 from __future__ import annotations
 
 import json
+import os
+import shutil
+import struct
+from dataclasses import dataclass
 from pathlib import Path
+from typing import Optional, Sequence
+
+from .audio import DEFAULT_SILENCE_DURATION, converted_frames, read_wav_info
+
+CHAPTERS_VERSION = "1.2.0"
+CHAPTERS_MIME_TYPE = "application/json+chapters"
+ID3_HEADER_SIZE = 10
+NO_BYTE_OFFSET = 0xFFFFFFFF
+
+
+@dataclass
+class Chapter:
+    title: str
+    start: float
+    end: float
+
+
+def _layout(lengths: Sequence[int], gap: int, fade: int) -> tuple[list[int], int]:
+    """Output frame where each segment starts, and the total frame count.
 
+    Mirrors `append_segment`: a gap of silence before every segment but the
+    first, and at each boundary the next piece overlaps the previous one by
+    up to `fade` frames (bounded by how much of either piece there is).
+    """
+    starts: list[int] = []
+    position = held = 0
+    for idx, frames in enumerate(lengths):
+        pieces = [(gap, False), (frames, True)] if idx and gap else [(frames, True)]
+        for piece, is_segment in pieces:
+            overlap = min(held, piece)
+            position -= overlap
+            if is_segment:
+                starts.append(position)
+            if piece:
+                held = min(fade, piece - overlap)
+            position += piece
+    return starts, position
 
-def generate_chapters_stub(output_path: Path, segments: list[str]) -> Path:
+
+def compute_chapters(
+    segments: Sequence[tuple[Path, Optional[str]]],
+    silence_duration: float | None = DEFAULT_SILENCE_DURATION,
+    crossfade: float = 0.0,
+    sample_rate: Optional[int] = None,
+) -> list[Chapter]:
+    """Chapters for (wav, title) segments stitched in order with these settings.
+
+    A segment titled None (e.g. an interstitial) extends the chapter before
+    it; each chapter runs until the next one starts.
+    """
+    if not segments:
+        return []
+    infos = [read_wav_info(path) for path, _ in segments]
+    rate = sample_rate or infos[0].sample_rate
+    gap = int(round(silence_duration * rate)) if silence_duration else 0
+    starts, total = _layout(
+        [converted_frames(info, rate) for info in infos], gap, int(round(crossfade * rate))
+    )
+
+    marks: list[tuple[str, int]] = []
+    for (path, title), start in zip(segments, starts):
+        if title is None and marks:
+            continue
+        marks.append((title if title is not None else path.stem, start))
+    ends = [start for _, start in marks[1:]] + [total]
+    return [Chapter(title, start / rate, end / rate) for (title, start), end in zip(marks, ends)]
+
+
+def chapters_json(chapters: Sequence[Chapter]) -> dict:
+    return {
+        "version": CHAPTERS_VERSION,
+        "chapters": [
+            {"startTime": round(chapter.start, 3), "endTime": round(chapter.end, 3), "title": chapter.title}
+            for chapter in chapters
+        ],
+    }
+
+
+def write_chapters_json(output_path: Path, chapters: Sequence[Chapter]) -> Path:
     output_path.parent.mkdir(parents=True, exist_ok=True)
-    payload = {"chapters": [{"title": name, "start": 0} for name in segments]}
-    output_path.write_text(json.dumps(payload, indent=2), encoding="utf-8")
+    tmp_path = output_path.with_name(f".{output_path.name}.tmp")
+    tmp_path.write_text(json.dumps(chapters_json(chapters), indent=2), encoding="utf-8")
+    os.replace(tmp_path, output_path)
     return output_path
+
+
+def _syncsafe(value: int) -> bytes:
+    return bytes((value >> shift) & 0x7F for shift in (21, 14, 7, 0))
+
+
+def _id3_frame(frame_id: bytes, body: bytes) -> bytes:
+    return frame_id + struct.pack(">IH", len(body), 0) + body
+
+
+def _text_frame(frame_id: bytes, text: str) -> bytes:
+    # Encoding 1: UTF-16 with BOM, the only Unicode encoding ID3v2.3 has.
+    return _id3_frame(frame_id, b"\x01" + text.encode("utf-16") + b"\0\0")
+
+
+def id3_chapter_tag(chapters: Sequence[Chapter]) -> bytes:
+    """An ID3v2.3 tag holding a CTOC frame and one CHAP frame (with TIT2 title) per chapter."""
+    if len(chapters) > 255:
+        raise ValueError("ID3 CTOC frames hold at most 255 chapters")
+    element_ids = [f"chp{idx}".encode("ascii") + b"\0" for idx in range(len(chapters))]
+    # Flags 0x03: top-level table of contents, entries ordered.
+    frames = [_id3_frame(b"CTOC", b"toc\0" + bytes([0x03, len(chapters)]) + b"".join(element_ids))]
+    for element_id, chapter in zip(element_ids, chapters):
+        times = struct.pack(
+            ">IIII", int(round(chapter.start * 1000)), int(round(chapter.end * 1000)), NO_BYTE_OFFSET, NO_BYTE_OFFSET
+        )
+        frames.append(_id3_frame(b"CHAP", element_id + times + _text_frame(b"TIT2", chapter.title)))
+    body = b"".join(frames)
+    return b"ID3" + bytes([3, 0, 0]) + _syncsafe(len(body)) + body
+
+
+def _id3v2_size(header: bytes) -> int:
+    """Total size of the ID3v2 tag this header starts, or 0 if it is not one."""
+    if len(header) < ID3_HEADER_SIZE or header[:3] != b"ID3":
+        return 0
+    size = 0
+    for byte in header[6:10]:
+        size = (size << 7) | (byte & 0x7F)
+    footer = ID3_HEADER_SIZE if header[5] & 0x10 else 0
+    return ID3_HEADER_SIZE + size + footer
+
+
+def read_id3_tag(mp3_path: Path) -> bytes:
+    with open(mp3_path, "rb") as handle:
+        header = handle.read(ID3_HEADER_SIZE)
+        size = _id3v2_size(header)
+        return header + handle.read(size - ID3_HEADER_SIZE) if size else b""
+
+
+def has_id3_chapters(mp3_path: Path) -> bool:
+    return mp3_path.exists() and b"CTOC" in read_id3_tag(mp3_path)
+
+
+def write_id3_chapters(mp3_path: Path, chapters: Sequence[Chapter]) -> Path:
+    """Replace any ID3v2 tag at the front of mp3_path with one holding the chapters."""
+    tmp_path = mp3_path.with_name(f".{mp3_path.name}.tmp")
+    try:
+        with open(mp3_path, "rb") as src, open(tmp_path, "wb") as dst:
+            src.seek(_id3v2_size(src.read(ID3_HEADER_SIZE)))
+            dst.write(id3_chapter_tag(chapters))
+            shutil.copyfileobj(src, dst, 1 << 20)
+        os.replace(tmp_path, mp3_path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+    return mp3_path
@@ -0,0 +1,56 @@
+"""Daemon-thread helpers for work that may be abandoned at a timeout.
+
+`concurrent.futures` joins its worker threads at interpreter exit, so a
+fetch stuck in a socket read keeps the process alive after the caller has
+given up on it. Work started here runs on daemon threads instead.
+"""
+
+from __future__ import annotations
+
+import threading
+from concurrent.futures import Future
+from typing import Callable, Iterable, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+def start_daemon(name: str, func: Callable[[], R]) -> Future:
+    """Run func on a daemon thread and return a Future for its result."""
+    future: Future = Future()
+
+    def run() -> None:
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            future.set_result(func())
+        except BaseException as exc:
+            future.set_exception(exc)
+
+    threading.Thread(target=run, name=name, daemon=True).start()
+    return future
+
+
+def daemon_map(func: Callable[[T], R], items: Iterable[T], max_workers: int, name: str) -> list[R]:
+    """Like `Executor.map` on up to max_workers daemon threads.
+
+    Results come back in input order; the first error a worker hits is re-raised.
+    """
+    items = list(items)
+    results: list = [None] * len(items)
+    pending = iter(enumerate(items))
+    lock = threading.Lock()
+
+    def work() -> None:
+        while True:
+            with lock:
+                item = next(pending, None)
+            if item is None:
+                return
+            index, value = item
+            results[index] = func(value)
+
+    workers = [start_daemon(f"{name}-{n}", work) for n in range(min(max(1, max_workers), len(items)))]
+    for worker in workers:
+        worker.result()
+    return results
@@ -0,0 +1,146 @@
+"""Semantic near-duplicate detection for DTF:FTL stories.
+
+Exact dedup in storage only catches repeated ids, URLs and arXiv ids. The
+same release still shows up as several Reddit posts plus a paper, so this
+groups stories whose embeddings are close and keeps one canonical story per
+group, carrying the others' discussion along with it. It also screens
+candidates against vectors from recent episodes so yesterday's topic does
+not come back under a new URL.
+"""
+
+from __future__ import annotations
+
+from dataclasses import replace
+from typing import Sequence
+
+import numpy as np
+
+from .models import Story
+
+NEAR_DUPLICATE_THRESHOLD = 0.88
+NOVELTY_THRESHOLD = 0.85
+MAX_MERGED_HIGHLIGHT_CHARS = 300
+
+
+def _unit_rows(vectors: Sequence[Sequence[float]]) -> np.ndarray:
+    matrix = np.asarray(vectors, dtype=np.float32)
+    if matrix.ndim != 2:
+        matrix = matrix.reshape(len(vectors), -1)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def cluster_indices(vectors: Sequence[Sequence[float]], threshold: float = NEAR_DUPLICATE_THRESHOLD) -> list[list[int]]:
+    """Group indices whose cosine similarity links them at or above threshold.
+
+    Similarities come from one matrix product; groups are the connected
+    components of the thresholded similarity graph, ordered by first member.
+    """
+    count = len(vectors)
+    if count == 0:
+        return []
+    unit = _unit_rows(vectors)
+    similar = np.triu(unit @ unit.T >= threshold, k=1)
+
+    parent = list(range(count))
+
+    def find(idx: int) -> int:
+        while parent[idx] != idx:
+            parent[idx] = parent[parent[idx]]
+            idx = parent[idx]
+        return idx
+
+    for left, right in zip(*np.nonzero(similar)):
+        root_left, root_right = find(int(left)), find(int(right))
+        if root_left != root_right:
+            parent[max(root_left, root_right)] = min(root_left, root_right)
+
+    groups: dict[int, list[int]] = {}
+    for idx in range(count):
+        groups.setdefault(find(idx), []).append(idx)
+    return list(groups.values())
+
+
+def _canonical_rank(story: Story) -> tuple:
+    meta = story.source_meta
+    return (bool(meta.extra.get("arxiv_id")), meta.score or 0, meta.comments or 0)
+
+
+def _highlight(story: Story) -> str:
+    meta = story.source_meta
+    origin = f"r/{meta.subreddit}" if meta.subreddit else meta.source
+    detail = (
+        meta.extra.get("discussion_highlights")
+        or meta.extra.get("comments_summary")
+        or story.summary
+        or ""
+    )
+    detail = " ".join(detail.split())
+    if len(detail) > MAX_MERGED_HIGHLIGHT_CHARS:
+        detail = detail[: MAX_MERGED_HIGHLIGHT_CHARS - 3].rstrip() + "..."
+    return f"{origin}: {story.title}" + (f" — {detail}" if detail else "")
+
+
+def merge_cluster(stories: Sequence[Story]) -> Story:
+    """Return a copy of the cluster's canonical story with the rest folded in."""
+    canonical = max(stories, key=_canonical_rank)
+    duplicates = [story for story in stories if story is not canonical]
+    if not duplicates:
+        return canonical
+
+    extra = dict(canonical.source_meta.extra)
+    highlights = [extra.get("discussion_highlights") or ""]
+    highlights.extend(_highlight(story) for story in duplicates)
+    extra["discussion_highlights"] = "\n".join(text for text in highlights if text)
+    extra["merged_story_ids"] = [story.id for story in duplicates]
+    extra["merged_urls"] = [story.source_url for story in duplicates if story.source_url]
+    meta = replace(canonical.source_meta, extra=extra)
+    tags = list(dict.fromkeys(tag for story in stories for tag in story.tags))
+    return replace(canonical, source_meta=meta, tags=tags)
+
+
+def merge_near_duplicates(
+    stories: Sequence[Story],
+    vectors: Sequence[Sequence[float]],
+    threshold: float = NEAR_DUPLICATE_THRESHOLD,
+) -> list[Story]:
+    """Collapse near-duplicate stories to one canonical story per cluster, keeping input order."""
+    if len(stories) != len(vectors):
+        raise ValueError("stories and vectors must have the same length")
+    return [merge_cluster([stories[idx] for idx in group]) for group in cluster_indices(vectors, threshold)]
+
+
+def max_similarity(vectors: Sequence[Sequence[float]], history: np.ndarray) -> np.ndarray:
+    """Highest cosine similarity of each vector against any row of history."""
+    if len(vectors) == 0 or len(history) == 0:
+        return np.zeros(len(vectors), dtype=np.float32)
+    return (_unit_rows(vectors) @ _unit_rows(history).T).max(axis=1)
+
+
+def filter_novel_stories(
+    stories: Sequence[Story],
+    vectors: Sequence[Sequence[float]],
+    history: np.ndarray,
+    threshold: float = NOVELTY_THRESHOLD,
+    demote: bool = False,
+) -> tuple[list[Story], list[Sequence[float]], dict]:
+    """Drop (or move to the back) stories too similar to recently covered ones.
+
+    Returns the kept stories, their vectors and stats for the manifest.
+    """
+    scores = max_similarity(vectors, history)
+    repeats = [idx for idx, score in enumerate(scores) if score >= threshold]
+    repeat_set = set(repeats)
+    fresh = [idx for idx in range(len(stories)) if idx not in repeat_set]
+    order = fresh + repeats if demote else fresh
+
+    stats = {
+        "history_vectors": int(len(history)),
+        "candidates": len(stories),
+        "threshold": threshold,
+        "action": "demoted" if demote else "dropped",
+        "repeats": len(repeats),
+        "repeat_stories": {stories[idx].id: round(float(scores[idx]), 4) for idx in repeats},
+    }
+    return [stories[idx] for idx in order], [vectors[idx] for idx in order], stats
@@ -0,0 +1,244 @@
+"""Persistent on-disk embedding cache for DTF:FTL.
+
+Vectors are keyed by (model name, normalized-text hash) and stored in a
+memory-mapped float32 matrix with a JSON index next to it. Each slot also
+records the key it holds, so a stale index can never return the wrong vector.
+"""
+
+from __future__ import annotations
+
+import fcntl
+import hashlib
+import json
+import os
+import re
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, Optional, Sequence
+
+import numpy as np
+
+PROJECT_ROOT = Path(__file__).parent.parent
+EMBEDDING_CACHE_DIR = PROJECT_ROOT / "data" / "embedding_cache"
+
+DEFAULT_MAX_ENTRIES = 50_000
+KEY_DTYPE = "S64"
+
+
+def normalize_text(text: str) -> str:
+    return " ".join(text.split())
+
+
+def cache_key(model_name: str, text: str) -> str:
+    payload = f"{model_name}\0{normalize_text(text)}".encode("utf-8")
+    return hashlib.sha256(payload).hexdigest()
+
+
+def _slug(model_name: str) -> str:
+    return re.sub(r"[^A-Za-z0-9._-]+", "_", model_name)
+
+
+class EmbeddingCache:
+    """Size-bounded LRU cache of embedding vectors for a single model."""
+
+    def __init__(
+        self,
+        model_name: str,
+        root: Path = EMBEDDING_CACHE_DIR,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+    ) -> None:
+        if max_entries < 1:
+            raise ValueError("max_entries must be positive")
+        self.model_name = model_name
+        self.max_entries = max_entries
+        self.cache_dir = root / _slug(model_name)
+        self.index_path = self.cache_dir / "index.json"
+        self.vectors_path = self.cache_dir / "vectors.f32"
+        self.keys_path = self.cache_dir / "keys.bin"
+        self.lock_path = self.cache_dir / ".lock"
+
+        self.hits = 0
+        self.misses = 0
+        self._saved_hits = 0
+        self._saved_misses = 0
+        self._index: dict = {}
+        self._index_mtime: Optional[float] = None
+        self._vectors: Optional[np.memmap] = None
+        self._keys: Optional[np.memmap] = None
+        self._touched: set[str] = set()
+
+    # -- locking and files -------------------------------------------------
+
+    @contextmanager
+    def _locked(self, exclusive: bool) -> Iterator[None]:
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        with open(self.lock_path, "a+") as handle:
+            fcntl.flock(handle, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(handle, fcntl.LOCK_UN)
+
+    def _load_index(self) -> None:
+        try:
+            mtime = self.index_path.stat().st_mtime
+        except FileNotFoundError:
+            self._index = {}
+            self._index_mtime = None
+            self._vectors = None
+            self._keys = None
+            return
+        if mtime == self._index_mtime and self._vectors is not None:
+            return
+        self._index = json.loads(self.index_path.read_text(encoding="utf-8"))
+        self._index_mtime = mtime
+        self._open_arrays(self._index["dim"], self._index["capacity"])
+
+    def _open_arrays(self, dim: int, capacity: int) -> None:
+        self._vectors = np.memmap(self.vectors_path, dtype=np.float32, mode="r+", shape=(capacity, dim))
+        self._keys = np.memmap(self.keys_path, dtype=KEY_DTYPE, mode="r+", shape=(capacity,))
+
+    def _resize_files(self, dim: int, capacity: int) -> None:
+        itemsize = np.dtype(KEY_DTYPE).itemsize
+        for path, size in ((self.vectors_path, capacity * dim * 4), (self.keys_path, capacity * itemsize)):
+            with open(path, "ab") as handle:
+                handle.truncate(size)
+        self._open_arrays(dim, capacity)
+
+    def _save_index(self) -> None:
+        tmp_path = self.index_path.with_suffix(".json.tmp")
+        tmp_path.write_text(json.dumps(self._index), encoding="utf-8")
+        os.replace(tmp_path, self.index_path)
+        self._index_mtime = self.index_path.stat().st_mtime
+
+    def _init_index(self, dim: int) -> None:
+        self._index = {"dim": dim, "capacity": 0, "clock": 0, "hits": 0, "misses": 0, "entries": {}}
+        for path in (self.vectors_path, self.keys_path):
+            if path.exists():
+                path.unlink()
+
+    def _ensure_capacity(self) -> None:
+        index = self._index
+        if index["capacity"] == self.max_entries:
+            return
+        if index["capacity"] > self.max_entries:
+            index["entries"] = {
+                key: entry for key, entry in index["entries"].items() if entry[0] < self.max_entries
+            }
+        index["capacity"] = self.max_entries
+        self._resize_files(index["dim"], index["capacity"])
+
+    # -- public API --------------------------------------------------------
+
+    def get_many(self, texts: Sequence[str]) -> list[Optional[list[float]]]:
+        """Return cached vectors for texts, with None for every miss."""
+        results: list[Optional[list[float]]] = [None] * len(texts)
+        if not texts:
+            return results
+        with self._locked(exclusive=False):
+            self._load_index()
+            entries = self._index.get("entries", {})
+            for idx, text in enumerate(texts):
+                key = cache_key(self.model_name, text)
+                entry = entries.get(key)
+                if entry is None or self._keys is None or entry[0] >= len(self._keys):
+                    continue
+                slot = entry[0]
+                if self._keys[slot].decode("ascii") != key:
+                    continue
+                results[idx] = self._vectors[slot].tolist()
+                self._touched.add(key)
+        hit_count = sum(1 for vector in results if vector is not None)
+        self.hits += hit_count
+        self.misses += len(texts) - hit_count
+        return results
+
+    def put_many(self, texts: Sequence[str], vectors: Sequence[Sequence[float]]) -> None:
+        """Insert vectors, evicting least recently used entries when full."""
+        if not texts:
+            self.flush()
+            return
+        matrix = np.asarray(vectors, dtype=np.float32)
+        keys: dict[str, int] = {}
+        for idx, text in enumerate(texts):
+            keys.setdefault(cache_key(self.model_name, text), idx)
+
+        with self._locked(exclusive=True):
+            self._load_index()
+            if not self._index or self._index["dim"] != matrix.shape[1]:
+                self._init_index(matrix.shape[1])
+            self._ensure_capacity()
+            index = self._index
+            entries: dict[str, list[int]] = index["entries"]
+            self._apply_touches(entries)
+            clock = index["clock"] + 1
+            index["clock"] = clock
+
+            pending = [key for key in keys if key not in entries]
+            pending = pending[-index["capacity"]:]
+            used = {entry[0] for entry in entries.values()}
+            free = [slot for slot in range(index["capacity"]) if slot not in used]
+            shortfall = len(pending) - len(free)
+            if shortfall > 0:
+                victims = sorted(entries, key=lambda key: entries[key][1])[:shortfall]
+                for key in victims:
+                    free.append(entries.pop(key)[0])
+
+            for key, slot in zip(pending, free):
+                self._vectors[slot] = matrix[keys[key]]
+                self._keys[slot] = key.encode("ascii")
+                entries[key] = [slot, clock]
+            self._vectors.flush()
+            self._keys.flush()
+            self._save_counters()
+
+    def flush(self) -> None:
+        """Persist LRU touches and hit/miss counters."""
+        if not self._touched and not (self.hits or self.misses):
+            return
+        with self._locked(exclusive=True):
+            self._load_index()
+            if not self._index:
+                self._touched.clear()
+                return
+            self._apply_touches(self._index["entries"])
+            self._save_counters()
+
+    def _apply_touches(self, entries: dict[str, list[int]]) -> None:
+        if not self._touched:
+            return
+        self._index["clock"] += 1
+        clock = self._index["clock"]
+        for key in self._touched:
+            if key in entries:
+                entries[key][1] = clock
+        self._touched.clear()
+
+    def _save_counters(self) -> None:
+        self._index["hits"] = self._index.get("hits", 0) + self.hits
+        self._index["misses"] = self._index.get("misses", 0) + self.misses
+        self._saved_hits += self.hits
+        self._saved_misses += self.misses
+        self.hits = 0
+        self.misses = 0
+        self._save_index()
+
+    def stats(self) -> dict:
+        """Hit/miss counts for this process plus lifetime totals on disk."""
+        hits = self._saved_hits + self.hits
+        misses = self._saved_misses + self.misses
+        total = hits + misses
+        with self._locked(exclusive=False):
+            self._load_index()
+        index = self._index
+        lifetime_hits = index.get("hits", 0) + self.hits
+        lifetime_total = lifetime_hits + index.get("misses", 0) + self.misses
+        return {
+            "model": self.model_name,
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / total if total else 0.0,
+            "lifetime_hit_rate": lifetime_hits / lifetime_total if lifetime_total else 0.0,
+            "entries": len(index.get("entries", {})),
+            "capacity": index.get("capacity", self.max_entries),
+        }
@@ -0,0 +1,61 @@
+"""Token-budget batch scheduling for local embeddings.
+
+Texts are measured in tokens (capped at the model's max sequence length),
+sorted longest-first and packed into batches whose padded size
+(batch length x longest member) stays under a token budget. Short titles
+end up in large batches and long selftexts in small ones, so little
+attention compute is spent on padding.
+"""
+
+from __future__ import annotations
+
+from typing import Sequence
+
+DEFAULT_TOKEN_BUDGET = 16_384
+DEFAULT_MAX_BATCH_SIZE = 256
+# Upper bound on characters per token, used to clip huge texts before tokenizing.
+MAX_CHARS_PER_TOKEN = 16
+
+
+def clip_text(text: str, max_seq_length: int) -> str:
+    """Drop text that could never survive truncation to max_seq_length tokens."""
+    return text[: max_seq_length * MAX_CHARS_PER_TOKEN]
+
+
+def token_lengths(tokenizer, texts: Sequence[str], max_seq_length: int) -> list[int]:
+    """Token count per text including special tokens, truncated to max_seq_length."""
+    encoded = tokenizer(
+        list(texts),
+        add_special_tokens=True,
+        truncation=True,
+        max_length=max_seq_length,
+    )
+    return [len(ids) for ids in encoded["input_ids"]]
+
+
+def plan_batches(
+    lengths: Sequence[int],
+    token_budget: int = DEFAULT_TOKEN_BUDGET,
+    max_batch_size: int = DEFAULT_MAX_BATCH_SIZE,
+) -> list[list[int]]:
+    """Group text indices into batches whose padded token count fits the budget.
+
+    Batches are returned longest-first; every index appears exactly once.
+    A single text longer than the budget still gets its own batch.
+    """
+    order = sorted(range(len(lengths)), key=lambda idx: lengths[idx], reverse=True)
+    batches: list[list[int]] = []
+    current: list[int] = []
+    current_max = 0
+    for idx in order:
+        length = max(lengths[idx], 1)
+        padded_max = max(current_max, length)
+        if current and (padded_max * (len(current) + 1) > token_budget or len(current) >= max_batch_size):
+            batches.append(current)
+            current = []
+            padded_max = length
+        current.append(idx)
+        current_max = padded_max
+    if current:
+        batches.append(current)
+    return batches
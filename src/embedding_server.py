@@ -0,0 +1,179 @@
+"""Long-lived local embedding worker for DTF:FTL.
+
+Loads the embedding model once and serves batches over a Unix socket so
+pipeline runs and scripts skip the SentenceTransformer cold start. Start it with:
+
+    python -m src.embedding_server
+
+`embed_batch` uses the worker automatically whenever its socket exists.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import socket
+import socketserver
+import struct
+import threading
+from pathlib import Path
+from typing import Callable, Optional
+
+import numpy as np
+
+PROJECT_ROOT = Path(__file__).parent.parent
+DEFAULT_SOCKET_PATH = PROJECT_ROOT / "data" / "embedding.sock"
+REQUEST_TIMEOUT = 600
+
+_HEADER_LENGTH = struct.Struct("!I")
+
+
+class EmbeddingServerError(RuntimeError):
+    pass
+
+
+def get_socket_path() -> Path:
+    return Path(os.environ.get("DTFFTL_EMBEDDING_SOCKET", DEFAULT_SOCKET_PATH))
+
+
+def _recv_exact(sock: socket.socket, size: int) -> bytes:
+    chunks = []
+    remaining = size
+    while remaining:
+        chunk = sock.recv(min(remaining, 1 << 20))
+        if not chunk:
+            raise EmbeddingServerError("connection closed mid-message")
+        chunks.append(chunk)
+        remaining -= len(chunk)
+    return b"".join(chunks)
+
+
+def send_message(sock: socket.socket, header: dict, payload: bytes = b"") -> None:
+    header = dict(header, payload_bytes=len(payload))
+    encoded = json.dumps(header).encode("utf-8")
+    sock.sendall(_HEADER_LENGTH.pack(len(encoded)) + encoded + payload)
+
+
+def recv_message(sock: socket.socket) -> tuple[dict, bytes]:
+    (length,) = _HEADER_LENGTH.unpack(_recv_exact(sock, _HEADER_LENGTH.size))
+    header = json.loads(_recv_exact(sock, length).decode("utf-8"))
+    payload = _recv_exact(sock, header.get("payload_bytes", 0))
+    return header, payload
+
+
+def request_embeddings(
+    texts: list[str],
+    model_name: str,
+    socket_path: Path | None = None,
+    timeout: float = REQUEST_TIMEOUT,
+) -> Optional[list[list[float]]]:
+    """Embed texts through a running worker.
+
+    Returns None when no worker is listening or it serves a different model,
+    so callers can fall back to loading the model in-process.
+    """
+    path = socket_path or get_socket_path()
+    if os.environ.get("DTFFTL_EMBEDDING_SERVER", "1").lower() in {"0", "off", "false", "no"}:
+        return None
+    if not path.exists():
+        return None
+
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(timeout)
+            sock.connect(str(path))
+            send_message(sock, {"op": "embed", "model": model_name, "texts": texts})
+            header, payload = recv_message(sock)
+    except (OSError, EmbeddingServerError):
+        return None
+
+    if header.get("error"):
+        print(f"Embedding server declined request: {header['error']}")
+        return None
+    vectors = np.frombuffer(payload, dtype=np.float32).reshape(header["count"], header["dim"])
+    return vectors.tolist()
+
+
+class _Handler(socketserver.BaseRequestHandler):
+    def handle(self) -> None:
+        server: EmbeddingServer = self.server  # type: ignore[assignment]
+        while True:
+            try:
+                header, _ = recv_message(self.request)
+            except (OSError, EmbeddingServerError, struct.error):
+                return
+            op = header.get("op")
+            if op != "embed":
+                send_message(self.request, {"error": f"unknown op {op!r}"})
+                continue
+            if header.get("model") != server.model_name:
+                send_message(self.request, {"error": f"server model is {server.model_name}"})
+                continue
+            texts = header.get("texts") or []
+            try:
+                with server.encode_lock:
+                    vectors = server.encode_fn(texts) if texts else []
+            except Exception as exc:
+                send_message(self.request, {"error": f"encode failed: {exc}"})
+                continue
+            matrix = np.asarray(vectors, dtype=np.float32).reshape(len(texts), -1)
+            send_message(
+                self.request,
+                {"model": server.model_name, "count": matrix.shape[0], "dim": matrix.shape[1]},
+                matrix.tobytes(),
+            )
+
+
+class EmbeddingServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Unix-socket server that runs every batch through one shared encoder."""
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        socket_path: Path,
+        model_name: str,
+        encode_fn: Callable[[list[str]], list[list[float]]],
+    ) -> None:
+        self.socket_path = Path(socket_path)
+        self.model_name = model_name
+        self.encode_fn = encode_fn
+        self.encode_lock = threading.Lock()
+        self.socket_path.parent.mkdir(parents=True, exist_ok=True)
+        if self.socket_path.exists():
+            self.socket_path.unlink()
+        super().__init__(str(self.socket_path), _Handler)
+        os.chmod(self.socket_path, 0o600)
+
+    def server_close(self) -> None:
+        super().server_close()
+        if self.socket_path.exists():
+            self.socket_path.unlink()
+
+
+def serve(socket_path: Path | None = None) -> None:
+    from .embeddings import _encode_local, active_model_name
+
+    path = socket_path or get_socket_path()
+    model_name = active_model_name()
+    _encode_local(["warmup"])
+    server = EmbeddingServer(path, model_name, _encode_local)
+    print(f"Embedding server ready on {path} ({model_name})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Serve DTF:FTL embeddings over a Unix socket")
+    parser.add_argument("--socket", help=f"Socket path (default {DEFAULT_SOCKET_PATH})")
+    args = parser.parse_args()
+    serve(Path(args.socket) if args.socket else None)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,9 @@
 """
 Vector embeddings for DTF:FTL.
 Uses sentence-transformers by default, with an optional OpenAI fallback.
+Set DTFFTL_EMBEDDINGS=onnx to run the model through ONNX Runtime with int8
+dynamic quantization on CPU-only hosts.
+When a warm worker from `src.embedding_server` is running, batches are sent to it instead.
 """
 
 from __future__ import annotations
@@ -8,14 +11,30 @@ from __future__ import annotations
 from pathlib import Path
 from typing import Optional, TYPE_CHECKING
 import os
+import platform
+
+from .embedding_cache import DEFAULT_MAX_ENTRIES, EmbeddingCache, normalize_text
+from .embedding_scheduler import DEFAULT_TOKEN_BUDGET, clip_text, plan_batches, token_lengths
+from .embedding_server import request_embeddings
 
 PROJECT_ROOT = Path(__file__).parent.parent
 VECTORS_DIR = PROJECT_ROOT / "data" / "vectors"
+ONNX_DIR = PROJECT_ROOT / "data" / "onnx"
 
 EMBEDDING_MODEL = "BAAI/bge-large-en-v1.5"
 EMBEDDING_DIM = 1024
+OPENAI_EMBEDDING_MODEL = "text-embedding-3-large"
+
+# Minimum cosine similarity between int8 ONNX vectors and fp32 torch vectors
+# for the same text; checked by scripts/bench_embeddings.py --onnx.
+ONNX_MIN_COSINE = 0.99
+
+# ANN search knobs; see scripts/bench_vector_index.py for recall/latency trade-offs.
+DEFAULT_NPROBES = 20
+DEFAULT_REFINE_FACTOR = 10
 
-_model = None
+_models: dict[str, object] = {}
+_caches: dict[str, EmbeddingCache] = {}
 if TYPE_CHECKING:
     import lancedb
 
@@ -35,16 +54,74 @@ def _get_device() -> str:
     return "cpu"
 
 
-def _get_model():
-    global _model
-    if _model is None:
-        from sentence_transformers import SentenceTransformer
+def _embedding_backend() -> str:
+    backend = os.environ.get("DTFFTL_EMBEDDINGS", "").lower()
+    return backend if backend in {"openai", "onnx"} else "torch"
+
+
+def _onnx_quantization_config() -> str:
+    configured = os.environ.get("DTFFTL_ONNX_QUANTIZATION")
+    if configured:
+        return configured
+    if platform.machine().lower() in {"arm64", "aarch64"}:
+        return "arm64"
+    return "avx2"
+
+
+def active_model_name() -> str:
+    """Name of the model behind the current backend, used to key caches and the worker."""
+    backend = _embedding_backend()
+    if backend == "openai":
+        return OPENAI_EMBEDDING_MODEL
+    if backend == "onnx":
+        return f"{EMBEDDING_MODEL}+onnx-qint8-{_onnx_quantization_config()}"
+    return EMBEDDING_MODEL
+
+
+def _load_torch_model():
+    from sentence_transformers import SentenceTransformer
+
+    device = _get_device()
+    print(f"Loading embedding model on {device}...")
+    model = SentenceTransformer(EMBEDDING_MODEL, device=device)
+    print(f"Model loaded: {EMBEDDING_MODEL}")
+    return model
+
+
+def _load_onnx_model():
+    try:
+        from sentence_transformers import SentenceTransformer, export_dynamic_quantized_onnx_model
+    except Exception as exc:
+        raise RuntimeError(
+            "ONNX backend needs sentence-transformers>=3.2 with onnx extras. "
+            "Install `sentence-transformers[onnx]` or unset DTFFTL_EMBEDDINGS."
+        ) from exc
+
+    config = _onnx_quantization_config()
+    model_dir = ONNX_DIR / EMBEDDING_MODEL.replace("/", "__")
+    file_name = f"onnx/model_qint8_{config}.onnx"
+    if not (model_dir / file_name).exists():
+        print(f"Exporting {EMBEDDING_MODEL} to int8 ONNX ({config})...")
+        fp32_model = SentenceTransformer(EMBEDDING_MODEL, device="cpu", backend="onnx")
+        fp32_model.save_pretrained(str(model_dir))
+        export_dynamic_quantized_onnx_model(fp32_model, config, str(model_dir))
+
+    print("Loading embedding model on cpu (onnx int8)...")
+    model = SentenceTransformer(
+        str(model_dir),
+        device="cpu",
+        backend="onnx",
+        model_kwargs={"file_name": file_name},
+    )
+    print(f"Model loaded: {active_model_name()}")
+    return model
 
-        device = _get_device()
-        print(f"Loading embedding model on {device}...")
-        _model = SentenceTransformer(EMBEDDING_MODEL, device=device)
-        print(f"Model loaded: {EMBEDDING_MODEL}")
-    return _model
+
+def _get_model(backend: str | None = None):
+    backend = backend or _embedding_backend()
+    if backend not in _models:
+        _models[backend] = _load_onnx_model() if backend == "onnx" else _load_torch_model()
+    return _models[backend]
 
 
 def get_db() -> "lancedb.DBConnection":
@@ -69,24 +146,93 @@ def _embed_with_openai(texts: list[str]) -> list[list[float]]:
 
     client = OpenAI(api_key=api_key)
     response = client.embeddings.create(
-        model="text-embedding-3-large",
+        model=OPENAI_EMBEDDING_MODEL,
         input=texts,
     )
     return [item.embedding for item in response.data]
 
 
+def get_embedding_cache(model_name: str | None = None) -> Optional[EmbeddingCache]:
+    """Return the on-disk cache for a model, or None when disabled via DTFFTL_EMBEDDING_CACHE=0."""
+    if os.environ.get("DTFFTL_EMBEDDING_CACHE", "1").lower() in {"0", "off", "false", "no"}:
+        return None
+    model_name = model_name or active_model_name()
+    cache = _caches.get(model_name)
+    if cache is None:
+        max_entries = int(os.environ.get("DTFFTL_EMBEDDING_CACHE_SIZE", DEFAULT_MAX_ENTRIES))
+        cache = EmbeddingCache(model_name, max_entries=max_entries)
+        _caches[model_name] = cache
+    return cache
+
+
+def _encode(texts: list[str], show_progress: bool = False) -> list[list[float]]:
+    if _embedding_backend() == "openai":
+        return _embed_with_openai(texts)
+
+    vectors = request_embeddings(texts, active_model_name())
+    if vectors is not None:
+        return vectors
+    return _encode_local(texts, show_progress=show_progress)
+
+
+def _encode_local(
+    texts: list[str],
+    show_progress: bool = False,
+    backend: str | None = None,
+) -> list[list[float]]:
+    model = _get_model(backend)
+    max_seq_length = model.max_seq_length
+    clipped = [clip_text(text, max_seq_length) for text in texts]
+    lengths = token_lengths(model.tokenizer, clipped, max_seq_length)
+    token_budget = int(os.environ.get("DTFFTL_EMBEDDING_TOKEN_BUDGET", DEFAULT_TOKEN_BUDGET))
+    batches = plan_batches(lengths, token_budget=token_budget)
+
+    if show_progress or len(texts) > 50:
+        from tqdm.auto import tqdm
+
+        batches = tqdm(batches, desc="Embedding", unit="batch")
+
+    vectors: list[list[float]] = [[] for _ in texts]
+    for batch in batches:
+        embeddings = model.encode(
+            [clipped[idx] for idx in batch],
+            batch_size=len(batch),
+            normalize_embeddings=True,
+            show_progress_bar=False,
+        )
+        for idx, embedding in zip(batch, embeddings):
+            vectors[idx] = embedding.tolist()
+    return vectors
+
+
 def embed_batch(texts: list[str], show_progress: bool = False) -> list[list[float]]:
     if not texts:
         return []
 
-    prefer_openai = os.environ.get("DTFFTL_EMBEDDINGS", "").lower() == "openai"
-    if prefer_openai:
-        return _embed_with_openai(texts)
+    cache = get_embedding_cache()
+    if cache is None:
+        return _encode(texts, show_progress=show_progress)
+
+    vectors = cache.get_many(texts)
+    misses: dict[str, list[int]] = {}
+    for idx, vector in enumerate(vectors):
+        if vector is None:
+            misses.setdefault(normalize_text(texts[idx]), []).append(idx)
 
-    model = _get_model()
-    show_bar = show_progress or len(texts) > 50
-    embeddings = model.encode(texts, normalize_embeddings=True, show_progress_bar=show_bar)
-    return [e.tolist() for e in embeddings]
+    if misses:
+        miss_texts = [texts[indices[0]] for indices in misses.values()]
+        encoded = _encode(miss_texts, show_progress=show_progress)
+        for indices, vector in zip(misses.values(), encoded):
+            for idx in indices:
+                vectors[idx] = vector
+        cache.put_many(miss_texts, encoded)
+    else:
+        cache.flush()
+
+    if show_progress or len(texts) > 50:
+        stats = cache.stats()
+        print(f"Embedding cache: {stats['hits']} hits, {stats['misses']} misses ({stats['hit_rate']:.0%})")
+    return vectors
 
 
 def embed_text(text: str) -> list[float]:
@@ -94,7 +240,23 @@ def embed_text(text: str) -> list[float]:
     return embeddings[0] if embeddings else []
 
 
-def search(table: lancedb.table.Table, query: str, top_k: int = 10) -> list[dict]:
+def search(
+    table: lancedb.table.Table,
+    query: str,
+    top_k: int = 10,
+    nprobes: int | None = DEFAULT_NPROBES,
+    refine_factor: int | None = DEFAULT_REFINE_FACTOR,
+) -> list[dict]:
+    """Nearest-neighbour search over a table's vectors.
+
+    `nprobes` (IVF partitions scanned) and `refine_factor` (candidates re-ranked
+    with exact distances) trade latency for recall once the table has an ANN
+    index; they are ignored for brute-force tables.
+    """
     vector = embed_text(query)
-    results = table.search(vector).limit(top_k).to_list()
-    return results
+    builder = table.search(vector).limit(top_k)
+    if nprobes:
+        builder = builder.nprobes(nprobes)
+    if refine_factor:
+        builder = builder.refine_factor(refine_factor)
+    return builder.to_list()
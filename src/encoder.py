@@ -0,0 +1,243 @@
+"""Episode encoding for DTF:FTL.
+
+Each output format gets its own ffmpeg process reading raw PCM from a
+pipe, so MP3 and Opus encode in parallel, and they do so while the
+episode is still being stitched: `stitch_and_encode` hands the encoders
+to `stitch_wavs` as sinks, and every block written to the WAV is also
+fed to them. When the last segment is appended the encoded files are
+finished moments later. Outputs are written under temporary names and
+renamed into place only when ffmpeg exits cleanly.
+"""
+
+from __future__ import annotations
+
+import os
+import queue
+import shutil
+import subprocess
+import tempfile
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Iterable, Optional, Sequence
+
+from .audio import OUTPUT_SAMPLE_WIDTH, read_wav_info, stitch_wavs
+
+
+@dataclass(frozen=True)
+class EncodeTarget:
+    name: str
+    suffix: str
+    muxer: str
+    codec: str
+    bitrate: str
+
+
+ENCODE_TARGETS = {
+    "mp3": EncodeTarget("mp3", ".mp3", "mp3", "libmp3lame", "128k"),
+    "opus": EncodeTarget("opus", ".opus", "opus", "libopus", "64k"),
+}
+DEFAULT_FORMATS = ("mp3", "opus")
+# Blocks buffered per encoder before the stitcher waits for a slow one.
+PIPE_QUEUE_BLOCKS = 16
+
+
+class EncoderUnavailable(RuntimeError):
+    pass
+
+
+def ffmpeg_path() -> str:
+    path = os.environ.get("DTFFTL_FFMPEG") or shutil.which("ffmpeg")
+    if not path:
+        raise EncoderUnavailable("ffmpeg not found; install it or set DTFFTL_FFMPEG")
+    return path
+
+
+def ffmpeg_pipe_command(target: EncodeTarget, sample_rate: int, channels: int, output_path: Path) -> list[str]:
+    return [
+        ffmpeg_path(), "-hide_banner", "-loglevel", "error", "-y",
+        "-f", f"s{OUTPUT_SAMPLE_WIDTH * 8}le", "-ar", str(sample_rate), "-ac", str(channels), "-i", "pipe:0",
+        "-c:a", target.codec, "-b:a", target.bitrate, "-f", target.muxer, str(output_path),
+    ]
+
+
+CommandBuilder = Callable[[EncodeTarget, int, int, Path], list[str]]
+
+
+class PipeEncoder:
+    """One encoder process fed PCM16 blocks through a bounded queue by a writer thread."""
+
+    def __init__(
+        self,
+        target: EncodeTarget,
+        output_path: Path,
+        sample_rate: int,
+        channels: int,
+        command: CommandBuilder = ffmpeg_pipe_command,
+    ) -> None:
+        self.target = target
+        self.output_path = output_path
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        self.tmp_path = output_path.with_name(f".{output_path.name}.tmp")
+        self._stderr = tempfile.TemporaryFile()
+        self._process = subprocess.Popen(
+            command(target, sample_rate, channels, self.tmp_path),
+            stdin=subprocess.PIPE,
+            stdout=subprocess.DEVNULL,
+            stderr=self._stderr,
+        )
+        self._queue: queue.Queue[Optional[bytes]] = queue.Queue(maxsize=PIPE_QUEUE_BLOCKS)
+        self._error: Optional[BaseException] = None
+        self._thread = threading.Thread(target=self._pump, name=f"encode-{target.name}", daemon=True)
+        self._thread.start()
+
+    def _pump(self) -> None:
+        stdin = self._process.stdin
+        try:
+            while (data := self._queue.get()) is not None:
+                stdin.write(data)
+        except BaseException as exc:
+            self._error = exc
+            while self._queue.get() is not None:
+                pass
+        finally:
+            try:
+                stdin.close()
+            except OSError:
+                pass
+
+    def write(self, data: bytes) -> None:
+        if data:
+            self._queue.put(bytes(data))
+
+    def close(self) -> Path:
+        self._queue.put(None)
+        self._thread.join()
+        returncode = self._process.wait()
+        self._stderr.seek(0)
+        detail = self._stderr.read().decode("utf-8", "replace").strip()
+        self._stderr.close()
+        if returncode != 0 or self._error is not None:
+            self.tmp_path.unlink(missing_ok=True)
+            reason = detail or self._error or f"exit status {returncode}"
+            raise RuntimeError(f"{self.target.name} encoding failed: {reason}")
+        os.replace(self.tmp_path, self.output_path)
+        return self.output_path
+
+    def abort(self) -> None:
+        self._process.kill()
+        self._queue.put(None)
+        self._thread.join()
+        self._process.wait()
+        self._stderr.close()
+        self.tmp_path.unlink(missing_ok=True)
+
+
+def _output_paths(base_path: Path, formats: Iterable[str]) -> dict[str, Path]:
+    return {name: base_path.with_suffix(ENCODE_TARGETS[name].suffix) for name in formats}
+
+
+def open_encoders(
+    output_path: Path,
+    formats: Iterable[str],
+    sample_rate: int,
+    channels: int,
+    command: CommandBuilder = ffmpeg_pipe_command,
+) -> list[PipeEncoder]:
+    """Start one pipe encoder per format, named after output_path."""
+    encoders: list[PipeEncoder] = []
+    try:
+        for name, path in _output_paths(output_path, formats).items():
+            encoders.append(PipeEncoder(ENCODE_TARGETS[name], path, sample_rate, channels, command=command))
+    except BaseException:
+        for encoder in encoders:
+            encoder.abort()
+        raise
+    return encoders
+
+
+def close_encoders(encoders: Sequence[PipeEncoder]) -> dict[str, Path]:
+    """Finish every encoder, raising once with all failures if any failed."""
+    outputs: dict[str, Path] = {}
+    failures = []
+    for encoder in encoders:
+        try:
+            outputs[encoder.target.name] = encoder.close()
+        except RuntimeError as exc:
+            failures.append(str(exc))
+    if failures:
+        raise RuntimeError("; ".join(failures))
+    return outputs
+
+
+def stitch_and_encode(
+    wav_files: Sequence[Path],
+    output_path: Path,
+    formats: Iterable[str] = DEFAULT_FORMATS,
+    command: CommandBuilder = ffmpeg_pipe_command,
+    **stitch_kwargs,
+) -> dict[str, Path]:
+    """Stitch segments into output_path while encoding the same stream to each format.
+
+    Returns the WAV under "wav" plus one path per format, named after
+    output_path (episode.wav -> episode.mp3, episode.opus).
+    """
+    if not wav_files:
+        raise ValueError("no WAV inputs to stitch")
+    first = read_wav_info(wav_files[0])
+    sample_rate = stitch_kwargs.get("sample_rate") or first.sample_rate
+    channels = stitch_kwargs.get("channels") or first.channels
+
+    encoders = open_encoders(output_path, formats, sample_rate, channels, command=command)
+    try:
+        stitch_wavs(wav_files, output_path, sinks=encoders, **stitch_kwargs)
+    except BaseException:
+        for encoder in encoders:
+            encoder.abort()
+        raise
+    return {"wav": output_path, **close_encoders(encoders)}
+
+
+def ffmpeg_file_command(target: EncodeTarget, input_path: Path, output_path: Path) -> list[str]:
+    return [
+        ffmpeg_path(), "-hide_banner", "-loglevel", "error", "-y", "-i", str(input_path),
+        "-c:a", target.codec, "-b:a", target.bitrate, "-f", target.muxer, str(output_path),
+    ]
+
+
+def _transcode_many(wav_path: Path, jobs: Sequence[tuple[EncodeTarget, Path]]) -> dict[str, Path]:
+    """Start one ffmpeg per target on the same input and wait for all of them."""
+    running = []
+    for target, path in jobs:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f".{path.name}.tmp")
+        process = subprocess.Popen(ffmpeg_file_command(target, wav_path, tmp_path), stderr=subprocess.PIPE)
+        running.append((target, path, tmp_path, process))
+
+    outputs: dict[str, Path] = {}
+    failures = []
+    for target, path, tmp_path, process in running:
+        _, stderr = process.communicate()
+        if process.returncode != 0:
+            tmp_path.unlink(missing_ok=True)
+            failures.append(f"{target.name} encoding failed: {stderr.decode('utf-8', 'replace').strip()}")
+            continue
+        os.replace(tmp_path, path)
+        outputs[target.name] = path
+    if failures:
+        raise RuntimeError("; ".join(failures))
+    return outputs
+
+
+def transcode(wav_path: Path, formats: Iterable[str] = DEFAULT_FORMATS) -> dict[str, Path]:
+    """Encode an existing WAV to every format at once, one ffmpeg process each."""
+    return _transcode_many(
+        wav_path,
+        [(ENCODE_TARGETS[name], path) for name, path in _output_paths(wav_path, formats).items()],
+    )
+
+
+def transcode_to_mp3(wav_path: Path, mp3_path: Path, bitrate: str = "128k") -> Path:
+    target = ENCODE_TARGETS["mp3"]
+    target = EncodeTarget(target.name, target.suffix, target.muxer, target.codec, bitrate)
+    return _transcode_many(wav_path, [(target, mp3_path)])["mp3"]
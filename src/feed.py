@@ -1,11 +1,386 @@
-"""RSS feed generation (stub)."""
+"""Podcast RSS feed for DTF:FTL.
+
+Every published episode is appended to an item store (`items.jsonl`) along
+with its rendered `<item>` XML, which is never rendered again. The
+subscription feed is the channel header, the newest items and a footer.
+A sidecar state file records each item's byte length in `feed.xml`, so a
+daily publish renders one new item and a fresh header and splices them in
+front of the item bytes already on disk. It does not read the store or
+re-render history. Older items move to fixed-size archive pages
+(RFC 5005 archived feeds, linked by `prev-archive`). A page is written once
+when it fills; the state keeps a digest of each page's items, so a rebuild
+rewrites only the pages whose items changed and leaves the rest (and their
+lastBuildDate) alone.
+
+A full rebuild from the store only happens when the cached feed can't be
+spliced: no state yet, channel metadata changed, or an episode republished
+or published out of date order.
+"""
 
 from __future__ import annotations
 
+import datetime as dt
+import hashlib
+import io
+import itertools
+import json
+import os
+from dataclasses import asdict, dataclass
+from email.utils import format_datetime
 from pathlib import Path
+from typing import Callable, Iterable, Iterator, Optional, Sequence
+from xml.sax.saxutils import escape, quoteattr
+
+from .generator import TAGLINE
+
+PROJECT_ROOT = Path(__file__).parent.parent
+FEED_DIR = PROJECT_ROOT / "data" / "feed"
+DEFAULT_PUBLIC_URL = "https://dtfftl.example.com"
+# The subscription feed keeps between MAX_FEED_ITEMS and MAX_FEED_ITEMS + ARCHIVE_PAGE_SIZE - 1 items.
+MAX_FEED_ITEMS = 100
+ARCHIVE_PAGE_SIZE = 100
+FEED_NAME = "feed.xml"
+STATE_NAME = "feed_state.json"
+STORE_NAME = "items.jsonl"
+ARCHIVE_DIR = "archive"
+COPY_BUFFER = 1 << 20
+FOOTER = "  </channel>\n</rss>\n"
+
+CHANNEL = {
+    "title": "DTF:FTL — Daily Tech Feed: From The Labs",
+    "description": (
+        f"{TAGLINE}. A daily AI and singularity podcast: Stephen explains "
+        "the research, Philip asks the questions you would."
+    ),
+    "language": "en",
+    "author": "DTF:FTL",
+    "category": "Technology",
+}
+
+NAMESPACES = {
+    "xmlns:itunes": "http://www.itunes.com/dtds/podcast-1.0.dtd",
+    "xmlns:podcast": "https://podcastindex.org/namespace/1.0",
+    "xmlns:atom": "http://www.w3.org/2005/Atom",
+    "xmlns:fh": "http://purl.org/syndication/history/1.0",
+}
+
+
+def get_public_base_url() -> str:
+    return os.environ.get("DTFFTL_PUBLIC_URL", DEFAULT_PUBLIC_URL).rstrip("/")
+
+
+def public_url(key: str) -> str:
+    return f"{get_public_base_url()}/{key}"
+
+
+def episode_key(date_str: str, name: str) -> str:
+    """Object key (and URL path) of an episode file once published."""
+    return f"episodes/{date_str}/{name}"
+
+
+@dataclass
+class FeedItem:
+    guid: str
+    title: str
+    description: str
+    pub_date: str  # ISO 8601 with timezone
+    url: str
+    length: int
+    mime_type: str = "audio/mpeg"
+    duration: Optional[float] = None
+    chapters_url: Optional[str] = None
+
+
+class XmlWriter:
+    """Minimal streaming XML writer: elements go straight to `write`, indented by depth."""
+
+    def __init__(self, write: Callable[[str], object], depth: int = 0, indent: str = "  ") -> None:
+        self._write = write
+        self._indent = indent
+        self._stack: list[str] = []
+        self._depth = depth
+
+    def _pad(self) -> str:
+        return self._indent * (self._depth + len(self._stack))
+
+    @staticmethod
+    def _attrs(attrs: Optional[dict]) -> str:
+        if not attrs:
+            return ""
+        return "".join(f" {name}={quoteattr(str(value))}" for name, value in attrs.items() if value is not None)
+
+    def start(self, tag: str, attrs: Optional[dict] = None) -> None:
+        self._write(f"{self._pad()}<{tag}{self._attrs(attrs)}>\n")
+        self._stack.append(tag)
+
+    def end(self) -> None:
+        tag = self._stack.pop()
+        self._write(f"{self._pad()}</{tag}>\n")
+
+    def element(self, tag: str, text: Optional[str] = None, attrs: Optional[dict] = None) -> None:
+        if text is None:
+            self._write(f"{self._pad()}<{tag}{self._attrs(attrs)}/>\n")
+        else:
+            self._write(f"{self._pad()}<{tag}{self._attrs(attrs)}>{escape(text)}</{tag}>\n")
+
+
+def _rfc822(iso: str) -> str:
+    return format_datetime(dt.datetime.fromisoformat(iso))
+
+
+def render_item(item: FeedItem) -> str:
+    """The `<item>` element, indented to sit inside `<channel>`."""
+    buffer = io.StringIO()
+    writer = XmlWriter(buffer.write, depth=2)
+    writer.start("item")
+    writer.element("title", item.title)
+    writer.element("guid", item.guid, {"isPermaLink": "false"})
+    writer.element("pubDate", _rfc822(item.pub_date))
+    writer.element("description", item.description)
+    writer.element("enclosure", attrs={"url": item.url, "length": item.length, "type": item.mime_type})
+    if item.duration is not None:
+        writer.element("itunes:duration", str(int(round(item.duration))))
+    if item.chapters_url:
+        writer.element("podcast:chapters", attrs={"url": item.chapters_url, "type": "application/json+chapters"})
+    writer.end()
+    return buffer.getvalue()
+
+
+def _render_header(links: dict[str, str], build_date: str, archive: bool = False) -> str:
+    buffer = io.StringIO()
+    buffer.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+    writer = XmlWriter(buffer.write)
+    writer.start("rss", {"version": "2.0", **NAMESPACES})
+    writer.start("channel")
+    writer.element("title", CHANNEL["title"])
+    writer.element("link", get_public_base_url())
+    writer.element("description", CHANNEL["description"])
+    writer.element("language", CHANNEL["language"])
+    writer.element("lastBuildDate", build_date)
+    for rel, href in links.items():
+        writer.element("atom:link", attrs={"rel": rel, "href": href, "type": "application/rss+xml"})
+    if archive:
+        writer.element("fh:archive")
+    writer.element("itunes:author", CHANNEL["author"])
+    writer.element("itunes:explicit", "false")
+    writer.element("itunes:category", attrs={"text": CHANNEL["category"]})
+    return buffer.getvalue()
+
+
+def _archive_name(page: int) -> str:
+    return f"{ARCHIVE_DIR}/feed-{page:04d}.xml"
+
+
+def _links(page: Optional[int], previous_page: Optional[int]) -> dict[str, str]:
+    links = {"self": public_url(_archive_name(page) if page else FEED_NAME)}
+    if page:
+        links["current"] = public_url(FEED_NAME)
+    if previous_page:
+        links["prev-archive"] = public_url(_archive_name(previous_page))
+    return links
+
+
+def _channel_hash() -> str:
+    payload = json.dumps({"channel": CHANNEL, "url": get_public_base_url()}, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _page_hasher(page: int):
+    """Digest of an archive page's channel, position and item bytes; its build date is left out."""
+    return hashlib.sha256(f"{_channel_hash()}:{page}".encode("utf-8"))
+
+
+def _hashed(hasher, chunks: Iterable[bytes]) -> Iterator[bytes]:
+    for chunk in chunks:
+        hasher.update(chunk)
+        yield chunk
+
+
+class ItemStore:
+    """Append-only JSONL of published items and their rendered XML; the last record per guid wins."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+
+    def append(self, item: FeedItem, xml: str) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        line = json.dumps({**asdict(item), "xml": xml}, ensure_ascii=False)
+        with open(self.path, "a", encoding="utf-8") as handle:
+            handle.write(line + "\n")
+            handle.flush()
+            os.fsync(handle.fileno())
+
+    def load(self) -> list[dict]:
+        """Current record per guid, oldest first."""
+        records: dict[str, dict] = {}
+        if self.path.exists():
+            with open(self.path, encoding="utf-8") as handle:
+                for line in handle:
+                    if line.strip():
+                        record = json.loads(line)
+                        records[record["guid"]] = record
+        return sorted(records.values(), key=lambda record: dt.datetime.fromisoformat(record["pub_date"]))
+
+
+def _write_atomic(path: Path, write: Callable[[io.BufferedWriter], None]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    try:
+        with open(tmp_path, "wb") as handle:
+            write(handle)
+        os.replace(tmp_path, path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+
+
+def _write_document(path: Path, header: str, fragments: Iterable[bytes]) -> None:
+    def write(handle) -> None:
+        handle.write(header.encode("utf-8"))
+        for fragment in fragments:
+            handle.write(fragment)
+        handle.write(FOOTER.encode("utf-8"))
+
+    _write_atomic(path, write)
+
+
+class FeedBuilder:
+    """Maintains feed.xml, its archive pages and the splice state under `feed_dir`."""
+
+    def __init__(
+        self,
+        feed_dir: Path = FEED_DIR,
+        max_items: int = MAX_FEED_ITEMS,
+        page_size: int = ARCHIVE_PAGE_SIZE,
+    ) -> None:
+        self.feed_dir = feed_dir
+        self.max_items = max_items
+        self.page_size = page_size
+        self.store = ItemStore(feed_dir / STORE_NAME)
+        self.feed_path = feed_dir / FEED_NAME
+        self.state_path = feed_dir / STATE_NAME
+
+    def _load_state(self) -> Optional[dict]:
+        if not self.state_path.exists() or not self.feed_path.exists():
+            return None
+        state = json.loads(self.state_path.read_text(encoding="utf-8"))
+        expected = state["header_bytes"] + sum(size for _, size in state["items"]) + len(FOOTER.encode("utf-8"))
+        settings = [state.get("channel"), state.get("max_items"), state.get("page_size")]
+        if self.feed_path.stat().st_size != expected or settings != [_channel_hash(), self.max_items, self.page_size]:
+            return None
+        if len(state.get("page_digests", ())) != state["pages"]:
+            return None
+        return state
+
+    def _page_digests(self) -> list[str]:
+        """Archive page digests from the last state written, even one too stale to splice from."""
+        try:
+            return json.loads(self.state_path.read_text(encoding="utf-8")).get("page_digests", [])
+        except (OSError, ValueError):
+            return []
+
+    def _save_state(self, header: str, items: Sequence[tuple[str, int]], page_digests: list[str], newest: str) -> None:
+        state = {
+            "channel": _channel_hash(),
+            "max_items": self.max_items,
+            "page_size": self.page_size,
+            "header_bytes": len(header.encode("utf-8")),
+            "items": [list(entry) for entry in items],
+            "pages": len(page_digests),
+            "page_digests": page_digests,
+            "newest": newest,
+        }
+        _write_atomic(self.state_path, lambda handle: handle.write(json.dumps(state).encode("utf-8")))
+
+    def publish(self, item: FeedItem, now: Optional[dt.datetime] = None) -> Path:
+        """Add an episode to the store and the feed; returns the feed path."""
+        xml = render_item(item)
+        self.store.append(item, xml)
+        state = self._load_state()
+        if (
+            state is None
+            or any(guid == item.guid for guid, _ in state["items"])
+            or dt.datetime.fromisoformat(item.pub_date) < dt.datetime.fromisoformat(state["newest"])
+        ):
+            return self.rebuild(now)
+        return self._splice(state, item, xml.encode("utf-8"), now)
+
+    def _splice(self, state: dict, item: FeedItem, fragment: bytes, now: Optional[dt.datetime]) -> Path:
+        build_date = format_datetime(now or dt.datetime.now(dt.timezone.utc))
+        old_items = [tuple(entry) for entry in state["items"]]
+        page_digests = list(state["page_digests"])
+        pages = state["pages"]
+        header_bytes = state["header_bytes"]
+
+        keep = len(old_items)
+        if len(old_items) + 1 >= self.max_items + self.page_size:
+            # The oldest page_size items sit at the end of the body: move them to a new archive page.
+            keep = len(old_items) - self.page_size
+            start = header_bytes + sum(size for _, size in old_items[:keep])
+            length = sum(size for _, size in old_items[keep:])
+            pages += 1
+            header = _render_header(_links(pages, pages - 1 or None), build_date, archive=True)
+            hasher = _page_hasher(pages)
+            _write_document(
+                self.feed_dir / _archive_name(pages), header, _hashed(hasher, self._read_range(start, length))
+            )
+            page_digests.append(hasher.hexdigest())
+
+        header = _render_header(_links(None, pages or None), build_date)
+        kept_length = sum(size for _, size in old_items[:keep])
+        _write_document(
+            self.feed_path, header, itertools.chain([fragment], self._read_range(header_bytes, kept_length))
+        )
+        items = [(item.guid, len(fragment)), *old_items[:keep]]
+        self._save_state(header, items, page_digests, item.pub_date)
+        return self.feed_path
+
+    def _read_range(self, start: int, length: int) -> Iterator[bytes]:
+        """Stream a byte range of the current feed; it stays in place until the new one is renamed over it."""
+        with open(self.feed_path, "rb") as handle:
+            handle.seek(start)
+            while length > 0:
+                chunk = handle.read(min(COPY_BUFFER, length))
+                if not chunk:
+                    raise ValueError("feed.xml is shorter than its splice state")
+                length -= len(chunk)
+                yield chunk
+
+    def rebuild(self, now: Optional[dt.datetime] = None) -> Path:
+        """Write the feed, and the archive pages whose items changed, from the item store's cached XML."""
+        build_date = format_datetime(now or dt.datetime.now(dt.timezone.utc))
+        records = self.store.load()
+        archived = max(len(records) - self.max_items, 0) // self.page_size * self.page_size
+        pages = archived // self.page_size
+
+        previous = self._page_digests()
+        page_digests: list[str] = []
+        for page in range(1, pages + 1):
+            chunk = records[(page - 1) * self.page_size: page * self.page_size]
+            fragments = [record["xml"].encode("utf-8") for record in reversed(chunk)]
+            hasher = _page_hasher(page)
+            for fragment in fragments:
+                hasher.update(fragment)
+            page_digests.append(hasher.hexdigest())
+            path = self.feed_dir / _archive_name(page)
+            if previous[page - 1:page] == page_digests[-1:] and path.exists():
+                continue
+            header = _render_header(_links(page, page - 1 or None), build_date, archive=True)
+            _write_document(path, header, fragments)
+        archive_pages = {self.feed_dir / _archive_name(page) for page in range(1, pages + 1)}
+        for path in (self.feed_dir / ARCHIVE_DIR).glob("feed-*.xml"):
+            if path not in archive_pages:
+                path.unlink()
+
+        current = list(reversed(records[archived:]))
+        fragments = [record["xml"].encode("utf-8") for record in current]
+        header = _render_header(_links(None, pages or None), build_date)
+        _write_document(self.feed_path, header, fragments)
+        newest = current[0]["pub_date"] if current else dt.datetime.min.replace(tzinfo=dt.timezone.utc).isoformat()
+        items = [(record["guid"], len(fragment)) for record, fragment in zip(current, fragments)]
+        self._save_state(header, items, page_digests, newest)
+        return self.feed_path
 
 
-def write_feed_stub(output_path: Path) -> Path:
-    output_path.parent.mkdir(parents=True, exist_ok=True)
-    output_path.write_text("<!-- DTF:FTL feed stub -->\n", encoding="utf-8")
-    return output_path
+def publish_episode(item: FeedItem, feed_dir: Path = FEED_DIR) -> Path:
+    return FeedBuilder(feed_dir).publish(item)
@@ -0,0 +1,253 @@
+"""Shared HTTP session with an on-disk response cache for DTF:FTL fetchers.
+
+Every fetcher goes through one pooled `requests.Session`. A transport adapter
+stores responses under data/http_cache/ and, depending on DTFFTL_HTTP_CACHE:
+
+- ``on`` (default): serves GETs that are still inside their host TTL, and
+  revalidates older entries with If-None-Match / If-Modified-Since.
+- ``record``: like ``on``, and also keeps POSTs and non-200 responses so a
+  run can be replayed later.
+- ``replay``: never touches the network; serves recorded responses and
+  raises `HTTPReplayMiss` for anything that was not recorded.
+- ``off``: plain pooled session.
+
+The Authorization header is not part of the cache key and is never stored,
+so authenticated GETs (every Reddit API call PRAW makes) are cached,
+revalidated, recorded and replayed like any other. OAuth token endpoints
+such as Reddit's, and authenticated non-GETs, always go to the network and
+are never written to disk; in replay mode the token endpoint is answered
+with a placeholder token so PRAW can run offline.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import io
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+from urllib3 import HTTPResponse
+
+PROJECT_ROOT = Path(__file__).parent.parent
+HTTP_CACHE_DIR = PROJECT_ROOT / "data" / "http_cache"
+
+USER_AGENT = "dtfftl/0.1"
+POOL_SIZE = 16
+
+# Seconds a stored response is served without revalidation, per host.
+HOST_TTLS = {
+    "export.arxiv.org": 7 * 24 * 3600,
+    "www.alphaxiv.org": 30 * 60,
+}
+DEFAULT_TTL = 0
+# Token endpoints whose responses hold bearer tokens.
+CREDENTIAL_PATHS = ("/api/v1/access_token",)
+# Stands in for a token endpoint's answer in replay mode.
+REPLAY_TOKEN = {"access_token": "replay", "token_type": "bearer", "expires_in": 3600, "scope": "*"}
+
+# Headers that describe the live connection, transfer encoding or rate limit
+# window rather than the stored (decoded) body; never replayed from disk.
+VOLATILE_HEADERS = {
+    "content-length",
+    "x-ratelimit-remaining",
+    "x-ratelimit-reset",
+    "x-ratelimit-used",
+    "date",
+    "connection",
+    "keep-alive",
+    "transfer-encoding",
+    "content-encoding",
+}
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+
+
+class HTTPReplayMiss(requests.ConnectionError):
+    pass
+
+
+def get_cache_mode() -> str:
+    mode = os.environ.get("DTFFTL_HTTP_CACHE", "on").lower()
+    return mode if mode in {"off", "on", "record", "replay"} else "on"
+
+
+def get_cache_dir() -> Path:
+    return Path(os.environ.get("DTFFTL_HTTP_CACHE_DIR", HTTP_CACHE_DIR))
+
+
+def _request_key(request: requests.PreparedRequest) -> str:
+    body = request.body or b""
+    if isinstance(body, str):
+        body = body.encode("utf-8")
+    digest = hashlib.sha256()
+    digest.update(f"{request.method} {request.url}\n".encode("utf-8"))
+    digest.update(body)
+    return digest.hexdigest()
+
+
+def _write_atomic(path: Path, data: bytes) -> None:
+    # Concurrent fetchers may read the entry at any moment; never expose a half-written file.
+    tmp_path = path.with_name(f"{path.name}.{threading.get_ident()}.tmp")
+    tmp_path.write_bytes(data)
+    os.replace(tmp_path, path)
+
+
+def _is_token_request(request: requests.PreparedRequest) -> bool:
+    return urlsplit(request.url).path.rstrip("/").endswith(CREDENTIAL_PATHS)
+
+
+def _replay_token_response(request: requests.PreparedRequest) -> requests.Response:
+    response = requests.Response()
+    response.status_code = 200
+    response.headers = CaseInsensitiveDict({"Content-Type": "application/json; charset=UTF-8"})
+    response._content = json.dumps(REPLAY_TOKEN).encode("utf-8")
+    response.encoding = "utf-8"
+    response.url = request.url
+    response.request = request
+    return response
+
+
+class CachingAdapter(HTTPAdapter):
+    """HTTPAdapter that answers from, revalidates against and fills a disk store."""
+
+    def __init__(self, mode: str, cache_dir: Path, **kwargs) -> None:
+        super().__init__(**kwargs)
+        self.mode = mode
+        self.cache_dir = cache_dir
+
+    # -- store -------------------------------------------------------------
+
+    def _paths(self, key: str) -> tuple[Path, Path]:
+        shard = self.cache_dir / key[:2]
+        return shard / f"{key}.json", shard / f"{key}.body"
+
+    def _load(self, key: str) -> Optional[tuple[dict, bytes]]:
+        meta_path, body_path = self._paths(key)
+        try:
+            meta = json.loads(meta_path.read_text(encoding="utf-8"))
+            return meta, body_path.read_bytes()
+        except (OSError, ValueError):
+            return None
+
+    def _store(self, key: str, request: requests.PreparedRequest, response: requests.Response) -> None:
+        meta_path, body_path = self._paths(key)
+        meta_path.parent.mkdir(parents=True, exist_ok=True)
+        headers = {k: v for k, v in response.headers.items() if k.lower() not in VOLATILE_HEADERS}
+        meta = {
+            "method": request.method,
+            "url": request.url,
+            "status": response.status_code,
+            "reason": response.reason,
+            "headers": headers,
+            "stored_at": time.time(),
+        }
+        for path, data in ((body_path, response.content), (meta_path, json.dumps(meta).encode("utf-8"))):
+            _write_atomic(path, data)
+
+    def _touch(self, key: str, meta: dict) -> None:
+        meta_path, _ = self._paths(key)
+        meta["stored_at"] = time.time()
+        _write_atomic(meta_path, json.dumps(meta).encode("utf-8"))
+
+    def _build_response(self, request: requests.PreparedRequest, meta: dict, body: bytes) -> requests.Response:
+        response = requests.Response()
+        response.status_code = meta["status"]
+        response.reason = meta.get("reason") or ""
+        response.headers = CaseInsensitiveDict(meta.get("headers") or {})
+        response.headers["X-DTFFTL-Cache"] = "hit"
+        # Backed by the stored body so stream=True callers (iter_content, raw.read) work on hits too;
+        # requests loads .content from it for everyone else.
+        response.raw = HTTPResponse(
+            body=io.BytesIO(body),
+            headers=dict(response.headers),
+            status=response.status_code,
+            reason=response.reason,
+            preload_content=False,
+            decode_content=False,
+        )
+        response.url = request.url
+        response.request = request
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.connection = self
+        return response
+
+    # -- policy ------------------------------------------------------------
+
+    @staticmethod
+    def _ttl(request: requests.PreparedRequest) -> float:
+        return HOST_TTLS.get(urlsplit(request.url).hostname or "", DEFAULT_TTL)
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        if self.mode == "replay" and _is_token_request(request):
+            return _replay_token_response(request)
+        if self.mode == "off" or _is_token_request(request):
+            return super().send(request, stream=stream, timeout=timeout, verify=verify, cert=cert, proxies=proxies)
+
+        key = _request_key(request)
+        cached = self._load(key)
+        if self.mode == "replay":
+            if cached is None:
+                raise HTTPReplayMiss(f"No recorded response for {request.method} {request.url}", request=request)
+            return self._build_response(request, *cached)
+
+        is_get = request.method == "GET"
+        if cached is not None and is_get and cached[0]["status"] == 200:
+            meta, body = cached
+            if time.time() - meta["stored_at"] < self._ttl(request):
+                return self._build_response(request, meta, body)
+            headers = CaseInsensitiveDict(meta.get("headers") or {})
+            if headers.get("ETag"):
+                request.headers["If-None-Match"] = headers["ETag"]
+            if headers.get("Last-Modified"):
+                request.headers["If-Modified-Since"] = headers["Last-Modified"]
+
+        response = super().send(request, stream=stream, timeout=timeout, verify=verify, cert=cert, proxies=proxies)
+        request.headers.pop("If-None-Match", None)
+        request.headers.pop("If-Modified-Since", None)
+
+        if response.status_code == 304 and cached is not None:
+            response.close()
+            self._touch(key, cached[0])
+            return self._build_response(request, *cached)
+
+        # Streamed bodies are left to the caller instead of being buffered into the store.
+        # Record mode also keeps no-store answers (Reddit's API sends them) so a replay can serve them.
+        no_store = "no-store" in response.headers.get("Cache-Control", "")
+        authenticated_write = not is_get and "Authorization" in request.headers
+        cacheable = not stream and not authenticated_write and (self.mode == "record" or not no_store)
+        if cacheable and ((is_get and response.status_code == 200) or self.mode == "record"):
+            self._store(key, request, response)
+        return response
+
+
+def build_session(mode: str | None = None, cache_dir: Path | None = None) -> requests.Session:
+    session = requests.Session()
+    session.headers["User-Agent"] = USER_AGENT
+    adapter = CachingAdapter(
+        mode or get_cache_mode(),
+        cache_dir or get_cache_dir(),
+        pool_connections=POOL_SIZE,
+        pool_maxsize=POOL_SIZE,
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def get_session() -> requests.Session:
+    """Process-wide pooled session shared by all fetchers."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = build_session()
+        return _session
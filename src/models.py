@@ -24,3 +24,8 @@ class Story:
     source_meta: SourceMeta
     raw_text: str = ""
     tags: list[str] = field(default_factory=list)
+
+
+def story_from_dict(data: dict) -> Story:
+    """Rebuild a Story from `dataclasses.asdict` output (e.g. a stage artifact)."""
+    return Story(**{**data, "source_meta": SourceMeta(**data["source_meta"])})
@@ -5,18 +5,55 @@ from __future__ import annotations
 import argparse
 import datetime as dt
 import json
+import time
+from concurrent.futures import TimeoutError as FuturesTimeout
+from dataclasses import asdict
 from pathlib import Path
 from typing import Iterable
 
+import numpy as np
+
 from .alphaxiv import fetch_trending
-from .generator import generate_episode_scripts, generate_interstitial, generate_intro, generate_outro
+from .assembler import AssemblyError, render_episode_audio
+from .audio import read_wav_info
+from .audio_processing import DEFAULT_CROSSFADE, TARGET_LOUDNESS_DB
+from .chapters import compute_chapters, has_id3_chapters, write_chapters_json, write_id3_chapters
+from .daemons import start_daemon
+from .dedup import filter_novel_stories, merge_near_duplicates
+from .embeddings import embed_batch
+from .encoder import DEFAULT_FORMATS, ENCODE_TARGETS
+from .feed import FEED_DIR, FeedItem, episode_key, get_public_base_url, public_url, publish_episode
+from .generator import TAGLINE, generate_episode_scripts, generate_interstitial, generate_intro, generate_outro
 from .luminaries import fetch_luminary_posts
-from .models import Story
+from .models import Story, story_from_dict
 from .reddit import fetch_reddit_stories
-from .storage import store_episode, store_stories_batch, StorageUnavailable
+from .stages import Stage, StageError, StageGraph, file_hash
+from .storage import (
+    compact_tables,
+    load_recent_vectors,
+    store_episode,
+    store_stories_batch,
+    story_embedding_text,
+    StorageUnavailable,
+)
+from .tts import SPEAKER_VOICES, TTS_URL, get_tts_model_version, get_tts_voice
+from .uploader import (
+    Uploader,
+    UploadUnavailable,
+    episode_upload_jobs,
+    get_bucket,
+    get_endpoint_url,
+    make_client,
+    upload_feed,
+)
 
 PROJECT_ROOT = Path(__file__).parent.parent
 EPISODES_DIR = PROJECT_ROOT / "data" / "episodes"
+NOVELTY_LOOKBACK_DAYS = 7
+# Seconds each source may take during concurrent collection before it is skipped.
+SOURCE_TIMEOUTS = {"reddit": 180.0, "alphaxiv": 90.0, "luminaries": 30.0}
+# Plain runs stop after storage; audio stages are opt-in via --to-stage/--only-stage.
+DEFAULT_LAST_STAGE = "store"
 
 
 def segment_name(kind: str, script_num: int = 0, next_num: int = 0) -> str:
@@ -38,17 +75,78 @@ def collect_stories(
     alphaxiv_limit: int,
     luminary_limit: int,
     use_stub: bool = True,
+    timeouts: dict[str, float] | None = None,
 ) -> list[Story]:
+    """Fetch all sources concurrently.
+
+    A source that exceeds its timeout is skipped so it cannot stall the
+    episode; stories keep the reddit, alphaxiv, luminaries order.
+    """
+    timeouts = {**SOURCE_TIMEOUTS, **(timeouts or {})}
+    fetchers = {
+        "reddit": lambda: fetch_reddit_stories(limit_per_subreddit=reddit_limit, use_stub=use_stub),
+        "alphaxiv": lambda: fetch_trending(limit=alphaxiv_limit, use_stub=use_stub),
+        "luminaries": lambda: fetch_luminary_posts(limit=luminary_limit, use_stub=use_stub),
+    }
+
+    started = time.monotonic()
+    futures = {name: start_daemon(f"collect-{name}", fetch) for name, fetch in fetchers.items()}
     stories: list[Story] = []
-    stories.extend(fetch_reddit_stories(limit_per_subreddit=reddit_limit, use_stub=use_stub))
-    stories.extend(fetch_trending(limit=alphaxiv_limit, use_stub=use_stub))
-    try:
-        stories.extend(fetch_luminary_posts(limit=luminary_limit, use_stub=use_stub))
-    except NotImplementedError:
-        pass
+    for name, future in futures.items():
+        remaining = timeouts[name] - (time.monotonic() - started)
+        try:
+            stories.extend(future.result(timeout=max(remaining, 0)))
+        except NotImplementedError:
+            pass
+        except FuturesTimeout:
+            print(f"Source {name} timed out after {timeouts[name]:.0f}s; skipping")
     return stories
 
 
+def select_episode_stories(stories: list[Story], episode_date: dt.date) -> tuple[list[Story], dict]:
+    """Drop stories covered in recent episodes, then merge near-duplicates.
+
+    Stories are embedded once and both passes reuse the vectors. Falls back to
+    the unfiltered list when embeddings are unavailable.
+    """
+    stats: dict = {"merged_duplicates": 0}
+    if not stories:
+        return stories, stats
+    try:
+        vectors = embed_batch([story_embedding_text(story) for story in stories])
+    except Exception as exc:
+        print(f"Skipping novelty filter and near-duplicate merge: {exc}")
+        return stories, stats
+
+    since = episode_date - dt.timedelta(days=NOVELTY_LOOKBACK_DAYS)
+    try:
+        history = load_recent_vectors(since.isoformat(), episode_date.isoformat())
+    except StorageUnavailable:
+        history = np.empty((0, len(vectors[0])), dtype=np.float32)
+    stories, vectors, stats["novelty"] = filter_novel_stories(stories, vectors, history)
+
+    merged = merge_near_duplicates(stories, vectors)
+    stats["merged_duplicates"] = len(stories) - len(merged)
+    return merged, stats
+
+
+def store_selected_stories(
+    collected: list[Story],
+    selected: list[Story],
+    episode_date: str,
+    use_lancedb: bool = True,
+) -> None:
+    """Mark the episode's stories used; keep the rest unused so they don't count as covered."""
+    selected_ids = {story.id for story in selected}
+    rest = [story for story in collected if story.id not in selected_ids]
+    if not use_lancedb:
+        store_stories_batch([*selected, *rest], episode_date, use_lancedb=False)
+        return
+    store_stories_batch(selected, episode_date, use_lancedb=True)
+    if rest:
+        store_stories_batch(rest, episode_date, use_lancedb=True, mark_used=False)
+
+
 def write_episode_outputs(episode_dir: Path, segments: Iterable[tuple[str, str]]) -> str:
     episode_dir.mkdir(parents=True, exist_ok=True)
     episode_path = episode_dir / "episode.txt"
@@ -64,16 +162,8 @@ def write_episode_outputs(episode_dir: Path, segments: Iterable[tuple[str, str]]
     return episode_text
 
 
-def run_pipeline(
-    episode_date: dt.date | None = None,
-    use_stub: bool = True,
-    store: bool = True,
-) -> Path:
-    episode_date = episode_date or dt.date.today()
-    episode_dir = EPISODES_DIR / episode_date.isoformat()
-
-    stories = collect_stories(reddit_limit=2, alphaxiv_limit=2, luminary_limit=1, use_stub=use_stub)
-    scripts = generate_episode_scripts(stories)
+def _build_segments(episode_stories: list[Story], episode_date: dt.date) -> list[tuple[str, str]]:
+    scripts = generate_episode_scripts(episode_stories)
 
     intro = generate_intro(episode_date)
     outro = generate_outro()
@@ -84,24 +174,215 @@ def run_pipeline(
         if idx < len(scripts):
             segments.append((segment_name("interstitial", script_num=idx, next_num=idx + 1), generate_interstitial(script, scripts[idx])))
     segments.append((segment_name("outro"), outro))
+    return segments
 
-    episode_text = write_episode_outputs(episode_dir, segments)
 
-    manifest = {
-        "episode_date": episode_date.isoformat(),
-        "story_count": len(stories),
-        "segments": [name for name, _ in segments],
-    }
-    (episode_dir / "manifest.json").write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+def _chapter_titles(segment_names: list[str], stories: list[dict]) -> list[str | None]:
+    """Chapter title per segment: intro, one per story, outro; interstitials join the story before."""
+    titles: list[str | None] = []
+    for name in segment_names:
+        kind = name.split("_-_", 1)[-1]
+        if kind == "intro":
+            titles.append("Intro")
+        elif kind == "outro":
+            titles.append("Outro")
+        elif kind.startswith("script_"):
+            idx = int(kind.split("_")[1]) - 1
+            titles.append(stories[idx]["title"] if idx < len(stories) else f"Story {idx + 1}")
+        else:
+            titles.append(None)
+    return titles
+
+
+def _episode_description(stories: list[dict]) -> str:
+    titles = [story["title"] for story in stories]
+    return "Today: " + "; ".join(titles) if titles else f"{TAGLINE}."
+
 
-    if store:
+def _files_exist(episode_dir: Path, names: Iterable[str]) -> bool:
+    return all((episode_dir / name).exists() for name in names)
+
+
+def build_stage_graph(
+    episode_date: dt.date,
+    episode_dir: Path,
+    use_stub: bool = True,
+    store: bool = True,
+) -> StageGraph:
+    """Wire the episode stages; each takes its upstream outputs and returns JSON-able data."""
+    date_str = episode_date.isoformat()
+    limits = {"reddit_limit": 2, "alphaxiv_limit": 2, "luminary_limit": 1}
+
+    def collect(_: dict) -> dict:
+        stories = collect_stories(**limits, use_stub=use_stub)
+        return {"stories": [asdict(story) for story in stories]}
+
+    def select(inputs: dict) -> dict:
+        stories = [story_from_dict(data) for data in inputs["collect"]["stories"]]
+        selected, stats = (stories, {}) if use_stub else select_episode_stories(stories, episode_date)
+        return {"stories": [asdict(story) for story in selected], "stats": stats}
+
+    def generate(inputs: dict) -> dict:
+        stories = [story_from_dict(data) for data in inputs["select"]["stories"]]
+        return {"segments": [list(segment) for segment in _build_segments(stories, episode_date)]}
+
+    def write(inputs: dict) -> dict:
+        segments = [tuple(segment) for segment in inputs["generate"]["segments"]]
+        write_episode_outputs(episode_dir, segments)
+        manifest = {
+            "episode_date": date_str,
+            "story_count": len(inputs["select"]["stories"]),
+            "segments": [name for name, _ in segments],
+            **inputs["select"]["stats"],
+        }
+        (episode_dir / "manifest.json").write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+        files = ["episode.txt", "manifest.json", *(f"{name}.txt" for name, _ in segments)]
+        return {"manifest": manifest, "files": {name: file_hash(episode_dir / name) for name in files}}
+
+    def store_stage(inputs: dict) -> dict:
+        if not store:
+            return {"backend": None}
+        collected = [story_from_dict(data) for data in inputs["collect"]["stories"]]
+        selected = [story_from_dict(data) for data in inputs["select"]["stories"]]
+        episode_text = (episode_dir / "episode.txt").read_text(encoding="utf-8")
+        manifest = inputs["write"]["manifest"]
         try:
-            store_stories_batch(stories, episode_date.isoformat(), use_lancedb=True)
-            store_episode(episode_date.isoformat(), episode_text, manifest, use_lancedb=True)
+            store_selected_stories(collected, selected, date_str, use_lancedb=True)
+            store_episode(date_str, episode_text, manifest, use_lancedb=True)
         except StorageUnavailable:
-            store_stories_batch(stories, episode_date.isoformat(), use_lancedb=False)
-            store_episode(episode_date.isoformat(), episode_text, manifest, use_lancedb=False)
+            store_selected_stories(collected, selected, date_str, use_lancedb=False)
+            store_episode(date_str, episode_text, manifest, use_lancedb=False)
+            return {"backend": "json"}
+        compact_tables()
+        return {"backend": "lancedb"}
+
+    def audio(inputs: dict) -> dict:
+        # TTS, level processing, stitching and encoding overlap: each segment is
+        # appended to the episode as soon as it and every earlier one are rendered.
+        segments = [tuple(segment) for segment in inputs["generate"]["segments"]]
+        try:
+            result = render_episode_audio(segments, episode_dir, target_db=TARGET_LOUDNESS_DB, crossfade=DEFAULT_CROSSFADE)
+        except AssemblyError as exc:
+            raise StageError(str(exc)) from exc
+        outputs = dict(result.outputs)
+        return {
+            "wavs": {str(path.relative_to(episode_dir)): file_hash(path) for path in result.segment_wavs},
+            "processed": {str(path.relative_to(episode_dir)): file_hash(path) for path in result.processed_wavs},
+            "levels": result.levels,
+            "episode_wav": str(outputs.pop("wav").relative_to(episode_dir)),
+            "encoded": {name: str(path.relative_to(episode_dir)) for name, path in outputs.items()},
+        }
+
+    def chapters(inputs: dict) -> dict:
+        processed = [episode_dir / name for name in inputs["audio"]["processed"]]
+        titles = _chapter_titles([path.stem for path in processed], inputs["select"]["stories"])
+        marks = compute_chapters(list(zip(processed, titles)), crossfade=DEFAULT_CROSSFADE)
+        write_chapters_json(episode_dir / "chapters.json", marks)
+        mp3 = inputs["audio"]["encoded"].get("mp3")
+        if mp3:
+            write_id3_chapters(episode_dir / mp3, marks)
+        return {"json": "chapters.json", "mp3": mp3, "chapters": [asdict(chapter) for chapter in marks]}
+
+    def publish(inputs: dict) -> dict:
+        encoded = inputs["audio"]["encoded"]
+        files = {name: file_hash(episode_dir / path) for name, path in encoded.items()}
+        files["chapters"] = file_hash(episode_dir / inputs["chapters"]["json"])
+        mp3 = episode_dir / encoded["mp3"]
+        item = FeedItem(
+            guid=f"dtfftl-{date_str}",
+            title=f"DTF:FTL — {date_str}",
+            description=_episode_description(inputs["select"]["stories"]),
+            pub_date=dt.datetime.combine(episode_date, dt.time(), dt.timezone.utc).isoformat(),
+            url=public_url(episode_key(date_str, mp3.name)),
+            length=mp3.stat().st_size,
+            duration=read_wav_info(episode_dir / inputs["audio"]["episode_wav"]).duration,
+            chapters_url=public_url(episode_key(date_str, inputs["chapters"]["json"])),
+        )
+        bucket = get_bucket()
+        if bucket:
+            try:
+                uploader = Uploader(make_client(), bucket)
+            except UploadUnavailable as exc:
+                raise StageError(str(exc)) from exc
+        else:
+            uploader = None
+            print("[publish] R2_BUCKET not set; updating the local feed only")
+        uploads: dict[str, str] = {}
+        if uploader is not None:
+            # Episode files, then archive pages, then feed.xml: nothing links to an object that isn't up yet.
+            for result in uploader.upload_all(episode_upload_jobs(episode_dir, date_str)):
+                uploads[result.key] = result.status
+        feed_path = publish_episode(item, FEED_DIR)
+        if uploader is not None:
+            for result in upload_feed(uploader, FEED_DIR):
+                uploads[result.key] = result.status
+        return {"files": files, "feed": {"guid": item.guid, "path": str(feed_path)}, "uploads": uploads}
+
+    stages = [
+        Stage("collect", collect, params={"date": date_str, "use_stub": use_stub, **limits}),
+        Stage("select", select, deps=("collect",), params={"date": date_str, "use_stub": use_stub}),
+        Stage("generate", generate, deps=("select",), params={"date": date_str}),
+        Stage(
+            "write", write, deps=("select", "generate"),
+            is_valid=lambda out: _files_exist(episode_dir, out["files"]),
+        ),
+        Stage("store", store_stage, deps=("collect", "select", "write"), params={"store": store}),
+        Stage(
+            "audio", audio, deps=("generate",),
+            params={
+                "voice": get_tts_voice(),
+                "speakers": SPEAKER_VOICES,
+                "url": TTS_URL,
+                "model": get_tts_model_version(),
+                "target_db": TARGET_LOUDNESS_DB,
+                "crossfade": DEFAULT_CROSSFADE,
+                "formats": {name: ENCODE_TARGETS[name].bitrate for name in DEFAULT_FORMATS},
+            },
+            is_valid=lambda out: _files_exist(
+                episode_dir, [*out["processed"], out["episode_wav"], *out["encoded"].values()]
+            ),
+        ),
+        Stage(
+            "chapters", chapters, deps=("select", "audio"),
+            # Re-encoding the MP3 drops its chapter tag, so check for the tag, not just the file.
+            is_valid=lambda out: (episode_dir / out["json"]).exists()
+            and (not out["mp3"] or has_id3_chapters(episode_dir / out["mp3"])),
+        ),
+        Stage(
+            "publish", publish, deps=("select", "audio", "chapters"),
+            params={"bucket": get_bucket(), "endpoint": get_endpoint_url(), "public_url": get_public_base_url()},
+        ),
+    ]
+    return StageGraph(episode_dir / "stages", stages)
 
+
+def stage_names() -> list[str]:
+    """Stage order as wired by build_stage_graph; building the graph runs nothing."""
+    return build_stage_graph(dt.date.today(), EPISODES_DIR).names
+
+
+def run_pipeline(
+    episode_date: dt.date | None = None,
+    use_stub: bool = True,
+    store: bool = True,
+    from_stage: str | None = None,
+    only_stage: str | None = None,
+    to_stage: str | None = DEFAULT_LAST_STAGE,
+) -> Path:
+    """Run the episode stage graph, skipping stages whose inputs are unchanged.
+
+    By default the graph stops after `store`; pass `to_stage="publish"` (or
+    `only_stage`) to continue into audio (TTS, processing, stitching and encoding,
+    pipelined) and publishing.
+    """
+    episode_date = episode_date or dt.date.today()
+    episode_dir = EPISODES_DIR / episode_date.isoformat()
+
+    graph = build_stage_graph(episode_date, episode_dir, use_stub=use_stub, store=store)
+    if from_stage and to_stage and graph.names.index(from_stage) > graph.names.index(to_stage):
+        # e.g. `--from-stage audio` on its own means "redo audio", not an empty range.
+        to_stage = None
+    graph.run(from_stage=from_stage, only_stage=only_stage, to_stage=to_stage)
     return episode_dir
 
 
@@ -111,6 +392,16 @@ def _parse_args() -> argparse.Namespace:
     parser.add_argument("--test", action="store_true", help="Run in stubbed test mode")
     parser.add_argument("--live", action="store_true", help="Use live source integrations (not stubbed)")
     parser.add_argument("--no-store", action="store_true", help="Skip storage")
+    names = stage_names()
+    stage_group = parser.add_mutually_exclusive_group()
+    stage_group.add_argument("--from-stage", choices=names, help="Rerun this stage and every later one")
+    stage_group.add_argument("--only-stage", choices=names, help="Rerun just this stage from existing artifacts")
+    parser.add_argument(
+        "--to-stage",
+        choices=names,
+        default=DEFAULT_LAST_STAGE,
+        help=f"Stop after this stage (default: {DEFAULT_LAST_STAGE})",
+    )
     return parser.parse_args()
 
 
@@ -118,7 +409,17 @@ def main() -> None:
     args = _parse_args()
     episode_date = dt.date.fromisoformat(args.date) if args.date else None
     use_stub = not args.live
-    run_pipeline(episode_date=episode_date, use_stub=use_stub, store=not args.no_store)
+    try:
+        run_pipeline(
+            episode_date=episode_date,
+            use_stub=use_stub,
+            store=not args.no_store,
+            from_stage=args.from_stage,
+            only_stage=args.only_stage,
+            to_stage=args.to_stage,
+        )
+    except StageError as exc:
+        raise SystemExit(str(exc)) from exc
 
 
 if __name__ == "__main__":
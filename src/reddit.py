@@ -3,14 +3,27 @@
 from __future__ import annotations
 
 import datetime as dt
+import heapq
 import os
 import time
 from typing import Iterable
 
+from requests.structures import CaseInsensitiveDict
+
+from .daemons import daemon_map
+from .http_cache import HTTPReplayMiss, get_session
 from .models import Story, SourceMeta
 
 DEFAULT_SUBREDDITS = ["singularity", "LocalLLaMA", "Accelerate"]
 USER_AGENT_DEFAULT = "dtfftl/0.1 (by u/unknown)"
+# Subreddits fetched in parallel. Each worker has its own PRAW client, token and
+# prawcore RateLimiter, so each is left 1/N of the rate-limit window.
+REDDIT_MAX_CONCURRENCY = 4
+# Comments requested per summary slot; the heap picks the best of these.
+COMMENT_CANDIDATES_PER_SLOT = 4
+REMOVED_COMMENT_BODIES = {"[deleted]", "[removed]"}
+# First retry delay for transient Reddit errors without a retry-after header; doubles per attempt.
+RETRY_BACKOFF_SECONDS = 5.0
 
 
 class RedditUnavailable(RuntimeError):
@@ -34,32 +47,172 @@ def _get_reddit_client():
         client_id=client_id,
         client_secret=client_secret,
         user_agent=user_agent,
+        requestor_kwargs={"session": get_session()},
     )
 
 
 def _summarize_comments(submission, max_comments: int = 3, max_chars: int = 500) -> str:
-    try:
-        submission.comments.replace_more(limit=0)
-        comments = list(submission.comments)
-    except Exception:
-        return ""
+    """Summarize the highest-scoring top-level comments.
+
+    Asks for one small page of comments already sorted by "top" instead of
+    PRAW's default 2048-comment page. The page arrives in a single request
+    when `submission.comments` is first read; MoreComments stubs are skipped,
+    never expanded, so nothing past it is fetched. A heap picks the best.
+    """
+    submission.comment_sort = "top"
+    submission.comment_limit = max_comments * COMMENT_CANDIDATES_PER_SLOT
+    candidates = (
+        comment
+        for comment in submission.comments
+        if getattr(comment, "body", None) and comment.body not in REMOVED_COMMENT_BODIES
+    )
+    top = heapq.nlargest(max_comments, candidates, key=lambda c: getattr(c, "score", 0) or 0)
 
-    top = sorted(comments, key=lambda c: getattr(c, "score", 0), reverse=True)[:max_comments]
+    prefix = "Top comments: "
+    length = len(prefix)
     parts = []
     for idx, comment in enumerate(top, start=1):
-        body = getattr(comment, "body", "")
-        score = getattr(comment, "score", 0)
-        if not body:
-            continue
-        body = " ".join(body.split())
+        if length >= max_chars:
+            break
+        body = " ".join(comment.body.split())
         if len(body) > 220:
             body = body[:217].rstrip() + "..."
-        parts.append(f"{idx}) {body} (score {score})")
+        part = f"{idx}) {body} (score {getattr(comment, 'score', 0)})"
+        parts.append(part)
+        length += len(part) + 1
 
-    summary = "Top comments: " + " ".join(parts) if parts else ""
+    summary = prefix + " ".join(parts) if parts else ""
     return summary[:max_chars]
 
 
+def _share_rate_limit(client, shares: int) -> None:
+    """Make a client's rate limiter plan for 1/shares of the window's request budget.
+
+    prawcore spreads the requests left in the window (x-ratelimit-remaining)
+    over the time to reset; with `shares` clients doing the same each would
+    spend the whole budget. Rewriting the remaining count to this client's
+    share keeps the workers together within it.
+    """
+    if shares <= 1:
+        return
+    limiter = client._core.rate_limiter
+    update = limiter.update
+
+    def update_share(*, response_headers) -> None:
+        if "x-ratelimit-remaining" in response_headers:
+            used = float(response_headers["x-ratelimit-used"])
+            budget = float(response_headers["x-ratelimit-remaining"]) + used
+            response_headers = CaseInsensitiveDict(response_headers)
+            response_headers["x-ratelimit-remaining"] = str(max(budget / shares - used, 0.0))
+        update(response_headers=response_headers)
+
+    limiter.update = update_share
+
+
+def _rate_limited(func, *args, retries: int = 2, default=None):
+    """Call func, retrying rate limits (429) and transient server or network errors.
+
+    Other Reddit API errors (a private subreddit, a deleted post) are reported
+    and yield `default`; anything else propagates.
+    """
+    try:
+        from praw.exceptions import PRAWException
+        from prawcore import exceptions as prawcore_errors
+    except Exception:
+        return func(*args)
+
+    transient = (prawcore_errors.TooManyRequests, prawcore_errors.ServerError, prawcore_errors.RequestException)
+    for attempt in range(retries + 1):
+        try:
+            return func(*args)
+        except transient as exc:
+            if isinstance(getattr(exc, "original_exception", None), HTTPReplayMiss):
+                print(f"Reddit request was not recorded: {exc.original_exception}; skipping")
+                return default
+            if attempt == retries:
+                print(f"Reddit request failed after {retries + 1} attempts: {exc}; skipping")
+                return default
+            retry_after = getattr(exc, "retry_after", None)
+            time.sleep(float(retry_after) if retry_after else RETRY_BACKOFF_SECONDS * 2**attempt)
+        except (prawcore_errors.PrawcoreException, PRAWException) as exc:
+            print(f"Reddit request failed: {exc!r}; skipping")
+            return default
+    return default
+
+
+def _recent_submissions(client, subreddit: str, limit: int, cutoff: dt.datetime) -> list[tuple[str, object]]:
+    """Up to `limit` submissions newer than cutoff from a subreddit's top and hot feeds."""
+    listing = client.subreddit(subreddit)
+    picked: list[tuple[str, object]] = []
+    seen_ids: set[str] = set()
+
+    def scan(feed_name: str, feed) -> None:
+        for submission in feed:
+            created = dt.datetime.utcfromtimestamp(submission.created_utc)
+            if created < cutoff or submission.id in seen_ids:
+                continue
+            seen_ids.add(submission.id)
+            picked.append((feed_name, submission))
+            if len(picked) >= limit:
+                return
+
+    _rate_limited(scan, "top", listing.top(time_filter="day", limit=limit * 2))
+    if len(picked) < limit:
+        _rate_limited(scan, "hot", listing.hot(limit=limit * 2))
+    return picked
+
+
+def _subreddit_stories(
+    subreddit: str, limit: int, cutoff: dt.datetime, max_comment_summaries: int, shares: int
+) -> list[Story]:
+    """One worker's share: a subreddit's recent submissions and their comment summaries."""
+    client = _get_reddit_client()
+    _share_rate_limit(client, shares)
+    stories: list[Story] = []
+    for feed_name, submission in _recent_submissions(client, subreddit, limit, cutoff):
+        comments_summary = _rate_limited(_summarize_comments, submission, max_comment_summaries, default="")
+        try:
+            stories.append(_submission_to_story(submission, subreddit, feed_name, comments_summary))
+        except Exception:
+            continue
+    return stories
+
+
+def _submission_to_story(submission, subreddit: str, feed_name: str, comments_summary: str) -> Story:
+    created = dt.datetime.utcfromtimestamp(submission.created_utc)
+    selftext = submission.selftext or ""
+    summary = selftext.strip()[:400] if selftext else ""
+    if not summary:
+        summary = comments_summary or submission.title
+
+    raw_text_parts = [text for text in (selftext, comments_summary) if text]
+    raw_text = "\n\n".join(raw_text_parts).strip()
+
+    meta = SourceMeta(
+        source="reddit",
+        subreddit=subreddit,
+        author=getattr(submission, "author", None).name if submission.author else None,
+        score=getattr(submission, "score", 0),
+        comments=getattr(submission, "num_comments", 0),
+        url=submission.url,
+        extra={
+            "created_utc": created.isoformat(),
+            "selftext": selftext,
+            "comments_summary": comments_summary,
+            "feed": feed_name,
+        },
+    )
+    return Story(
+        id=f"reddit-{submission.id}",
+        title=submission.title,
+        summary=summary,
+        source_url=submission.url,
+        source_meta=meta,
+        raw_text=raw_text,
+        tags=["reddit", subreddit],
+    )
+
+
 def fetch_reddit_stories(
     subreddits: Iterable[str] | None = None,
     limit_per_subreddit: int = 5,
@@ -73,82 +226,16 @@ def fetch_reddit_stories(
     subreddits = list(subreddits or DEFAULT_SUBREDDITS)
 
     if not use_stub:
-        reddit = _get_reddit_client()
-        now = dt.datetime.utcnow()
-        cutoff = now - dt.timedelta(hours=24)
-        stories: list[Story] = []
-        seen_ids: set[str] = set()
-
-        try:
-            from prawcore.exceptions import RateLimitExceeded
-        except Exception:
-            RateLimitExceeded = Exception
-
-        count_by_subreddit: dict[str, int] = {name: 0 for name in subreddits}
-
-        for subreddit in subreddits:
-            listing = reddit.subreddit(subreddit)
-            for feed_name, feed in (
-                ("top", listing.top(time_filter="day", limit=limit_per_subreddit * 2)),
-                ("hot", listing.hot(limit=limit_per_subreddit * 2)),
-            ):
-                for submission in feed:
-                    try:
-                        created = dt.datetime.utcfromtimestamp(submission.created_utc)
-                        if created < cutoff:
-                            continue
-                        if submission.id in seen_ids:
-                            continue
-                        seen_ids.add(submission.id)
-
-                        selftext = submission.selftext or ""
-                        summary = selftext.strip()[:400] if selftext else ""
-                        comments_summary = _summarize_comments(
-                            submission, max_comments=max_comment_summaries
-                        )
-                        if not summary:
-                            summary = comments_summary or submission.title
-
-                        raw_text_parts = [text for text in (selftext, comments_summary) if text]
-                        raw_text = "\n\n".join(raw_text_parts).strip()
-
-                        meta = SourceMeta(
-                            source="reddit",
-                            subreddit=subreddit,
-                            author=getattr(submission, "author", None).name if submission.author else None,
-                            score=getattr(submission, "score", 0),
-                            comments=getattr(submission, "num_comments", 0),
-                            url=submission.url,
-                            extra={
-                                "created_utc": created.isoformat(),
-                                "selftext": selftext,
-                                "comments_summary": comments_summary,
-                                "feed": feed_name,
-                            },
-                        )
-                        stories.append(
-                            Story(
-                                id=f"reddit-{submission.id}",
-                                title=submission.title,
-                                summary=summary,
-                                source_url=submission.url,
-                                source_meta=meta,
-                                raw_text=raw_text,
-                                tags=["reddit", subreddit],
-                            )
-                        )
-                        count_by_subreddit[subreddit] += 1
-                        if count_by_subreddit[subreddit] >= limit_per_subreddit:
-                            break
-                    except RateLimitExceeded as exc:
-                        sleep_for = getattr(exc, "sleep_time", 5) + 1
-                        time.sleep(sleep_for)
-                        continue
-                    except Exception:
-                        continue
-                if count_by_subreddit[subreddit] >= limit_per_subreddit:
-                    break
-        return stories
+        _get_reddit_client()
+        cutoff = dt.datetime.utcnow() - dt.timedelta(hours=24)
+        workers = max(1, min(REDDIT_MAX_CONCURRENCY, len(subreddits)))
+        per_subreddit = daemon_map(
+            lambda name: _subreddit_stories(name, limit_per_subreddit, cutoff, max_comment_summaries, workers),
+            subreddits,
+            workers,
+            "reddit",
+        )
+        return [story for stories in per_subreddit for story in stories]
 
     now = dt.datetime.utcnow().strftime("%Y-%m-%d")
     stories: list[Story] = []
@@ -0,0 +1,152 @@
+"""Checkpointed stage graph for the DTF:FTL pipeline.
+
+Each stage writes a JSON artifact under `<episode_dir>/stages/<name>.json`
+holding its output and two hashes: one over its inputs (stage version,
+parameters and the output hashes of the stages it depends on) and one over
+its output. On a rerun, a stage whose input hash matches its artifact is
+skipped and its recorded output reused, so a failure in TTS or storage does
+not mean collecting and generating again.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+
+class StageError(RuntimeError):
+    pass
+
+
+def content_hash(value: Any) -> str:
+    payload = json.dumps(value, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def file_hash(path: Path, chunk_size: int = 1 << 20) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as handle:
+        for chunk in iter(lambda: handle.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+@dataclass
+class Stage:
+    name: str
+    run: Callable[[dict[str, Any]], Any]
+    deps: tuple[str, ...] = ()
+    params: dict = field(default_factory=dict)
+    version: int = 1
+    # Optional check that a reused output is still intact (e.g. files on disk).
+    is_valid: Optional[Callable[[Any], bool]] = None
+
+
+class StageGraph:
+    """Runs stages in declaration order, reusing artifacts whose inputs are unchanged."""
+
+    def __init__(self, artifact_dir: Path, stages: list[Stage]) -> None:
+        self.artifact_dir = artifact_dir
+        self.stages = stages
+        self.names = [stage.name for stage in stages]
+        if len(set(self.names)) != len(self.names):
+            raise ValueError("stage names must be unique")
+        for stage in stages:
+            unknown = [dep for dep in stage.deps if dep not in self.names[: self.names.index(stage.name)]]
+            if unknown:
+                raise ValueError(f"stage {stage.name} depends on unknown or later stages: {unknown}")
+
+    def _artifact_path(self, name: str) -> Path:
+        return self.artifact_dir / f"{name}.json"
+
+    def load_artifact(self, name: str) -> Optional[dict]:
+        path = self._artifact_path(name)
+        if not path.exists():
+            return None
+        try:
+            return json.loads(path.read_text(encoding="utf-8"))
+        except ValueError:
+            return None
+
+    def _save_artifact(self, stage: Stage, input_hash: str, output: Any) -> dict:
+        artifact = {
+            "stage": stage.name,
+            "version": stage.version,
+            "input_hash": input_hash,
+            "output_hash": content_hash(output),
+            "completed_at": datetime.utcnow().isoformat(),
+            "output": output,
+        }
+        self.artifact_dir.mkdir(parents=True, exist_ok=True)
+        path = self._artifact_path(stage.name)
+        tmp_path = path.with_suffix(".json.tmp")
+        tmp_path.write_text(json.dumps(artifact, indent=2, default=str), encoding="utf-8")
+        os.replace(tmp_path, path)
+        return artifact
+
+    def _index(self, name: Optional[str], flag: str) -> Optional[int]:
+        if name is None:
+            return None
+        if name not in self.names:
+            raise StageError(f"Unknown stage for {flag}: {name}. Choose from: {', '.join(self.names)}")
+        return self.names.index(name)
+
+    def run(
+        self,
+        from_stage: str | None = None,
+        only_stage: str | None = None,
+        to_stage: str | None = None,
+    ) -> dict[str, Any]:
+        """Run the graph and return every produced or reused output by stage name.
+
+        `from_stage` forces that stage and everything after it to rerun;
+        `only_stage` reruns one stage on top of existing upstream artifacts;
+        `to_stage` stops after the named stage.
+        """
+        if from_stage and only_stage:
+            raise StageError("--from-stage and --only-stage are mutually exclusive")
+        only_idx = self._index(only_stage, "--only-stage")
+        from_idx = self._index(from_stage, "--from-stage")
+        to_idx = self._index(to_stage, "--to-stage")
+        last_idx = only_idx if only_idx is not None else (to_idx if to_idx is not None else len(self.stages) - 1)
+        if from_idx is not None and from_idx > last_idx:
+            raise StageError(f"--from-stage {from_stage} comes after --to-stage {to_stage}")
+
+        outputs: dict[str, Any] = {}
+        output_hashes: dict[str, str] = {}
+        for idx, stage in enumerate(self.stages[: last_idx + 1]):
+            input_hash = content_hash({
+                "stage": stage.name,
+                "version": stage.version,
+                "params": stage.params,
+                "deps": {dep: output_hashes[dep] for dep in stage.deps},
+            })
+            artifact = self.load_artifact(stage.name)
+
+            if only_idx is not None and idx < only_idx:
+                if artifact is None:
+                    raise StageError(f"--only-stage {only_stage} needs a {stage.name} artifact; run that stage first")
+                outputs[stage.name] = artifact["output"]
+                output_hashes[stage.name] = artifact["output_hash"]
+                continue
+
+            forced = (from_idx is not None and idx >= from_idx) or idx == only_idx
+            reusable = (
+                artifact is not None
+                and artifact.get("input_hash") == input_hash
+                and (stage.is_valid is None or stage.is_valid(artifact["output"]))
+            )
+            if reusable and not forced:
+                print(f"[{stage.name}] inputs unchanged; reusing artifact")
+            else:
+                print(f"[{stage.name}] running")
+                output = stage.run({dep: outputs[dep] for dep in stage.deps})
+                artifact = self._save_artifact(stage, input_hash, output)
+            outputs[stage.name] = artifact["output"]
+            output_hashes[stage.name] = artifact["output_hash"]
+        return outputs
@@ -6,10 +6,12 @@ Uses LanceDB when available; falls back to JSON for stub/testing.
 from __future__ import annotations
 
 import json
-from datetime import datetime
+import math
+from datetime import datetime, timedelta
 from pathlib import Path
 from typing import Iterable, Optional
 
+import numpy as np
 import pyarrow as pa
 
 from dataclasses import asdict
@@ -25,6 +27,24 @@ FALLBACK_EPISODES = DATA_DIR / "episodes.json"
 
 SCHEMA_VERSION = 1
 
+# Maximum number of values in a single IN (...) clause when resolving dedup keys.
+DEDUP_CHUNK_SIZE = 500
+
+# Compact a table once it has accumulated this many fragments.
+COMPACTION_FRAGMENT_THRESHOLD = 32
+# Old table versions are kept this long before compaction cleans them up.
+COMPACTION_RETENTION = timedelta(days=7)
+
+DEDUP_COLUMNS = ["id", "url", "arxiv_id", "used_in_episode"]
+
+# Build an IVF-PQ vector index once a table holds this many rows; below it
+# brute-force search is fast enough and exact.
+INDEX_MIN_ROWS = 10_000
+# Retrain the index from scratch once unindexed rows exceed this fraction of
+# indexed rows; smaller backlogs are folded in incrementally.
+INDEX_REBUILD_RATIO = 0.5
+INDEX_SUB_VECTOR_DIM = 16
+
 
 class StorageUnavailable(RuntimeError):
     pass
@@ -81,16 +101,61 @@ def _safe_value(value: str) -> str:
     return value.replace("'", "''")
 
 
-def _story_lookup_filter(story: Story) -> Optional[str]:
-    clauses = []
+def _story_keys(story: Story) -> list[tuple[str, str]]:
+    keys = []
     if story.id:
-        clauses.append(f"id = '{_safe_value(story.id)}'")
+        keys.append(("id", story.id))
     if story.source_url:
-        clauses.append(f"url = '{_safe_value(story.source_url)}'")
+        keys.append(("url", story.source_url))
     arxiv_id = story.source_meta.extra.get("arxiv_id")
     if arxiv_id:
-        clauses.append(f"arxiv_id = '{_safe_value(arxiv_id)}'")
-    return " OR ".join(clauses) if clauses else None
+        keys.append(("arxiv_id", arxiv_id))
+    return keys
+
+
+def _in_clause(column: str, values: Iterable[str]) -> str:
+    quoted = ", ".join(f"'{_safe_value(value)}'" for value in values)
+    return f"{column} IN ({quoted})"
+
+
+def _date_window(column: str, since: str, before: str) -> str:
+    return f"{column} >= '{_safe_value(since)}' AND {column} < '{_safe_value(before)}'"
+
+
+def _find_existing_stories(table, stories: list[Story]) -> dict[tuple[str, str], dict]:
+    """Resolve every id/url/arxiv_id in the batch against the table.
+
+    Runs one filtered scan per chunk of keys instead of one query per story,
+    and returns a map of (column, value) -> existing row.
+    """
+    keys: dict[str, set[str]] = {"id": set(), "url": set(), "arxiv_id": set()}
+    for story in stories:
+        for column, value in _story_keys(story):
+            keys[column].add(value)
+
+    clauses = []
+    for column, values in keys.items():
+        ordered = sorted(values)
+        for start in range(0, len(ordered), DEDUP_CHUNK_SIZE):
+            clauses.append(_in_clause(column, ordered[start:start + DEDUP_CHUNK_SIZE]))
+
+    existing: dict[tuple[str, str], dict] = {}
+    if not clauses or table.count_rows() == 0:
+        return existing
+    for clause in clauses:
+        query = table.search().where(clause, prefilter=True).select(DEDUP_COLUMNS).limit(None)
+        rows = query.to_arrow().to_pylist()
+        for row in rows:
+            for column in keys:
+                value = row.get(column)
+                if value:
+                    existing.setdefault((column, value), row)
+    return existing
+
+
+def story_embedding_text(story: Story) -> str:
+    """Text a story's vector is computed from."""
+    return (story.raw_text or story.summary or story.title or "").strip()
 
 
 def _story_to_row(story: Story, vector: list[float], used_episode_date: str | None) -> dict:
@@ -120,13 +185,130 @@ def _story_to_row(story: Story, vector: list[float], used_episode_date: str | No
     }
 
 
-def _update_story_usage(table, existing: dict, used_episode_date: str) -> None:
-    existing["used_in_episode"] = True
-    existing["used_episode_date"] = used_episode_date
-    story_id = existing.get("id")
-    if story_id:
-        table.delete(f"id = '{_safe_value(story_id)}'")
-    table.add([existing])
+def _mark_stories_used(table, story_ids: Iterable[str], used_episode_date: str) -> None:
+    """Flag existing stories as used with one table update per chunk of ids.
+
+    Only the usage columns are rewritten, so vectors are never re-uploaded and
+    a typical episode lands as a single commit.
+    """
+    ordered = sorted(set(story_ids))
+    for start in range(0, len(ordered), DEDUP_CHUNK_SIZE):
+        table.update(
+            where=_in_clause("id", ordered[start:start + DEDUP_CHUNK_SIZE]),
+            values={"used_in_episode": True, "used_episode_date": used_episode_date},
+        )
+
+
+def _fragment_count(table) -> Optional[int]:
+    try:
+        return table.stats()["fragment_stats"]["num_fragments"]
+    except Exception:
+        pass
+    try:
+        return len(table.to_lance().get_fragments())
+    except Exception:
+        return None
+
+
+def compact_tables(
+    tables: Iterable[str] = ("stories", "episodes"),
+    fragment_threshold: int = COMPACTION_FRAGMENT_THRESHOLD,
+    force: bool = False,
+) -> dict[str, bool]:
+    """Compact LanceDB tables whose fragment count has grown past the threshold.
+
+    Returns a map of table name -> whether it was compacted.
+    """
+    db = _try_get_db()
+    if db is None:
+        raise StorageUnavailable("LanceDB not available. Install dependencies or use fallback.")
+
+    names = _table_names(db)
+    compacted: dict[str, bool] = {}
+    for name in tables:
+        if name not in names:
+            continue
+        table = db.open_table(name)
+        fragments = _fragment_count(table)
+        if not force and (fragments is None or fragments < fragment_threshold):
+            compacted[name] = False
+            continue
+        if hasattr(table, "optimize"):
+            table.optimize(cleanup_older_than=COMPACTION_RETENTION)
+        else:
+            table.compact_files()
+            table.cleanup_old_versions(COMPACTION_RETENTION)
+        compacted[name] = True
+    return compacted
+
+
+def _vector_index(table):
+    try:
+        indices = table.list_indices()
+    except Exception:
+        return None
+    for index in indices:
+        if "vector" in list(getattr(index, "columns", [])):
+            return index
+    return None
+
+
+def _index_row_counts(table, index) -> tuple[int, int]:
+    stats = table.index_stats(index.name)
+    if isinstance(stats, dict):
+        return stats.get("num_indexed_rows", 0), stats.get("num_unindexed_rows", 0)
+    return stats.num_indexed_rows, stats.num_unindexed_rows
+
+
+def _create_vector_index(table, row_count: int) -> None:
+    num_partitions = max(1, int(math.sqrt(row_count)))
+    num_sub_vectors = EMBEDDING_DIM // INDEX_SUB_VECTOR_DIM
+    try:
+        from lancedb.index import IvfPq
+    except ImportError:
+        table.create_index(
+            num_partitions=num_partitions,
+            num_sub_vectors=num_sub_vectors,
+            vector_column_name="vector",
+            replace=True,
+        )
+        return
+    table.create_index(
+        "vector",
+        config=IvfPq(num_partitions=num_partitions, num_sub_vectors=num_sub_vectors),
+        replace=True,
+    )
+
+
+def ensure_vector_index(
+    table,
+    min_rows: int = INDEX_MIN_ROWS,
+    rebuild_ratio: float = INDEX_REBUILD_RATIO,
+) -> str:
+    """Create, refresh or rebuild the IVF-PQ index on a table's vector column.
+
+    Returns one of "skipped", "created", "current", "updated" or "rebuilt".
+    """
+    row_count = table.count_rows()
+    index = _vector_index(table)
+    if index is None:
+        if row_count < min_rows:
+            return "skipped"
+        print(f"Building vector index on {table.name} ({row_count} rows)...")
+        _create_vector_index(table, row_count)
+        return "created"
+
+    indexed, unindexed = _index_row_counts(table, index)
+    if unindexed == 0:
+        return "current"
+    if unindexed > indexed * rebuild_ratio:
+        print(f"Rebuilding vector index on {table.name} ({unindexed} unindexed rows)...")
+        _create_vector_index(table, row_count)
+        return "rebuilt"
+    if not hasattr(table, "optimize"):
+        return "current"
+    table.optimize()
+    return "updated"
 
 
 def store_stories_batch(
@@ -147,24 +329,27 @@ def store_stories_batch(
             schema=STORIES_SCHEMA,
         )
 
+        existing_rows = _find_existing_stories(table, stories)
         new_stories: list[Story] = []
+        used_ids: set[str] = set()
+        batch_keys: set[tuple[str, str]] = set()
         for story in stories:
-            lookup = _story_lookup_filter(story)
-            if lookup:
-                existing = table.search().where(lookup, prefilter=True).limit(1).to_list()
-            else:
-                existing = []
-
-            if existing:
-                if mark_used and not existing[0].get("used_in_episode"):
-                    _update_story_usage(table, existing[0], episode_date)
+            keys = _story_keys(story)
+            existing = next((existing_rows[key] for key in keys if key in existing_rows), None)
+            if existing is not None:
+                if mark_used and not existing.get("used_in_episode") and existing.get("id"):
+                    used_ids.add(existing["id"])
                 continue
+            if any(key in batch_keys for key in keys):
+                continue
+            batch_keys.update(keys)
             new_stories.append(story)
 
+        if used_ids:
+            _mark_stories_used(table, used_ids, episode_date)
+
         if new_stories:
-            embed_texts = [
-                (s.raw_text or s.summary or s.title or "").strip() for s in new_stories
-            ]
+            embed_texts = [story_embedding_text(story) for story in new_stories]
             try:
                 vectors = embed_batch(embed_texts)
             except Exception as exc:
@@ -174,6 +359,7 @@ def store_stories_batch(
                 for story, vector in zip(new_stories, vectors)
             ]
             table.add(rows)
+            ensure_vector_index(table)
         return
 
     # Fallback JSON storage
@@ -207,6 +393,7 @@ def store_episode(episode_date: str, episode_text: str, manifest: dict, use_lanc
                 "vector": vector,
             }]
         )
+        ensure_vector_index(table)
         return
 
     payload = {"episode_date": episode_date, "episode_text": episode_text, "manifest": manifest}
@@ -214,6 +401,35 @@ def store_episode(episode_date: str, episode_text: str, manifest: dict, use_lanc
     FALLBACK_EPISODES.write_text(json.dumps(payload, indent=2), encoding="utf-8")
 
 
+def _vector_matrix(table, where: str) -> np.ndarray:
+    result = table.search().where(where, prefilter=True).select(["vector"]).limit(None).to_arrow()
+    if result.num_rows == 0:
+        return np.empty((0, EMBEDDING_DIM), dtype=np.float32)
+    values = result.column("vector").combine_chunks().flatten().to_numpy(zero_copy_only=False)
+    return values.astype(np.float32, copy=False).reshape(result.num_rows, -1)
+
+
+def load_recent_vectors(since_date: str, before_date: str) -> np.ndarray:
+    """Vectors of episodes and used stories dated in [since_date, before_date).
+
+    Returns a single (rows, EMBEDDING_DIM) float32 matrix for vectorized
+    novelty scoring.
+    """
+    db = _try_get_db()
+    if db is None:
+        raise StorageUnavailable("LanceDB not available. Install dependencies or use fallback.")
+
+    names = _table_names(db)
+    matrices = [np.empty((0, EMBEDDING_DIM), dtype=np.float32)]
+    if "episodes" in names:
+        where = _date_window("episode_date", since_date, before_date)
+        matrices.append(_vector_matrix(db.open_table("episodes"), where))
+    if "stories" in names:
+        where = "used_in_episode = true AND " + _date_window("used_episode_date", since_date, before_date)
+        matrices.append(_vector_matrix(db.open_table("stories"), where))
+    return np.vstack(matrices)
+
+
 def list_stories_json() -> Optional[dict]:
     if not FALLBACK_STORIES.exists():
         return None
@@ -3,18 +3,50 @@
 from __future__ import annotations
 
 import os
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import shutil
+import tempfile
+import threading
+import time
 from pathlib import Path
+from typing import Callable, Optional
 
 import requests
 
+from .audio import concat_wavs
+from .tts_cache import TTSCache, render_key
+from .tts_scheduler import (
+    DEFAULT_BACKOFF,
+    DEFAULT_INITIAL_CONCURRENCY,
+    DEFAULT_MAX_CONCURRENCY,
+    DEFAULT_RETRIES,
+    AIMDLimiter,
+    LineJob,
+    RenderOutcome,
+    parse_script_lines,
+    run_line_jobs,
+)
+
 TTS_URL = "http://192.168.0.134:7849/speak"
-TTS_TIMEOUT = 3600
+TTS_CONNECT_TIMEOUT = 10
+# Read timeout per request; requests are single lines, so a stuck render is
+# retried instead of holding a worker for an hour.
+TTS_TIMEOUT = 600
 MIN_WAV_SIZE_BYTES = 1000
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+# Part of every render cache key; bump (or set DTFFTL_TTS_MODEL_VERSION) when
+# the quato server's model or voices change so stale audio is not reused.
+TTS_MODEL_VERSION = "quato-1"
+
+_cache: TTSCache | None = None
 
 CHARACTER_TTS_VOICES = {
     "forbin": "forbin",
 }
+SPEAKER_VOICES = {
+    "STEPHEN": "stephen_fry",
+    "PHILIP": "philip_fry",
+}
 
 
 class TTSUnavailable(RuntimeError):
@@ -26,6 +58,24 @@ def get_tts_voice() -> str:
     return CHARACTER_TTS_VOICES.get(char, "forbin")
 
 
+def get_tts_model_version() -> str:
+    return os.environ.get("DTFFTL_TTS_MODEL_VERSION", TTS_MODEL_VERSION)
+
+
+def get_tts_cache() -> TTSCache | None:
+    """Shared render cache, or None when disabled via DTFFTL_TTS_CACHE=0."""
+    global _cache
+    if os.environ.get("DTFFTL_TTS_CACHE", "1").lower() in {"0", "off", "false", "no"}:
+        return None
+    if _cache is None:
+        _cache = TTSCache()
+    return _cache
+
+
+def tts_render_key(text: str, voice: str | None = None) -> str:
+    return render_key(prepare_text_for_tts(text), voice or get_tts_voice(), get_tts_model_version())
+
+
 def prepare_text_for_tts(text: str) -> str:
     text = text.strip()
     if not text.startswith("—"):
@@ -35,67 +85,243 @@ def prepare_text_for_tts(text: str) -> str:
     return text
 
 
-def validate_wav_bytes(data: bytes) -> tuple[bool, str]:
-    if not data:
+def validate_wav_header(head: bytes) -> tuple[bool, str]:
+    """Check the RIFF/WAVE preamble from the first bytes of a response."""
+    if not head:
         return (False, "empty response")
-    if len(data) < MIN_WAV_SIZE_BYTES:
-        return (False, f"too small ({len(data)} bytes)")
-    if data[:4] != b"RIFF":
+    if head[:4] != b"RIFF" or (len(head) >= 12 and head[8:12] != b"WAVE"):
         return (False, "invalid WAV header")
     return (True, "")
 
 
-def text_to_speech(text: str, output_path: Path, voice: str | None = None) -> tuple[bool, str]:
-    voice = voice or get_tts_voice()
-    prepared = prepare_text_for_tts(text)
+def _stream_to_file(response: requests.Response, tmp_path: Path) -> tuple[bool, str]:
+    written = 0
+    head = b""
+    with open(tmp_path, "wb") as handle:
+        for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+            if not chunk:
+                continue
+            if len(head) < 12:
+                head += chunk[: 12 - len(head)]
+                if len(head) >= 4:
+                    valid, error = validate_wav_header(head)
+                    if not valid:
+                        return (False, error)
+            handle.write(chunk)
+            written += len(chunk)
+
+    valid, error = validate_wav_header(head)
+    if not valid:
+        return (False, error)
+    if written < MIN_WAV_SIZE_BYTES:
+        return (False, f"too small ({written} bytes)")
+    expected = response.headers.get("Content-Length", "")
+    if expected.isdigit() and int(expected) != written:
+        return (False, f"truncated ({written} of {expected} bytes)")
+    return (True, "")
+
+
+def _download_wav(response: requests.Response, tmp_path: Path) -> tuple[bool, str]:
+    """Stream a WAV response into tmp_path, validating the header from the first chunk.
+
+    Memory use is bounded by the chunk size however long the segment is, and
+    tmp_path is removed on any failure so nothing partial is left behind.
+    """
+    try:
+        ok, error = _stream_to_file(response, tmp_path)
+    except Exception as exc:
+        ok, error = False, f"download failed: {exc}"
+    finally:
+        response.close()
+    if not ok:
+        tmp_path.unlink(missing_ok=True)
+    return (ok, error)
+
+
+def _render(prepared: str, voice: str, output_path: Path, cache: TTSCache | None, key: str) -> RenderOutcome:
+    started = time.monotonic()
     try:
         response = requests.post(
             TTS_URL,
             headers={"Content-Type": "application/json"},
             json={"text": prepared, "voice": voice, "timeout": 0},
-            timeout=(10, TTS_TIMEOUT),
+            timeout=(TTS_CONNECT_TIMEOUT, TTS_TIMEOUT),
+            stream=True,
         )
     except Exception as exc:
-        return (False, f"request failed: {exc}")
+        return RenderOutcome(ok=False, error=f"request failed: {exc}", retryable=True)
 
     if response.status_code != 200:
-        return (False, f"HTTP {response.status_code}: {response.text[:100]}")
+        latency = time.monotonic() - started
+        detail = response.text[:100]
+        response.close()
+        return RenderOutcome(
+            ok=False,
+            error=f"HTTP {response.status_code}: {detail}",
+            retryable=response.status_code in RETRYABLE_STATUS,
+            latency=latency,
+        )
 
-    valid, error = validate_wav_bytes(response.content)
-    if not valid:
-        return (False, error)
+    # Download next to the final file so the rename below stays on one filesystem.
+    final_dir = cache.path_for(key).parent if cache is not None else output_path.parent
+    final_dir.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(dir=final_dir, suffix=".part")
+    os.close(fd)
+    ok, error = _download_wav(response, Path(tmp_name))
+    latency = time.monotonic() - started
+    if not ok:
+        return RenderOutcome(ok=False, error=error, retryable=True, latency=latency)
 
-    output_path.parent.mkdir(parents=True, exist_ok=True)
-    output_path.write_bytes(response.content)
-    return (True, "")
+    if cache is not None:
+        cache.store_file(key, Path(tmp_name))
+        cache.materialize(key, output_path)
+    else:
+        os.replace(tmp_name, output_path)
+    return RenderOutcome(ok=True, latency=latency)
+
+
+def render_line(text: str, output_path: Path, voice: str) -> RenderOutcome:
+    """Render one line to output_path, from the cache when possible."""
+    prepared = prepare_text_for_tts(text)
+    cache = get_tts_cache()
+    key = render_key(prepared, voice, get_tts_model_version())
+    if cache is not None and cache.lookup(key) is not None:
+        cache.materialize(key, output_path)
+        return RenderOutcome(ok=True)
+    return _render(prepared, voice, output_path, cache, key)
+
+
+def text_to_speech(text: str, output_path: Path, voice: str | None = None) -> tuple[bool, str]:
+    outcome = render_line(text, output_path, voice or get_tts_voice())
+    return (outcome.ok, outcome.error)
 
 
-def _tts_worker(args: tuple[str, str, Path, str]) -> tuple[str, Path | None, str]:
-    name, text, output_path, voice = args
-    success, error = text_to_speech(text, output_path, voice=voice)
-    return (name, output_path if success else None, error)
+def build_line_jobs(
+    segments: list[tuple[str, str]],
+    output_dir: Path,
+    default_voice: str,
+) -> dict[str, list[LineJob]]:
+    """Split each segment into speaker lines routed to their voices, in script order."""
+    jobs: dict[str, list[LineJob]] = {}
+    for name, text in segments:
+        jobs[name] = [
+            LineJob(
+                segment=name,
+                index=idx,
+                speaker=speaker,
+                voice=SPEAKER_VOICES.get(speaker or "", default_voice),
+                text=line,
+                output_path=output_dir / "lines" / name / f"{idx:03d}.wav",
+            )
+            for idx, (speaker, line) in enumerate(parse_script_lines(text, SPEAKER_VOICES))
+        ]
+    return jobs
+
+
+def _assemble_segment(output_dir: Path, name: str, segment_jobs: list[LineJob]) -> Path:
+    output_path = output_dir / f"{name}.wav"
+    if len(segment_jobs) == 1:
+        tmp_path = output_path.with_name(f".{output_path.name}.tmp")
+        shutil.copyfile(segment_jobs[0].output_path, tmp_path)
+        os.replace(tmp_path, output_path)
+    else:
+        concat_wavs([job.output_path for job in segment_jobs], output_path)
+    return output_path
+
+
+SegmentCallback = Callable[[str, Optional[Path], str], None]
 
 
 def text_to_speech_parallel(
     segments: list[tuple[str, str]],
     output_dir: Path,
     voice: str | None = None,
-    max_workers: int = 12,
+    max_workers: int = DEFAULT_MAX_CONCURRENCY,
+    retries: int = DEFAULT_RETRIES,
+    backoff: float = DEFAULT_BACKOFF,
+    on_segment: Optional[SegmentCallback] = None,
+    reorder_window: Optional[int] = None,
 ) -> tuple[list[Path], dict[str, str]]:
+    """Render segments line by line and reassemble one WAV per segment in script order.
+
+    `voice` is used for lines without a known speaker prefix; `max_workers`
+    caps the adaptive number of requests in flight. Each segment is
+    assembled as soon as its last line finishes and reported to
+    `on_segment(name, path, "")`, or `(name, None, error)` on failure. With
+    a `reorder_window`, lines are only started for the first unfinished
+    segment and the `reorder_window - 1` after it, so at most that many
+    segments finish ahead of the one a consumer is waiting for.
+    """
     output_dir.mkdir(parents=True, exist_ok=True)
     voice = voice or get_tts_voice()
+    cache = get_tts_cache()
 
-    work_items = [(name, text, output_dir / f"{name}.wav", voice) for name, text in segments]
-    results: dict[str, Path | None] = {}
+    jobs = build_line_jobs(segments, output_dir, voice)
+    order = {name: idx for idx, (name, _) in enumerate(segments)}
+    remaining = {name: len(segment_jobs) for name, segment_jobs in jobs.items()}
+    finished = [False] * len(segments)
+    head = 0
+    wav_by_segment: dict[str, Path] = {}
     failures: dict[str, str] = {}
+    lock = threading.Lock()
 
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        futures = {executor.submit(_tts_worker, item): item[0] for item in work_items}
-        for future in as_completed(futures):
-            name, path, error = future.result()
-            results[name] = path
-            if path is None:
+    def finish(name: str, path: Optional[Path], error: str) -> None:
+        nonlocal head
+        with lock:
+            if path is not None:
+                wav_by_segment[name] = path
+            else:
                 failures[name] = error
+            finished[order[name]] = True
+            while head < len(finished) and finished[head]:
+                head += 1
+            # Reported under the lock so consumers see segments in the order the head moved.
+            if on_segment is not None:
+                on_segment(name, path, error)
+
+    def on_done(job: LineJob, outcome: RenderOutcome) -> None:
+        with lock:
+            outcomes[(job.segment, job.index)] = outcome
+            remaining[job.segment] -= 1
+            if remaining[job.segment]:
+                return
+        segment_jobs = jobs[job.segment]
+        failed = [line for line in segment_jobs if not outcomes[(job.segment, line.index)].ok]
+        if failed:
+            line = failed[0]
+            error = f"line {line.index} ({line.voice}): {outcomes[(job.segment, line.index)].error}"
+            finish(job.segment, None, error)
+            return
+        try:
+            path = _assemble_segment(output_dir, job.segment, segment_jobs)
+        except Exception as exc:
+            finish(job.segment, None, f"assembly failed: {exc}")
+            return
+        finish(job.segment, path, "")
+
+    def eligible(job: LineJob) -> bool:
+        return reorder_window is None or order[job.segment] < head + reorder_window
+
+    for name, segment_jobs in jobs.items():
+        if not segment_jobs:
+            finish(name, None, "no text to speak")
+
+    limiter = AIMDLimiter(initial=min(DEFAULT_INITIAL_CONCURRENCY, max_workers), maximum=max_workers)
+    outcomes: dict[tuple[str, int], RenderOutcome] = {}
+    run_line_jobs(
+        [job for segment_jobs in jobs.values() for job in segment_jobs],
+        lambda job: render_line(job.text, job.output_path, job.voice),
+        limiter,
+        retries=retries,
+        backoff=backoff,
+        is_cached=lambda job: cache is not None and cache.path_for(tts_render_key(job.text, job.voice)).exists(),
+        eligible=eligible,
+        on_done=on_done,
+    )
 
-    wav_files = [results[name] for name, _ in segments if results.get(name)]
-    return wav_files, failures
+    print(
+        f"TTS: {len(outcomes)} lines, peak {limiter.peak_in_flight} in flight, "
+        f"final limit {int(limiter.limit)}"
+    )
+    wav_files = [wav_by_segment[name] for name, _ in segments if name in wav_by_segment]
+    return wav_files, {name: failures[name] for name, _ in segments if name in failures}
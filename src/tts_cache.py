@@ -0,0 +1,70 @@
+"""Content-addressed TTS render cache for DTF:FTL.
+
+A rendered WAV depends only on the prepared text, the voice and the TTS
+server/model version, so validated WAV bytes are stored once under
+data/tts_cache/ keyed by a hash of those three. Intros, outros and any line
+that did not change come back from disk instead of the quato server, across
+episodes and reruns.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import shutil
+import threading
+from pathlib import Path
+from typing import Optional
+
+PROJECT_ROOT = Path(__file__).parent.parent
+TTS_CACHE_DIR = PROJECT_ROOT / "data" / "tts_cache"
+
+
+def render_key(prepared_text: str, voice: str, model_version: str) -> str:
+    payload = f"{model_version}\0{voice}\0{prepared_text}".encode("utf-8")
+    return hashlib.sha256(payload).hexdigest()
+
+
+class TTSCache:
+    def __init__(self, root: Path = TTS_CACHE_DIR) -> None:
+        self.root = root
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def path_for(self, key: str) -> Path:
+        return self.root / key[:2] / f"{key}.wav"
+
+    def lookup(self, key: str) -> Optional[Path]:
+        path = self.path_for(key)
+        found = path.exists()
+        with self._lock:
+            if found:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return path if found else None
+
+    def store_file(self, key: str, path: Path) -> Path:
+        """Move an already validated file (on the same filesystem) into the store."""
+        target = self.path_for(key)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(path, target)
+        return target
+
+    def materialize(self, key: str, output_path: Path) -> Path:
+        """Place the cached render at output_path (hard link when possible, else copy)."""
+        source = self.path_for(key)
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = output_path.with_name(f".{output_path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp_path.unlink(missing_ok=True)
+        try:
+            os.link(source, tmp_path)
+        except OSError:
+            shutil.copyfile(source, tmp_path)
+        os.replace(tmp_path, output_path)
+        return output_path
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "hit_rate": self.hits / total if total else 0.0}
@@ -0,0 +1,191 @@
+"""Line-level TTS scheduling for DTF:FTL.
+
+Segment scripts are split into speaker lines (``STEPHEN:`` / ``PHILIP:``)
+so each line goes to its own voice. Lines are dispatched longest-first to
+shorten the makespan, and the number of requests in flight against the
+quato server is steered AIMD-style: it grows by one per window of good
+responses, and halves on errors or when per-character latency climbs well
+above the best seen so far. Failed lines are retried with exponential
+backoff.
+"""
+
+from __future__ import annotations
+
+import random
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Optional, Sequence
+
+DEFAULT_INITIAL_CONCURRENCY = 4
+DEFAULT_MIN_CONCURRENCY = 1
+DEFAULT_MAX_CONCURRENCY = 12
+# A response slower per character than this multiple of the best observed
+# rate counts as congestion.
+LATENCY_TOLERANCE = 2.0
+# Fixed per-request cost expressed in characters, so short lines do not look slow.
+LATENCY_OVERHEAD_CHARS = 50
+DEFAULT_RETRIES = 3
+DEFAULT_BACKOFF = 2.0
+
+_SPEAKER_LINE = re.compile(r"^\s*([A-Za-z]+)\s*:\s*(.*)$")
+
+
+@dataclass
+class LineJob:
+    segment: str
+    index: int
+    speaker: Optional[str]
+    voice: str
+    text: str
+    output_path: Path
+
+
+@dataclass
+class RenderOutcome:
+    ok: bool
+    error: str = ""
+    retryable: bool = False
+    # Seconds spent on the server; None for cache hits, which say nothing about load.
+    latency: Optional[float] = None
+
+
+def parse_script_lines(text: str, speakers: Sequence[str]) -> list[tuple[Optional[str], str]]:
+    """Split a script into (speaker, text) lines in script order.
+
+    Only names in `speakers` count as prefixes (matched case-insensitively);
+    unprefixed lines continue the previous speaker's line, and text before
+    any prefix gets speaker None.
+    """
+    known = {name.upper() for name in speakers}
+    lines: list[tuple[Optional[str], str]] = []
+    for raw in text.splitlines():
+        if not raw.strip():
+            continue
+        match = _SPEAKER_LINE.match(raw)
+        if match and match.group(1).upper() in known:
+            content = match.group(2).strip()
+            lines.append((match.group(1).upper(), content))
+        elif lines:
+            speaker, content = lines[-1]
+            lines[-1] = (speaker, f"{content}\n{raw.strip()}" if content else raw.strip())
+        else:
+            lines.append((None, raw.strip()))
+    return [(speaker, content) for speaker, content in lines if content]
+
+
+class AIMDLimiter:
+    """Concurrency limit with additive increase and multiplicative decrease."""
+
+    def __init__(
+        self,
+        initial: int = DEFAULT_INITIAL_CONCURRENCY,
+        minimum: int = DEFAULT_MIN_CONCURRENCY,
+        maximum: int = DEFAULT_MAX_CONCURRENCY,
+        latency_tolerance: float = LATENCY_TOLERANCE,
+    ) -> None:
+        if not 1 <= minimum <= maximum:
+            raise ValueError("need 1 <= minimum <= maximum")
+        self.minimum = minimum
+        self.maximum = maximum
+        self.latency_tolerance = latency_tolerance
+        self.limit = float(min(max(initial, minimum), maximum))
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.best_rate: Optional[float] = None
+        self._cond = threading.Condition()
+
+    def acquire(self) -> None:
+        with self._cond:
+            while self.in_flight >= int(self.limit):
+                self._cond.wait()
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+
+    def release(self, ok: bool, latency: Optional[float] = None, chars: int = 0) -> None:
+        with self._cond:
+            self.in_flight -= 1
+            if not ok:
+                self._decrease()
+            elif latency is not None:
+                rate = latency / (chars + LATENCY_OVERHEAD_CHARS)
+                if self.best_rate is None or rate < self.best_rate:
+                    self.best_rate = rate
+                if rate > self.best_rate * self.latency_tolerance:
+                    self._decrease()
+                else:
+                    self.limit = min(self.maximum, self.limit + 1.0 / self.limit)
+            self._cond.notify_all()
+
+    def _decrease(self) -> None:
+        self.limit = max(float(self.minimum), self.limit / 2)
+
+
+def run_line_jobs(
+    jobs: Sequence[LineJob],
+    render: Callable[[LineJob], RenderOutcome],
+    limiter: AIMDLimiter,
+    retries: int = DEFAULT_RETRIES,
+    backoff: float = DEFAULT_BACKOFF,
+    is_cached: Callable[[LineJob], bool] = lambda job: False,
+    eligible: Callable[[LineJob], bool] = lambda job: True,
+    on_done: Optional[Callable[[LineJob, RenderOutcome], None]] = None,
+) -> dict[tuple[str, int], RenderOutcome]:
+    """Render every job, longest first, and return outcomes keyed by (segment, index).
+
+    Jobs for which `is_cached` is true skip the limiter entirely. Jobs for
+    which `eligible` is false are held back until a later completion makes
+    them eligible; `on_done` is called from the worker thread with each final
+    outcome, before waiting workers re-check eligibility.
+    """
+    pending = sorted(jobs, key=lambda job: len(job.text))  # scanned from the end: longest first
+    cond = threading.Condition()
+    outcomes: dict[tuple[str, int], RenderOutcome] = {}
+
+    def next_job() -> Optional[LineJob]:
+        with cond:
+            while pending:
+                for pos in range(len(pending) - 1, -1, -1):
+                    if eligible(pending[pos]):
+                        return pending.pop(pos)
+                cond.wait()
+            return None
+
+    def attempt(job: LineJob) -> RenderOutcome:
+        try:
+            return render(job)
+        except Exception as exc:
+            return RenderOutcome(ok=False, error=f"render failed: {exc}")
+
+    def work() -> None:
+        while (job := next_job()) is not None:
+            for retry in range(retries + 1):
+                if retry:
+                    time.sleep(backoff * (2 ** (retry - 1)) * (0.5 + random.random() / 2))
+                if is_cached(job):
+                    outcome = attempt(job)
+                else:
+                    limiter.acquire()
+                    outcome = attempt(job)
+                    # Only retryable failures (timeouts, 5xx, 429, bad audio) signal load.
+                    congested = not outcome.ok and outcome.retryable
+                    limiter.release(not congested, outcome.latency if outcome.ok else None, len(job.text))
+                if outcome.ok or not outcome.retryable:
+                    break
+            outcomes[(job.segment, job.index)] = outcome
+            try:
+                if on_done is not None:
+                    on_done(job, outcome)
+            finally:
+                with cond:
+                    cond.notify_all()
+
+    worker_count = min(limiter.maximum, len(jobs))
+    if worker_count:
+        with ThreadPoolExecutor(max_workers=worker_count, thread_name_prefix="tts") as executor:
+            for future in [executor.submit(work) for _ in range(worker_count)]:
+                future.result()
+    return outcomes
@@ -0,0 +1,292 @@
+"""Episode uploads to Cloudflare R2 (or any S3-compatible store).
+
+Every object carries the sha256 of its content in its metadata, so a
+file whose hash already matches the remote copy is skipped after one
+HEAD request. Files above the part size go up as multipart uploads whose
+parts are sent by a shared pool of workers. Each finished part's ETag is
+recorded in a small journal under `data/upload_state/`, and an
+interrupted upload resumes from the journal. Parts the store still lists
+with the recorded ETag are not sent again, and the rest are uploaded to
+the same upload ID.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional, Sequence
+
+from .feed import ARCHIVE_DIR, FEED_NAME, episode_key
+from .stages import file_hash
+
+PROJECT_ROOT = Path(__file__).parent.parent
+UPLOAD_STATE_DIR = PROJECT_ROOT / "data" / "upload_state"
+# R2 wants equal-sized parts (bar the last) of at least 5 MiB.
+PART_SIZE = 8 * 1024 * 1024
+DEFAULT_PART_WORKERS = 8
+DEFAULT_FILE_WORKERS = 4
+HASH_METADATA_KEY = "sha256"
+EPISODE_CACHE_CONTROL = "public, max-age=86400"
+FEED_CACHE_CONTROL = "public, max-age=300"
+EPISODE_UPLOADS = ("episode.mp3", "chapters.json", "*.txt")
+
+CONTENT_TYPES = {
+    ".mp3": "audio/mpeg",
+    ".opus": "audio/ogg",
+    ".txt": "text/plain; charset=utf-8",
+    ".json": "application/json",
+    ".xml": "application/rss+xml; charset=utf-8",
+}
+
+
+class UploadUnavailable(RuntimeError):
+    pass
+
+
+@dataclass
+class UploadJob:
+    path: Path
+    key: str
+    content_type: str = "application/octet-stream"
+    cache_control: Optional[str] = None
+
+
+@dataclass
+class UploadResult:
+    key: str
+    status: str  # "uploaded", "resumed" or "skipped"
+    size: int
+    bytes_sent: int
+    seconds: float
+
+
+def content_type_for(path: Path) -> str:
+    return CONTENT_TYPES.get(path.suffix, "application/octet-stream")
+
+
+def get_bucket() -> Optional[str]:
+    return os.environ.get("R2_BUCKET") or None
+
+
+def get_endpoint_url() -> Optional[str]:
+    """DTFFTL_S3_ENDPOINT (e.g. MinIO), else the R2 endpoint for R2_ACCOUNT_ID."""
+    endpoint = os.environ.get("DTFFTL_S3_ENDPOINT")
+    if endpoint:
+        return endpoint
+    account = os.environ.get("R2_ACCOUNT_ID")
+    return f"https://{account}.r2.cloudflarestorage.com" if account else None
+
+
+def make_client(endpoint_url: Optional[str] = None, max_connections: int = DEFAULT_PART_WORKERS * DEFAULT_FILE_WORKERS):
+    try:
+        import boto3
+        from botocore.config import Config
+    except ImportError as exc:
+        raise UploadUnavailable("boto3 is not installed; `pip install boto3` to upload") from exc
+    return boto3.client(
+        "s3",
+        endpoint_url=endpoint_url or get_endpoint_url(),
+        aws_access_key_id=os.environ.get("R2_ACCESS_KEY_ID"),
+        aws_secret_access_key=os.environ.get("R2_SECRET_ACCESS_KEY"),
+        region_name=os.environ.get("R2_REGION", "auto"),
+        config=Config(max_pool_connections=max_connections, retries={"max_attempts": 5, "mode": "standard"}),
+    )
+
+
+def _error_code(exc: Exception) -> str:
+    return str(getattr(exc, "response", {}).get("Error", {}).get("Code", ""))
+
+
+class Uploader:
+    """Uploads files to one bucket with hash skipping and resumable multipart uploads."""
+
+    def __init__(
+        self,
+        client,
+        bucket: str,
+        state_dir: Path = UPLOAD_STATE_DIR,
+        part_size: int = PART_SIZE,
+        part_workers: int = DEFAULT_PART_WORKERS,
+        file_workers: int = DEFAULT_FILE_WORKERS,
+    ) -> None:
+        self.client = client
+        self.bucket = bucket
+        self.state_dir = state_dir
+        self.part_size = part_size
+        self.part_workers = part_workers
+        self.file_workers = file_workers
+        self._parts: Optional[ThreadPoolExecutor] = None
+
+    def remote_hash(self, key: str) -> Optional[str]:
+        try:
+            response = self.client.head_object(Bucket=self.bucket, Key=key)
+        except Exception as exc:
+            if _error_code(exc) in {"404", "NoSuchKey", "NotFound"}:
+                return None
+            raise
+        return response.get("Metadata", {}).get(HASH_METADATA_KEY)
+
+    def _journal_path(self, key: str) -> Path:
+        digest = hashlib.sha256(f"{self.bucket}/{key}".encode("utf-8")).hexdigest()[:32]
+        return self.state_dir / f"{digest}.json"
+
+    def _save_journal(self, path: Path, journal: dict) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f".{path.name}.tmp")
+        tmp_path.write_text(json.dumps(journal), encoding="utf-8")
+        os.replace(tmp_path, path)
+
+    def _object_args(self, job: UploadJob, digest: str) -> dict:
+        args = {"ContentType": job.content_type, "Metadata": {HASH_METADATA_KEY: digest}}
+        if job.cache_control:
+            args["CacheControl"] = job.cache_control
+        return args
+
+    def upload(self, job: UploadJob) -> UploadResult:
+        started = time.perf_counter()
+        size = job.path.stat().st_size
+        digest = file_hash(job.path)
+        if self.remote_hash(job.key) == digest:
+            self._journal_path(job.key).unlink(missing_ok=True)
+            return UploadResult(job.key, "skipped", size, 0, time.perf_counter() - started)
+
+        if size <= self.part_size:
+            with open(job.path, "rb") as handle:
+                self.client.put_object(Bucket=self.bucket, Key=job.key, Body=handle, **self._object_args(job, digest))
+            return UploadResult(job.key, "uploaded", size, size, time.perf_counter() - started)
+
+        status, sent = self._multipart(job, size, digest)
+        return UploadResult(job.key, status, size, sent, time.perf_counter() - started)
+
+    def _resumable_parts(self, journal: dict) -> Optional[dict[int, str]]:
+        """Recorded parts the store still holds with the same ETag, or None if the upload is gone."""
+        listed: dict[int, str] = {}
+        marker = 0
+        while True:
+            try:
+                response = self.client.list_parts(
+                    Bucket=self.bucket, Key=journal["key"], UploadId=journal["upload_id"], PartNumberMarker=marker
+                )
+            except Exception as exc:
+                if _error_code(exc) in {"404", "NoSuchUpload"}:
+                    return None
+                raise
+            for part in response.get("Parts", []):
+                listed[part["PartNumber"]] = part["ETag"]
+            if not response.get("IsTruncated"):
+                break
+            marker = response["NextPartNumberMarker"]
+        return {
+            int(number): etag for number, etag in journal["parts"].items() if listed.get(int(number)) == etag
+        }
+
+    def _multipart(self, job: UploadJob, size: int, digest: str) -> tuple[str, int]:
+        journal_path = self._journal_path(job.key)
+        journal = json.loads(journal_path.read_text(encoding="utf-8")) if journal_path.exists() else None
+        done: Optional[dict[int, str]] = None
+        if journal and (journal["sha256"], journal["size"], journal["part_size"]) == (digest, size, self.part_size):
+            done = self._resumable_parts(journal)  # None if the upload expired or was aborted
+        elif journal:
+            # The file changed since the interrupted upload; don't leave its parts billed.
+            try:
+                self.client.abort_multipart_upload(Bucket=self.bucket, Key=job.key, UploadId=journal["upload_id"])
+            except Exception:
+                pass
+        if done is None:
+            done = {}
+            response = self.client.create_multipart_upload(Bucket=self.bucket, Key=job.key, **self._object_args(job, digest))
+            journal = {
+                "key": job.key, "upload_id": response["UploadId"], "sha256": digest,
+                "size": size, "part_size": self.part_size, "parts": {},
+            }
+        journal["parts"] = {str(number): etag for number, etag in done.items()}
+        self._save_journal(journal_path, journal)
+
+        lock = threading.Lock()
+        count = (size + self.part_size - 1) // self.part_size
+
+        def send(number: int) -> int:
+            offset = (number - 1) * self.part_size
+            with open(job.path, "rb") as handle:
+                handle.seek(offset)
+                data = handle.read(min(self.part_size, size - offset))
+            response = self.client.upload_part(
+                Bucket=self.bucket, Key=job.key, UploadId=journal["upload_id"], PartNumber=number, Body=data
+            )
+            with lock:
+                journal["parts"][str(number)] = response["ETag"]
+                self._save_journal(journal_path, journal)
+            return len(data)
+
+        pending = [number for number in range(1, count + 1) if number not in done]
+        pool = self._parts or ThreadPoolExecutor(max_workers=self.part_workers, thread_name_prefix="upload-part")
+        try:
+            futures = [pool.submit(send, number) for number in pending]
+            sent = 0
+            for future in futures:
+                sent += future.result()
+        finally:
+            if pool is not self._parts:
+                pool.shutdown()
+
+        self.client.complete_multipart_upload(
+            Bucket=self.bucket,
+            Key=job.key,
+            UploadId=journal["upload_id"],
+            MultipartUpload={
+                "Parts": [{"PartNumber": number, "ETag": journal["parts"][str(number)]} for number in range(1, count + 1)]
+            },
+        )
+        journal_path.unlink(missing_ok=True)
+        return ("resumed" if done else "uploaded"), sent
+
+    def upload_all(self, jobs: Sequence[UploadJob]) -> list[UploadResult]:
+        """Upload several files at once; multipart files share one pool of part workers."""
+        if not jobs:
+            return []
+        with ThreadPoolExecutor(max_workers=self.part_workers, thread_name_prefix="upload-part") as parts:
+            self._parts = parts
+            try:
+                with ThreadPoolExecutor(
+                    max_workers=min(self.file_workers, len(jobs)), thread_name_prefix="upload-file"
+                ) as files:
+                    return list(files.map(self.upload, jobs))
+            finally:
+                self._parts = None
+
+
+def episode_upload_jobs(episode_dir: Path, date_str: str) -> list[UploadJob]:
+    """The MP3, chapters and transcripts (episode and segment scripts) of one episode."""
+    paths = sorted({path for pattern in EPISODE_UPLOADS for path in episode_dir.glob(pattern)})
+    return [
+        UploadJob(path, episode_key(date_str, path.name), content_type_for(path), EPISODE_CACHE_CONTROL)
+        for path in paths
+    ]
+
+
+def _feed_job(feed_dir: Path, path: Path) -> UploadJob:
+    return UploadJob(path, path.relative_to(feed_dir).as_posix(), content_type_for(path), FEED_CACHE_CONTROL)
+
+
+def feed_upload_batches(feed_dir: Path) -> list[list[UploadJob]]:
+    """The archive pages as one batch, then feed.xml on its own.
+
+    feed.xml links to its archive pages, so it only goes up once every page
+    it names is in place. Pages that haven't changed are skipped by hash.
+    """
+    pages = [_feed_job(feed_dir, path) for path in sorted((feed_dir / ARCHIVE_DIR).glob("*.xml"))]
+    feed_path = feed_dir / FEED_NAME
+    return [pages, [_feed_job(feed_dir, feed_path)] if feed_path.exists() else []]
+
+
+def upload_feed(uploader: Uploader, feed_dir: Path) -> list[UploadResult]:
+    results: list[UploadResult] = []
+    for batch in feed_upload_batches(feed_dir):
+        results += uploader.upload_all(batch)
+    return results
@@ -0,0 +1,49 @@
+from __future__ import annotations
+
+import struct
+import sys
+
+import pytest
+
+
+def write_pcm_wav(path, samples, rate: int, channels: int = 1, extra_chunk: bool = False) -> None:
+    """Write interleaved float samples in [-1, 1] as a 16-bit PCM WAV."""
+    import numpy as np
+
+    data = (np.asarray(samples) * 32767).astype("<i2").tobytes()
+    fmt = struct.pack("<HHIIHH", 1, channels, rate, rate * channels * 2, channels * 2, 16)
+    chunks = b"fmt " + struct.pack("<I", len(fmt)) + fmt
+    if extra_chunk:
+        chunks += b"LIST" + struct.pack("<I", 5) + b"INFOx\0"  # odd size, padded
+    chunks += b"data" + struct.pack("<I", len(data)) + data
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(b"RIFF" + struct.pack("<I", 4 + len(chunks)) + b"WAVE" + chunks)
+
+
+def write_tone_wav(path, seconds: float, rate: int = 8000, freq: float = 300.0, channels: int = 1) -> None:
+    # Cosine tone: the very first sample is non-zero, so segment starts are visible.
+    import numpy as np
+
+    tone = np.cos(2 * np.pi * freq * np.arange(int(seconds * rate)) / rate) * 0.25
+    write_pcm_wav(path, np.repeat(tone, channels), rate, channels)
+
+
+def copy_command(target, sample_rate, channels, output_path):
+    # Stand-in encoder: records the PCM stream it is fed.
+    script = "import shutil, sys; shutil.copyfileobj(sys.stdin.buffer, open(sys.argv[1], 'wb'))"
+    return [sys.executable, "-c", script, str(output_path)]
+
+
+@pytest.fixture
+def pcm_wav():
+    return write_pcm_wav
+
+
+@pytest.fixture
+def tone_wav():
+    return write_tone_wav
+
+
+@pytest.fixture
+def copy_encoder():
+    return copy_command
@@ -0,0 +1,47 @@
+from __future__ import annotations
+
+from src import alphaxiv
+from src.arxiv_store import AbstractStore
+
+FEED = """<feed xmlns="http://www.w3.org/2005/Atom">
+  <entry><id>http://arxiv.org/abs/2401.00001v2</id><summary>  First
+  abstract. </summary></entry>
+</feed>"""
+
+
+def test_get_arxiv_abstracts_fetches_only_misses(tmp_path, monkeypatch):
+    store = AbstractStore(tmp_path / "abstracts.sqlite")
+    store.put_many({"2401.00002v1": "Cached abstract."})
+    requested: list[list[str]] = []
+
+    def fake_fetch(arxiv_ids):
+        requested.append(list(arxiv_ids))
+        return alphaxiv._parse_arxiv_feed(FEED)
+
+    monkeypatch.setattr(alphaxiv, "_fetch_arxiv_abstracts", fake_fetch)
+
+    first = alphaxiv.get_arxiv_abstracts(["2401.00001", "2401.00002"], store=store)
+    second = alphaxiv.get_arxiv_abstracts(["2401.00001", "2401.00001v2"], store=store)
+
+    assert first == {"2401.00002": "Cached abstract.", "2401.00001": "First abstract."}
+    assert second == {"2401.00001": "First abstract.", "2401.00001v2": "First abstract."}
+    assert requested == [["2401.00001"]]
+
+
+def test_fetch_arxiv_abstracts_runs_chunks_on_daemon_threads(monkeypatch):
+    import threading
+
+    threads = []
+
+    def fake_chunk(arxiv_ids, pacer):
+        threads.append(threading.current_thread())
+        return {arxiv_id: f"Abstract of {arxiv_id}." for arxiv_id in arxiv_ids}
+
+    monkeypatch.setattr(alphaxiv, "ARXIV_CHUNK_SIZE", 2)
+    monkeypatch.setattr(alphaxiv, "_fetch_arxiv_chunk", fake_chunk)
+
+    ids = [f"2401.0000{n}" for n in range(5)]
+    abstracts = alphaxiv._fetch_arxiv_abstracts(ids)
+
+    assert list(abstracts) == ids
+    assert len(threads) == 3 and all(thread.daemon for thread in threads)
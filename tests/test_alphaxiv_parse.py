@@ -0,0 +1,25 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+
+from src.alphaxiv import _parse_trending_html
+
+FIXTURE = Path(__file__).parent / "fixtures" / "alphaxiv_explore.html"
+
+
+def test_lxml_and_bs4_parsers_agree_on_explore_fixture():
+    pytest.importorskip("lxml")
+    pytest.importorskip("bs4")
+    html = FIXTURE.read_text(encoding="utf-8")
+
+    fast = _parse_trending_html(html, limit=100, backend="lxml")
+    reference = _parse_trending_html(html, limit=100, backend="bs4")
+
+    assert fast == reference
+    assert len(fast) == 40
+    assert len({entry["arxiv_id"] for entry in fast}) == len(fast)
+    assert all(entry["title"] and entry["discussion_highlights"] for entry in fast)
+    assert all(isinstance(entry["score"], int) for entry in fast)
+    assert _parse_trending_html(html, limit=5, backend="lxml") == fast[:5]
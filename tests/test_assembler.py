@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+import threading
+import time
+
+import pytest
+
+from src import assembler as assembler_module, tts
+from src.assembler import AssemblyError, OrderedAssembler, render_episode_audio
+from src.audio import read_wav_info, stitch_wavs
+from src.tts_scheduler import RenderOutcome
+
+
+def test_out_of_order_segments_are_appended_in_script_order(tmp_path, tone_wav, copy_encoder):
+    names = ["a", "b", "c", "d"]
+    for idx, name in enumerate(names):
+        tone_wav(tmp_path / f"{name}.wav", 0.5, freq=200 + 100 * idx)
+    stitch_wavs([tmp_path / f"{name}.wav" for name in names], tmp_path / "expected.wav", crossfade=0.01)
+
+    events = []
+    assembler = OrderedAssembler(
+        names, tmp_path / "episode.wav", crossfade=0.01, command=copy_encoder, on_event=events.append,
+    ).start()
+    for name in ["c", "b", "d", "a"]:
+        assembler.add(name, tmp_path / f"{name}.wav")
+    outputs = assembler.wait()
+
+    assert outputs["wav"].read_bytes() == (tmp_path / "expected.wav").read_bytes()
+    info = read_wav_info(outputs["wav"])
+    assert outputs["mp3"].read_bytes() == outputs["wav"].read_bytes()[info.data_offset:]
+    assert [e.segment for e in events if e.kind == "appended"] == names
+    assert events[-1].kind == "finished" and events[-1].appended == 4
+    assert assembler.peak_buffered == 3
+
+
+def test_pipelined_render_appends_while_tts_runs_and_bounds_the_buffer(tmp_path, monkeypatch, tone_wav, copy_encoder):
+    delays = {"00_intro": 0.3}
+    appended_at = {}
+
+    def fake_render(text, output_path, voice):
+        segment = output_path.parent.name
+        time.sleep(delays.get(segment, 0.02))
+        tone_wav(output_path, 0.3)
+        return RenderOutcome(ok=True, latency=0.01)
+
+    monkeypatch.setenv("DTFFTL_TTS_CACHE", "0")
+    monkeypatch.setattr(tts, "render_line", fake_render)
+    segments = [("00_intro", "STEPHEN: Hello.")] + [(f"{idx:02d}_story", f"PHILIP: Story {idx}.") for idx in range(1, 9)]
+
+    def on_event(event):
+        if event.kind == "appended":
+            appended_at[event.segment] = time.perf_counter()
+
+    result = render_episode_audio(
+        segments, tmp_path, command=copy_encoder, reorder_window=3, on_event=on_event,
+    )
+    finished = time.perf_counter()
+
+    assert [path.stem for path in result.processed_wavs] == [name for name, _ in segments]
+    assert result.peak_buffered <= 2
+    assert set(result.outputs) == {"wav", "mp3", "opus"}
+    assert len(result.levels) == len(segments)
+    # The intro held everything up; once it lands, the rest follows promptly.
+    assert appended_at["00_intro"] < appended_at["08_story"] <= finished
+
+
+def test_failed_segment_aborts_the_episode(tmp_path, monkeypatch, tone_wav, copy_encoder):
+    def fake_render(text, output_path, voice):
+        if "broken" in text:
+            return RenderOutcome(ok=False, error="HTTP 400")
+        tone_wav(output_path, 0.2)
+        return RenderOutcome(ok=True, latency=0.01)
+
+    monkeypatch.setenv("DTFFTL_TTS_CACHE", "0")
+    monkeypatch.setattr(tts, "render_line", fake_render)
+    segments = [("00_intro", "Hello."), ("01_story", "broken"), ("02_outro", "Bye.")]
+
+    with pytest.raises(AssemblyError, match="01_story"):
+        render_episode_audio(segments, tmp_path, command=copy_encoder, on_event=None)
+    assert not list(tmp_path.glob("episode.*"))
+    assert not list(tmp_path.glob(".*.tmp"))
+
+
+def test_tts_error_aborts_the_assembler_and_reraises(tmp_path, monkeypatch, tone_wav, copy_encoder):
+    def fake_tts(segments, output_dir, voice=None, on_segment=None, reorder_window=None):
+        output_dir.mkdir(parents=True, exist_ok=True)
+        path = output_dir / "00_intro.wav"
+        tone_wav(path, 0.2)
+        on_segment("00_intro", path, "")
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(assembler_module, "text_to_speech_parallel", fake_tts)
+    segments = [("00_intro", "Hello."), ("01_story", "Story."), ("02_outro", "Bye.")]
+
+    with pytest.raises(KeyboardInterrupt):
+        render_episode_audio(segments, tmp_path, command=copy_encoder, on_event=None)
+    assert not list(tmp_path.glob("episode.*"))
+    assert not list(tmp_path.glob(".*.tmp"))
+    assert not [thread for thread in threading.enumerate() if thread.name == "assemble"]
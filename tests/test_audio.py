@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+import wave
+
+import numpy as np
+
+from src.audio import read_wav_info, stitch_wavs
+
+
+def test_read_wav_info_skips_extra_chunks(tmp_path, pcm_wav):
+    path = tmp_path / "a.wav"
+    pcm_wav(path, np.zeros(2400), 24000, 1, extra_chunk=True)
+    info = read_wav_info(path)
+    assert (info.sample_rate, info.channels, info.frames) == (24000, 1, 2400)
+
+
+def test_stitch_streams_converts_and_inserts_silence(tmp_path, pcm_wav):
+    tone = np.sin(np.linspace(0, 200 * np.pi, 24000)) * 0.5
+    pcm_wav(tmp_path / "a.wav", tone, 24000, 1)
+    stereo_48k = np.repeat(np.sin(np.linspace(0, 200 * np.pi, 48000))[:, None] * 0.5, 2, axis=1)
+    pcm_wav(tmp_path / "b.wav", stereo_48k.reshape(-1), 48000, 2, extra_chunk=True)
+
+    out = stitch_wavs(
+        [tmp_path / "a.wav", tmp_path / "b.wav"], tmp_path / "episode.wav",
+        silence_duration=0.5, block_frames=1000,
+    )
+
+    with wave.open(str(out), "rb") as stitched:
+        assert (stitched.getframerate(), stitched.getnchannels(), stitched.getsampwidth()) == (24000, 1, 2)
+        frames = stitched.getnframes()
+        audio = np.frombuffer(stitched.readframes(frames), dtype="<i2")
+    assert abs(frames - (24000 + 12000 + 24000)) <= 2
+    assert not audio[24000:36000].any()
+    assert np.abs(audio[36000:] / 32767 - tone[: len(audio) - 36000]).max() < 0.01
+    assert out.stat().st_size == 44 + frames * 2
+    assert not list(tmp_path.glob(".*.tmp"))
+
+
+def test_process_segments_trims_and_matches_levels(tmp_path, pcm_wav):
+    from src.audio_processing import process_segments
+
+    rate = 24000
+    t = np.arange(4 * rate) / rate
+    quiet = np.concatenate([np.zeros(rate // 2), 0.05 * np.sin(2 * np.pi * 220 * t), np.zeros(rate // 4)])
+    loud = 0.6 * np.sin(2 * np.pi * 330 * t)
+    pcm_wav(tmp_path / "00_quiet.wav", quiet, rate, 1)
+    pcm_wav(tmp_path / "01_loud.wav", loud, rate, 1)
+
+    outputs, levels = process_segments(
+        [tmp_path / "00_quiet.wav", tmp_path / "01_loud.wav"], tmp_path / "out", target_db=-20.0
+    )
+
+    rms = []
+    for path in outputs:
+        with wave.open(str(path), "rb") as processed:
+            audio = np.frombuffer(processed.readframes(processed.getnframes()), dtype="<i2") / 32768
+        rms.append(20 * np.log10(np.sqrt(np.mean(np.square(audio[rate // 10: -rate // 10])))))
+    assert abs(rms[0] - rms[1]) < 0.5
+    assert abs(rms[1] - -20.0) < 0.5
+    # 0.5 s of leading and 0.25 s of trailing silence trimmed down to the padding.
+    assert levels["00_quiet"]["start_frame"] >= rate // 2 - int(0.06 * rate)
+    assert levels["00_quiet"]["end_frame"] - levels["00_quiet"]["start_frame"] < 4 * rate + int(0.11 * rate)
+
+
+def test_stitch_crossfade_overlaps_boundaries(tmp_path, pcm_wav):
+    rate = 8000
+    pcm_wav(tmp_path / "a.wav", np.full(rate, 0.5), rate, 1)
+    pcm_wav(tmp_path / "b.wav", np.full(rate, -0.5), rate, 1)
+    out = stitch_wavs([tmp_path / "a.wav", tmp_path / "b.wav"], tmp_path / "x.wav", silence_duration=None, crossfade=0.1)
+    with wave.open(str(out), "rb") as stitched:
+        audio = np.frombuffer(stitched.readframes(stitched.getnframes()), dtype="<i2") / 32767
+    assert len(audio) == 2 * rate - 800
+    fade = audio[rate - 800: rate]
+    assert fade[0] > 0.45 and fade[-1] < -0.45 and np.all(np.diff(fade) <= 1e-4)
@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+import json
+import struct
+
+import numpy as np
+import pytest
+
+from src.audio import decode_frames, read_wav_info, stitch_wavs
+from src.chapters import (
+    compute_chapters,
+    has_id3_chapters,
+    read_id3_tag,
+    write_chapters_json,
+    write_id3_chapters,
+)
+
+
+@pytest.fixture
+def segment_paths(tmp_path, tone_wav):
+    tone_wav(tmp_path / "a.wav", 1.25, 24000)
+    tone_wav(tmp_path / "b.wav", 0.7, 48000, channels=2)
+    tone_wav(tmp_path / "c.wav", 2.0, 24000)
+    return [tmp_path / name for name in ("a.wav", "b.wav", "c.wav")]
+
+
+def test_chapter_starts_match_the_stitched_audio(tmp_path, segment_paths):
+    episode = stitch_wavs(segment_paths, tmp_path / "episode.wav", silence_duration=0.5)
+    chapters = compute_chapters([(path, path.stem) for path in segment_paths], silence_duration=0.5)
+
+    info = read_wav_info(episode)
+    samples = decode_frames(episode.read_bytes()[info.data_offset:], info)[:, 0]
+    nonzero = np.nonzero(samples)[0]
+    assert [round(chapter.start * 24000) for chapter in chapters][1:] == [
+        int(nonzero[nonzero > 30000][0]), int(nonzero[nonzero > 60000][0])
+    ]
+    assert round(chapters[-1].end * 24000) == info.frames
+
+
+def test_crossfades_shorten_every_boundary(tmp_path, segment_paths):
+    plain = compute_chapters([(path, path.stem) for path in segment_paths], silence_duration=0.5)
+    faded = compute_chapters([(path, path.stem) for path in segment_paths], silence_duration=0.5, crossfade=0.03)
+    episode = stitch_wavs(segment_paths, tmp_path / "episode.wav", silence_duration=0.5, crossfade=0.03)
+
+    assert round(faded[-1].end * 24000) == read_wav_info(episode).frames
+    # Two boundaries (into and out of the gap) per segment change.
+    assert [round((p.start - f.start) * 1000) for p, f in zip(plain, faded)] == [0, 60, 120]
+
+
+def test_untitled_segments_extend_the_previous_chapter(tmp_path, segment_paths):
+    titled = zip(segment_paths, ["Intro", None, "Story"])
+    chapters = compute_chapters(list(titled), silence_duration=None)
+    assert [(c.title, round(c.start, 2), round(c.end, 2)) for c in chapters] == [
+        ("Intro", 0.0, 1.95), ("Story", 1.95, 3.95),
+    ]
+
+    output = write_chapters_json(tmp_path / "chapters.json", chapters)
+    payload = json.loads(output.read_text())
+    assert payload["version"] == "1.2.0"
+    assert payload["chapters"][1] == {"startTime": 1.95, "endTime": 3.95, "title": "Story"}
+
+
+def test_id3_chapters_replace_the_existing_tag(tmp_path, segment_paths):
+    audio = b"\xff\xfb\x90\x00" + bytes(400)
+    old_tag = b"ID3" + bytes([4, 0, 0]) + bytes([0, 0, 0, 12]) + b"TSSE" + bytes(8)
+    mp3 = tmp_path / "episode.mp3"
+    mp3.write_bytes(old_tag + audio)
+    chapters = compute_chapters([(path, path.stem) for path in segment_paths], silence_duration=0.5)
+
+    write_id3_chapters(mp3, chapters)
+    write_id3_chapters(mp3, chapters)
+
+    tag = read_id3_tag(mp3)
+    assert tag[:5] == b"ID3\x03\x00" and has_id3_chapters(mp3)
+    assert mp3.read_bytes() == tag + audio
+    assert tag.count(b"CHAP") == 3
+    chap = tag.index(b"CHAP") + 10 + len(b"chp0\0")
+    chap = tag.index(b"CHAP", chap)  # second chapter
+    start_ms, end_ms = struct.unpack(">II", tag[chap + 10 + 5: chap + 10 + 13])
+    assert (start_ms, end_ms) == (round(chapters[1].start * 1000), round(chapters[1].end * 1000))
+    assert "b".encode("utf-16-le") in tag
@@ -0,0 +1,49 @@
+from __future__ import annotations
+
+import pytest
+
+pytest.importorskip("numpy")
+
+from src.dedup import cluster_indices, filter_novel_stories, merge_near_duplicates
+from src.models import SourceMeta, Story
+
+
+def _story(story_id: str, score: int, arxiv_id: str | None = None) -> Story:
+    extra = {"arxiv_id": arxiv_id} if arxiv_id else {"comments_summary": f"comments on {story_id}"}
+    meta = SourceMeta(source="alphaxiv" if arxiv_id else "reddit", subreddit=None if arxiv_id else "LocalLLaMA", score=score, extra=extra)
+    return Story(id=story_id, title=f"Title {story_id}", summary="", source_url=f"https://x/{story_id}", source_meta=meta, tags=[meta.source])
+
+
+def test_cluster_indices_links_transitively():
+    vectors = [[1.0, 0.0, 0.0], [0.95, 0.31, 0.0], [0.8, 0.6, 0.0], [0.0, 0.0, 1.0]]
+    assert cluster_indices(vectors, threshold=0.94) == [[0, 1, 2], [3]]
+
+
+def test_merge_near_duplicates_prefers_paper_and_merges_highlights():
+    stories = [_story("r1", 900), _story("paper", 40, arxiv_id="2401.00001"), _story("other", 10)]
+    vectors = [[1.0, 0.0], [0.99, 0.1], [0.0, 1.0]]
+
+    merged = merge_near_duplicates(stories, vectors, threshold=0.9)
+
+    assert [story.id for story in merged] == ["paper", "other"]
+    extra = merged[0].source_meta.extra
+    assert extra["merged_story_ids"] == ["r1"]
+    assert "r/LocalLLaMA: Title r1 — comments on r1" in extra["discussion_highlights"]
+    assert merged[0].tags == ["reddit", "alphaxiv"]
+    assert "merged_story_ids" not in stories[1].source_meta.extra
+
+
+def test_filter_novel_stories_drops_or_demotes_repeats():
+    np = pytest.importorskip("numpy")
+    stories = [_story("old", 5), _story("new", 5)]
+    vectors = [[1.0, 0.0], [0.0, 1.0]]
+    history = np.array([[0.98, 0.2]], dtype=np.float32)
+
+    kept, kept_vectors, stats = filter_novel_stories(stories, vectors, history, threshold=0.9)
+    assert [story.id for story in kept] == ["new"]
+    assert kept_vectors == [[0.0, 1.0]]
+    assert stats["repeats"] == 1 and list(stats["repeat_stories"]) == ["old"]
+
+    demoted, _, stats = filter_novel_stories(stories, vectors, history, threshold=0.9, demote=True)
+    assert [story.id for story in demoted] == ["new", "old"]
+    assert stats["action"] == "demoted"
@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+import pytest
+
+pytest.importorskip("numpy")
+
+from src import embeddings
+from src.embedding_cache import EmbeddingCache, cache_key
+
+
+def test_cache_roundtrip_and_lru_eviction(tmp_path):
+    cache = EmbeddingCache("test-model", root=tmp_path, max_entries=2)
+    cache.put_many(["alpha", "beta"], [[1.0, 0.0], [0.0, 1.0]])
+
+    assert cache.get_many(["  alpha\n", "gamma"]) == [[1.0, 0.0], None]
+    cache.put_many(["gamma"], [[0.5, 0.5]])
+
+    reopened = EmbeddingCache("test-model", root=tmp_path, max_entries=2)
+    assert reopened.get_many(["alpha", "beta", "gamma"]) == [[1.0, 0.0], None, [0.5, 0.5]]
+    assert reopened.stats()["entries"] == 2
+    assert EmbeddingCache("other-model", root=tmp_path).get_many(["alpha"]) == [None]
+
+
+def test_embed_batch_only_encodes_misses(tmp_path, monkeypatch):
+    monkeypatch.setattr(embeddings, "_caches", {})
+    monkeypatch.setattr(embeddings, "EmbeddingCache", lambda name, max_entries: EmbeddingCache(name, root=tmp_path))
+    encoded: list[list[str]] = []
+
+    def fake_encode(texts, show_progress=False):
+        encoded.append(list(texts))
+        return [[float(len(text)), 1.0] for text in texts]
+
+    monkeypatch.setattr(embeddings, "_encode", fake_encode)
+
+    first = embeddings.embed_batch(["one", "two", "one"])
+    second = embeddings.embed_batch(["two", "three"])
+
+    assert encoded == [["one", "two"], ["three"]]
+    assert first == [[3.0, 1.0], [3.0, 1.0], [3.0, 1.0]]
+    assert second == [[3.0, 1.0], [5.0, 1.0]]
+    stats = embeddings.get_embedding_cache().stats()
+    assert stats["hits"] == 1 and stats["misses"] == 4
+
+
+class _StubModel:
+    max_seq_length = 8
+
+    def __init__(self, value: float):
+        self.value = value
+        self.tokenizer = lambda texts, **kwargs: {"input_ids": [text.split() for text in texts]}
+
+    def encode(self, texts, **kwargs):
+        import numpy as np
+
+        return np.full((len(texts), 2), self.value, dtype=np.float32)
+
+
+def test_backend_selection_keys_the_cache_by_model(tmp_path, monkeypatch):
+    monkeypatch.setattr(embeddings, "_caches", {})
+    monkeypatch.setattr(embeddings, "_models", {})
+    monkeypatch.setattr(embeddings, "EmbeddingCache", lambda name, max_entries: EmbeddingCache(name, root=tmp_path))
+    monkeypatch.setattr(embeddings, "request_embeddings", lambda texts, model_name: None)
+    monkeypatch.setattr(embeddings, "_load_torch_model", lambda: _StubModel(1.0))
+    monkeypatch.setattr(embeddings, "_load_onnx_model", lambda: _StubModel(0.5))
+    monkeypatch.setenv("DTFFTL_ONNX_QUANTIZATION", "avx2")
+
+    monkeypatch.delenv("DTFFTL_EMBEDDINGS", raising=False)
+    assert embeddings.active_model_name() == embeddings.EMBEDDING_MODEL
+    assert embeddings.embed_batch(["hello world"]) == [[1.0, 1.0]]
+    fp32_cache = embeddings.get_embedding_cache()
+
+    monkeypatch.setenv("DTFFTL_EMBEDDINGS", "onnx")
+    assert embeddings.active_model_name() == f"{embeddings.EMBEDDING_MODEL}+onnx-qint8-avx2"
+    assert embeddings.embed_batch(["hello world"]) == [[0.5, 0.5]]
+    int8_cache = embeddings.get_embedding_cache()
+
+    assert set(embeddings._models) == {"torch", "onnx"}
+    assert int8_cache is not fp32_cache and int8_cache.cache_dir != fp32_cache.cache_dir
+    assert cache_key(int8_cache.model_name, "hello world") != cache_key(fp32_cache.model_name, "hello world")
+    assert fp32_cache.get_many(["hello world"]) == [[1.0, 1.0]]
@@ -0,0 +1,18 @@
+from __future__ import annotations
+
+from src.embedding_scheduler import plan_batches
+
+
+def test_plan_batches_respects_budget_and_covers_every_text():
+    lengths = [512, 12, 300, 9, 14, 512, 40]
+    batches = plan_batches(lengths, token_budget=1024, max_batch_size=3)
+
+    assert sorted(idx for batch in batches for idx in batch) == list(range(len(lengths)))
+    for batch in batches:
+        assert len(batch) <= 3
+        assert max(lengths[idx] for idx in batch) * len(batch) <= 1024
+    assert batches[0] == [0, 5]
+
+
+def test_plan_batches_gives_oversized_text_its_own_batch():
+    assert plan_batches([2000, 5, 5], token_budget=512) == [[0], [1, 2]]
@@ -0,0 +1,25 @@
+from __future__ import annotations
+
+import threading
+
+import pytest
+
+pytest.importorskip("numpy")
+
+from src.embedding_server import EmbeddingServer, request_embeddings
+
+
+def test_request_embeddings_round_trip(tmp_path):
+    socket_path = tmp_path / "embed.sock"
+    server = EmbeddingServer(socket_path, "test-model", lambda texts: [[float(len(t)), 0.5] for t in texts])
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        assert request_embeddings(["ab", "abcd"], "test-model", socket_path=socket_path) == [[2.0, 0.5], [4.0, 0.5]]
+        assert request_embeddings(["ab"], "other-model", socket_path=socket_path) is None
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert not socket_path.exists()
+    assert request_embeddings(["ab"], "test-model", socket_path=socket_path) is None
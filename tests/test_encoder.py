@@ -0,0 +1,48 @@
+from __future__ import annotations
+
+import shutil
+import sys
+
+import pytest
+
+from src.audio import read_wav_info
+from src.encoder import stitch_and_encode
+
+
+def test_encoders_receive_the_stitched_stream(tmp_path, tone_wav, copy_encoder):
+    for name in ("a", "b"):
+        tone_wav(tmp_path / f"{name}.wav", 2.0)
+
+    outputs = stitch_and_encode(
+        [tmp_path / "a.wav", tmp_path / "b.wav"], tmp_path / "episode.wav",
+        command=copy_encoder, silence_duration=0.5, crossfade=0.01,
+    )
+
+    info = read_wav_info(outputs["wav"])
+    pcm = outputs["wav"].read_bytes()[info.data_offset:]
+    assert set(outputs) == {"wav", "mp3", "opus"}
+    assert outputs["mp3"].read_bytes() == pcm == outputs["opus"].read_bytes()
+    assert not list(tmp_path.glob(".*.tmp"))
+
+
+def test_failed_encoder_leaves_no_output(tmp_path, tone_wav, copy_encoder):
+    tone_wav(tmp_path / "a.wav", 1.0)
+
+    def failing(target, sample_rate, channels, output_path):
+        if target.name == "opus":
+            return [sys.executable, "-c", "import sys; sys.stdin.buffer.read(); sys.exit('no libopus')"]
+        return copy_encoder(target, sample_rate, channels, output_path)
+
+    with pytest.raises(RuntimeError, match="opus encoding failed: no libopus"):
+        stitch_and_encode([tmp_path / "a.wav"], tmp_path / "episode.wav", command=failing)
+    assert (tmp_path / "episode.mp3").exists()
+    assert not (tmp_path / "episode.opus").exists()
+    assert not list(tmp_path.glob(".*.tmp"))
+
+
+@pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="ffmpeg not installed")
+def test_ffmpeg_encodes_mp3_and_opus(tmp_path, tone_wav):
+    tone_wav(tmp_path / "a.wav", 3.0, rate=24000)
+    outputs = stitch_and_encode([tmp_path / "a.wav"], tmp_path / "episode.wav")
+    assert outputs["mp3"].stat().st_size > 0
+    assert outputs["opus"].read_bytes()[:4] == b"OggS"
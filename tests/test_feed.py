@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+import datetime as dt
+import xml.etree.ElementTree as ET
+
+import pytest
+
+from src.feed import FeedBuilder, FeedItem, ItemStore
+
+NOW = dt.datetime(2026, 1, 1, tzinfo=dt.timezone.utc)
+ATOM = "{http://www.w3.org/2005/Atom}"
+
+
+def _item(day: int, title: str | None = None) -> FeedItem:
+    date = dt.date(2025, 1, 1) + dt.timedelta(days=day)
+    return FeedItem(
+        guid=f"dtfftl-{date.isoformat()}",
+        title=title or f"Episode {day} & friends",
+        description=f"Stories for <{date}>",
+        pub_date=dt.datetime.combine(date, dt.time(6), dt.timezone.utc).isoformat(),
+        url=f"https://dtfftl.example.com/episodes/{date}/episode.mp3",
+        length=1000 + day,
+        duration=1800.4,
+        chapters_url=f"https://dtfftl.example.com/episodes/{date}/chapters.json",
+    )
+
+
+def _guids(path) -> list[str]:
+    channel = ET.parse(path).getroot().find("channel")
+    return [item.findtext("guid") for item in channel.findall("item")]
+
+
+def _links(path) -> dict[str, str]:
+    channel = ET.parse(path).getroot().find("channel")
+    return {link.get("rel"): link.get("href") for link in channel.findall(f"{ATOM}link")}
+
+
+def test_spliced_feed_matches_a_full_rebuild(tmp_path):
+    builder = FeedBuilder(tmp_path / "feed", max_items=3, page_size=2)
+    for day in range(9):
+        builder.publish(_item(day), now=NOW)
+
+    feed = builder.feed_path
+    spliced = {path.relative_to(builder.feed_dir): path.read_bytes() for path in builder.feed_dir.rglob("*.xml")}
+    assert _guids(feed) == [_item(day).guid for day in (8, 7, 6)]
+    assert _guids(builder.feed_dir / "archive" / "feed-0003.xml") == [_item(5).guid, _item(4).guid]
+    assert _guids(builder.feed_dir / "archive" / "feed-0001.xml") == [_item(1).guid, _item(0).guid]
+    assert _links(feed)["prev-archive"].endswith("/archive/feed-0003.xml")
+    assert _links(builder.feed_dir / "archive" / "feed-0002.xml")["prev-archive"].endswith("/archive/feed-0001.xml")
+    assert "prev-archive" not in _links(builder.feed_dir / "archive" / "feed-0001.xml")
+
+    builder.rebuild(now=NOW)
+    rebuilt = {path.relative_to(builder.feed_dir): path.read_bytes() for path in builder.feed_dir.rglob("*.xml")}
+    assert spliced == rebuilt
+
+    item = ET.parse(feed).getroot().find("channel").find("item")
+    assert item.findtext("title") == "Episode 8 & friends"
+    assert item.find("enclosure").get("length") == "1008"
+    assert item.findtext("{http://www.itunes.com/dtds/podcast-1.0.dtd}duration") == "1800"
+
+
+def test_daily_publish_does_not_read_the_item_store(tmp_path, monkeypatch):
+    builder = FeedBuilder(tmp_path / "feed", max_items=3, page_size=2)
+    for day in range(4):
+        builder.publish(_item(day), now=NOW)
+
+    def fail(self):
+        raise AssertionError("store was read")
+
+    monkeypatch.setattr(ItemStore, "load", fail)
+    builder.publish(_item(4), now=NOW)
+    assert _guids(builder.feed_path)[0] == _item(4).guid
+
+    (builder.feed_path).write_text("corrupted", encoding="utf-8")
+    with pytest.raises(AssertionError, match="store was read"):
+        builder.publish(_item(5), now=NOW)
+
+
+def test_republishing_an_episode_replaces_its_item(tmp_path):
+    builder = FeedBuilder(tmp_path / "feed", max_items=10, page_size=5)
+    for day in range(3):
+        builder.publish(_item(day), now=NOW)
+    builder.publish(_item(1, title="Episode 1, remastered"), now=NOW)
+
+    channel = ET.parse(builder.feed_path).getroot().find("channel")
+    assert [item.findtext("title") for item in channel.findall("item")] == [
+        "Episode 2 & friends", "Episode 1, remastered", "Episode 0 & friends",
+    ]
+    builder.publish(_item(3), now=NOW)
+    assert _guids(builder.feed_path)[0] == _item(3).guid
+
+
+def test_rebuild_rewrites_only_the_archive_page_that_changed(tmp_path):
+    builder = FeedBuilder(tmp_path / "feed", max_items=3, page_size=2)
+    for day in range(9):
+        builder.publish(_item(day), now=NOW)
+    archive = builder.feed_dir / "archive"
+    before = {path.name: path.read_bytes() for path in archive.glob("*.xml")}
+
+    builder.publish(_item(3, title="Episode 3, remastered"), now=NOW + dt.timedelta(days=1))
+
+    after = {path.name: path.read_bytes() for path in archive.glob("*.xml")}
+    changed = sorted(name for name in before if after[name] != before[name])
+    assert changed == ["feed-0002.xml"]
+    assert "Episode 3, remastered" in after["feed-0002.xml"].decode("utf-8")
@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+pytest.importorskip("requests")
+
+from src.http_cache import HTTPReplayMiss, build_session
+
+
+class _Handler(BaseHTTPRequestHandler):
+    hits: list[tuple[str, str | None]] = []
+
+    def do_POST(self):
+        self.hits.append((self.path, None))
+        body = b'{"access_token": "secret-bearer"}'
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path.startswith("/r/"):
+            self.hits.append((self.path, self.headers.get("Authorization")))
+            body = b'{"kind": "Listing", "data": {"children": []}}'
+            self.send_response(200)
+            self.send_header("Cache-Control", "private, max-age=0, must-revalidate, no-store")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+        etag = self.headers.get("If-None-Match")
+        self.hits.append((self.path, etag))
+        if etag == '"v1"':
+            self.send_response(304)
+            self.end_headers()
+            return
+        body = b"<feed>v1</feed>"
+        self.send_response(200)
+        self.send_header("ETag", '"v1"')
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    _Handler.hits = []
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_revalidates_with_etag_then_replays_offline(server, tmp_path):
+    session = build_session(mode="on", cache_dir=tmp_path)
+    first = session.get(f"{server}/feed")
+    second = session.get(f"{server}/feed")
+
+    assert first.text == second.text == "<feed>v1</feed>"
+    assert _Handler.hits == [("/feed", None), ("/feed", '"v1"')]
+    assert second.headers["X-DTFFTL-Cache"] == "hit"
+
+    replay = build_session(mode="replay", cache_dir=tmp_path)
+    assert replay.get(f"{server}/feed").text == "<feed>v1</feed>"
+    assert len(_Handler.hits) == 2
+    with pytest.raises(HTTPReplayMiss):
+        replay.get(f"{server}/other")
+
+
+def test_cache_hits_can_be_streamed(server, tmp_path):
+    session = build_session(mode="on", cache_dir=tmp_path)
+    session.get(f"{server}/feed")
+
+    hit = session.get(f"{server}/feed", stream=True)
+    assert hit.headers["X-DTFFTL-Cache"] == "hit"
+    assert b"".join(hit.iter_content(chunk_size=4)) == b"<feed>v1</feed>"
+
+    replay = build_session(mode="replay", cache_dir=tmp_path).get(f"{server}/feed", stream=True)
+    assert replay.raw.read() == b"<feed>v1</feed>"
+    with pytest.raises(HTTPReplayMiss):
+        session.get(f"{server}/streamed", stream=True).close()
+        build_session(mode="replay", cache_dir=tmp_path).get(f"{server}/streamed")
+
+
+def test_records_authenticated_gets_and_replays_them_without_credentials(server, tmp_path):
+    session = build_session(mode="record", cache_dir=tmp_path)
+    token = session.post(f"{server}/api/v1/access_token", data={"grant_type": "client_credentials"})
+    listing = session.get(f"{server}/r/LocalLLaMA/top", headers={"Authorization": "bearer secret-bearer"})
+
+    assert token.json()["access_token"] == "secret-bearer"
+    stored = [path.read_bytes() for path in tmp_path.rglob("*") if path.is_file()]
+    assert stored and not [data for data in stored if b"secret-bearer" in data]
+
+    replay = build_session(mode="replay", cache_dir=tmp_path)
+    assert replay.post(f"{server}/api/v1/access_token").json()["access_token"] == "replay"
+    replayed = replay.get(f"{server}/r/LocalLLaMA/top", headers={"Authorization": "bearer replay"})
+    assert replayed.json() == listing.json()
+    assert [path for path, _ in _Handler.hits] == ["/api/v1/access_token", "/r/LocalLLaMA/top"]
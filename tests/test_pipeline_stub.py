@@ -15,3 +15,48 @@ def test_pipeline_stub_creates_episode(tmp_path, monkeypatch):
     assert (episode_dir / "manifest.json").exists()
     assert any(episode_dir.glob("*intro.txt"))
     assert any(episode_dir.glob("*outro.txt"))
+
+
+def test_collect_stories_skips_source_past_timeout(monkeypatch):
+    import threading
+
+    release = threading.Event()
+    workers = []
+
+    def slow_trending(limit, use_stub):
+        workers.append(threading.current_thread())
+        release.wait(5)
+        return []
+
+    monkeypatch.setattr(pipeline, "fetch_trending", slow_trending)
+    try:
+        stories = pipeline.collect_stories(1, 1, 1, use_stub=True, timeouts={"alphaxiv": 0.1})
+    finally:
+        release.set()
+
+    sources = [story.source_meta.source for story in stories]
+    assert "alphaxiv" not in sources
+    assert sources[0] == "reddit" and sources[-1] == "luminary"
+    # A hung fetch must not keep the interpreter from exiting.
+    assert workers and workers[0].daemon
+
+
+def test_pipeline_rerun_reuses_stage_artifacts(tmp_path, monkeypatch):
+    monkeypatch.setattr(pipeline, "EPISODES_DIR", tmp_path)
+    episode_date = dt.date(2026, 2, 4)
+    episode_dir = pipeline.run_pipeline(episode_date=episode_date, use_stub=True, store=False)
+    names = pipeline.stage_names()
+    assert sorted(path.stem for path in (episode_dir / "stages").glob("*.json")) == sorted(
+        names[: names.index(pipeline.DEFAULT_LAST_STAGE) + 1]
+    )
+
+    def fail_collect(*args, **kwargs):
+        raise AssertionError("collect should have been skipped")
+
+    monkeypatch.setattr(pipeline, "collect_stories", fail_collect)
+    (episode_dir / "episode.txt").unlink()
+    pipeline.run_pipeline(episode_date=episode_date, use_stub=True, store=False)
+    assert (episode_dir / "episode.txt").exists()
+
+    graph = pipeline.build_stage_graph(episode_date, episode_dir, use_stub=True, store=False)
+    assert graph.names == names
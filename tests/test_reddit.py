@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from types import SimpleNamespace
+
+from src.reddit import _summarize_comments
+
+THREAD_FIXTURE = Path(__file__).parent / "fixtures" / "reddit_thread.json"
+
+
+class FakeSubmission:
+    def __init__(self, comments):
+        self._comments = comments
+        self.comment_sort = "confidence"
+        self.comment_limit = None
+        self.fetched_with = None
+
+    @property
+    def comments(self):
+        self.fetched_with = (self.comment_sort, self.comment_limit)
+        return iter(self._comments)
+
+
+def test_summarize_comments_requests_small_top_page_and_picks_best():
+    comments = [
+        SimpleNamespace(body="meh", score=2),
+        SimpleNamespace(children=["more"]),
+        SimpleNamespace(body="[deleted]", score=99),
+        SimpleNamespace(body="great   point", score=50),
+        SimpleNamespace(body="solid", score=10),
+        SimpleNamespace(body="fine", score=5),
+    ]
+    submission = FakeSubmission(comments)
+
+    summary = _summarize_comments(submission, max_comments=2)
+
+    assert submission.fetched_with == ("top", 8)
+    assert summary == "Top comments: 1) great point (score 50) 2) solid (score 10)"
+
+
+def test_rate_limited_retries_transient_errors_only(monkeypatch):
+    import pytest
+
+    prawcore_errors = pytest.importorskip("prawcore.exceptions")
+    from src import reddit
+
+    monkeypatch.setattr(reddit.time, "sleep", lambda seconds: None)
+    calls = []
+
+    def flaky():
+        calls.append(1)
+        if len(calls) < 3:
+            raise prawcore_errors.ServerError(SimpleNamespace(status_code=503))
+        return "ok"
+
+    def forbidden():
+        raise prawcore_errors.Forbidden(SimpleNamespace(status_code=403))
+
+    def broken():
+        raise KeyError("title")
+
+    assert reddit._rate_limited(flaky) == "ok" and len(calls) == 3
+    assert reddit._rate_limited(forbidden, default="") == ""
+    with pytest.raises(KeyError):
+        reddit._rate_limited(broken)
+
+
+def test_summary_through_praw_is_one_bounded_request():
+    import pytest
+
+    praw = pytest.importorskip("praw")
+    import requests
+    from requests.adapters import BaseAdapter
+
+    thread = json.loads(THREAD_FIXTURE.read_text(encoding="utf-8"))
+    sent = []
+
+    class Replay(BaseAdapter):
+        def send(self, request, **kwargs):
+            sent.append((request.method, request.url))
+            token = request.url.endswith("/api/v1/access_token")
+            payload = {"access_token": "t", "token_type": "bearer", "expires_in": 3600, "scope": "*"} if token else thread
+            response = requests.Response()
+            response.status_code = 200
+            response._content = json.dumps(payload).encode("utf-8")
+            response.url = request.url
+            return response
+
+        def close(self):
+            pass
+
+    session = requests.Session()
+    session.mount("https://", Replay())
+    reddit = praw.Reddit(client_id="x", client_secret="y", user_agent="dtfftl-test", requestor_kwargs={"session": session})
+
+    summary = _summarize_comments(reddit.submission(id="abc123"), max_comments=2)
+
+    comment_requests = [url for method, url in sent if "/api/v1/access_token" not in url]
+    assert len(comment_requests) == 1
+    assert "/comments/abc123/" in comment_requests[0]
+    assert "sort=top" in comment_requests[0] and "limit=8" in comment_requests[0]
+    assert summary.startswith("Top comments: 1) The int4 quant holds up")
+    assert "[deleted]" not in summary
+
+
+def test_share_rate_limit_plans_for_a_fraction_of_the_window():
+    import pytest
+
+    praw = pytest.importorskip("praw")
+    from src import reddit
+
+    # 100 requests per window: this client has used 40, so a quarter share (25) is spent.
+    headers = {"x-ratelimit-remaining": "60", "x-ratelimit-used": "40", "x-ratelimit-reset": "300"}
+    whole = praw.Reddit(client_id="x", client_secret="y", user_agent="dtfftl-test")
+    shared = praw.Reddit(client_id="x", client_secret="y", user_agent="dtfftl-test")
+    reddit._share_rate_limit(shared, 4)
+
+    whole._core.rate_limiter.update(response_headers=headers)
+    shared._core.rate_limiter.update(response_headers=headers)
+
+    wait = shared._core.rate_limiter.next_request_timestamp_ns - whole._core.rate_limiter.next_request_timestamp_ns
+    assert whole._core.rate_limiter.remaining == 60
+    assert shared._core.rate_limiter.remaining == 0
+    assert wait > 200 * 10**9  # waits for the window to reset instead of pacing through it
@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+import pytest
+
+from src.stages import Stage, StageError, StageGraph
+
+
+def _graph(tmp_path, calls, params=None):
+    def make(name):
+        def run(inputs):
+            calls.append(name)
+            return {"name": name, "inputs": sorted(inputs)}
+        return run
+
+    return StageGraph(tmp_path, [
+        Stage("a", make("a"), params=params or {}),
+        Stage("b", make("b"), deps=("a",)),
+        Stage("c", make("c"), deps=("b",)),
+    ])
+
+
+def test_rerun_skips_unchanged_and_reruns_downstream_of_changed(tmp_path):
+    calls: list[str] = []
+    _graph(tmp_path, calls).run()
+    assert calls == ["a", "b", "c"]
+
+    calls.clear()
+    _graph(tmp_path, calls).run()
+    assert calls == []
+
+    calls.clear()
+    outputs = _graph(tmp_path, calls, params={"limit": 3}).run()
+    # b's input hash follows a's output hash, which did not change.
+    assert calls == ["a"]
+    assert outputs["c"] == {"name": "c", "inputs": ["b"]}
+
+
+def test_from_only_and_to_stage(tmp_path):
+    calls: list[str] = []
+    with pytest.raises(StageError):
+        _graph(tmp_path, calls).run(only_stage="b")
+
+    _graph(tmp_path, calls).run(to_stage="b")
+    assert calls == ["a", "b"]
+
+    calls.clear()
+    _graph(tmp_path, calls).run(only_stage="b")
+    assert calls == ["b"]
+
+    calls.clear()
+    _graph(tmp_path, calls).run(from_stage="b")
+    assert calls == ["b", "c"]
@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+import pytest
+
+lancedb = pytest.importorskip("lancedb")
+
+from src import storage
+from src.models import SourceMeta, Story
+
+
+def _story(story_id: str, url: str, arxiv_id: str | None = None) -> Story:
+    extra = {"arxiv_id": arxiv_id} if arxiv_id else {}
+    return Story(
+        id=story_id,
+        title=f"Title {story_id}",
+        summary="Summary",
+        source_url=url,
+        source_meta=SourceMeta(source="reddit", url=url, extra=extra),
+        raw_text="Body",
+    )
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    connection = lancedb.connect(str(tmp_path / "vectors"))
+    monkeypatch.setattr(storage, "_try_get_db", lambda: connection)
+    monkeypatch.setattr(
+        storage,
+        "embed_batch",
+        lambda texts, show_progress=False: [[0.0] * storage.EMBEDDING_DIM for _ in texts],
+    )
+    monkeypatch.setattr(storage, "embed_text", lambda text: [1.0] * storage.EMBEDDING_DIM)
+    return connection
+
+
+def test_store_stories_batch_dedups_against_table_and_batch(db):
+    storage.store_stories_batch(
+        [_story("a", "https://x/a"), _story("b", "https://x/b", arxiv_id="2401.00001")],
+        "2026-02-03",
+        mark_used=False,
+    )
+    storage.store_stories_batch(
+        [
+            _story("a2", "https://x/a"),
+            _story("b2", "https://x/b2", arxiv_id="2401.00001"),
+            _story("c", "https://x/c"),
+            _story("c2", "https://x/c"),
+        ],
+        "2026-02-04",
+    )
+
+    rows = {row["id"]: row for row in db.open_table("stories").to_arrow().to_pylist()}
+    assert sorted(rows) == ["a", "b", "c"]
+    assert rows["a"]["used_episode_date"] == "2026-02-04"
+    assert rows["b"]["used_in_episode"] is True
+    assert rows["c"]["used_episode_date"] == "2026-02-04"
+
+
+def test_compact_tables_only_past_threshold(db):
+    for idx in range(3):
+        storage.store_stories_batch([_story(f"s{idx}", f"https://x/{idx}")], "2026-02-04")
+
+    assert storage.compact_tables(fragment_threshold=100) == {"stories": False}
+    assert storage.compact_tables(fragment_threshold=2) == {"stories": True}
+    assert storage._fragment_count(db.open_table("stories")) == 1
+    assert db.open_table("stories").count_rows() == 3
+
+
+def test_ensure_vector_index_lifecycle(db):
+    np = pytest.importorskip("numpy")
+    rng = np.random.default_rng(0)
+
+    def rows(start: int, count: int) -> list[dict]:
+        vectors = rng.standard_normal((count, storage.EMBEDDING_DIM)).astype("float32")
+        return [{"id": str(start + idx), "vector": vector} for idx, vector in enumerate(vectors.tolist())]
+
+    table = db.create_table("vectors", data=rows(0, 200))
+    assert storage.ensure_vector_index(table, min_rows=300) == "skipped"
+
+    table.add(rows(200, 200))
+    assert storage.ensure_vector_index(table, min_rows=300) == "created"
+    assert storage.ensure_vector_index(table, min_rows=300) == "current"
+
+    table.add(rows(400, 50))
+    assert storage.ensure_vector_index(table, min_rows=300) == "updated"
+
+    table.add(rows(450, 300))
+    assert storage.ensure_vector_index(table, min_rows=300) == "rebuilt"
+
+
+def test_load_recent_vectors_covers_window_of_used_stories_and_episodes(db):
+    storage.store_stories_batch([_story("a", "https://x/a")], "2026-02-01")
+    storage.store_stories_batch([_story("b", "https://x/b")], "2026-02-03")
+    storage.store_stories_batch([_story("c", "https://x/c")], "2026-02-03", mark_used=False)
+    storage.store_stories_batch([_story("d", "https://x/d")], "2026-02-04")
+    storage.store_episode("2026-02-03", "episode", {}, use_lancedb=True)
+
+    history = storage.load_recent_vectors("2026-02-02", "2026-02-04")
+
+    assert history.shape == (2, storage.EMBEDDING_DIM)
+
+
+def test_store_selected_stories_keeps_dropped_stories_out_of_history(db):
+    from src.pipeline import store_selected_stories
+
+    kept = _story("kept", "https://x/kept")
+    dropped = _story("dropped", "https://x/dropped")
+    store_selected_stories([kept, dropped], [kept], "2026-02-03")
+
+    rows = {row["id"]: row for row in db.open_table("stories").to_arrow().to_pylist()}
+    assert rows["kept"]["used_in_episode"] is True
+    assert not rows["dropped"]["used_in_episode"]
+    assert storage.load_recent_vectors("2026-02-01", "2026-02-05").shape == (1, storage.EMBEDDING_DIM)
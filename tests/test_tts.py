@@ -0,0 +1,138 @@
+from __future__ import annotations
+
+from src import tts
+from src.tts_cache import TTSCache
+
+WAV = b"RIFF\0\0\0\0WAVE" + b"\0" * 2000
+
+
+class _Response:
+    status_code = 200
+    text = ""
+
+    def __init__(self, chunks, headers=None):
+        self.chunks = chunks
+        self.headers = headers or {}
+
+    def iter_content(self, chunk_size):
+        for chunk in self.chunks:
+            if isinstance(chunk, Exception):
+                raise chunk
+            yield chunk
+
+    def close(self):
+        pass
+
+
+def test_render_cache_skips_unchanged_lines(tmp_path, monkeypatch):
+    calls = []
+
+    def fake_post(url, headers, json, timeout, stream):
+        calls.append(json)
+        return _Response([WAV[:100], WAV[100:]])
+
+    monkeypatch.setattr(tts, "_cache", TTSCache(tmp_path / "cache"))
+    monkeypatch.setattr(tts.requests, "post", fake_post)
+
+    assert tts.text_to_speech("Welcome back.", tmp_path / "ep1" / "intro.wav", voice="forbin") == (True, "")
+    assert tts.text_to_speech("Welcome back.", tmp_path / "ep2" / "intro.wav", voice="forbin") == (True, "")
+    assert len(calls) == 1
+    assert (tmp_path / "ep2" / "intro.wav").read_bytes() == WAV
+
+    tts.text_to_speech("Welcome back.", tmp_path / "ep2" / "intro.wav", voice="stephen_fry")
+    monkeypatch.setenv("DTFFTL_TTS_MODEL_VERSION", "quato-2")
+    tts.text_to_speech("Welcome back.", tmp_path / "ep3" / "intro.wav", voice="forbin")
+    assert len(calls) == 3
+
+
+def test_aborted_download_leaves_no_wav(tmp_path, monkeypatch):
+    import requests
+
+    responses = [
+        _Response([WAV[:500], requests.exceptions.ChunkedEncodingError("connection reset")]),
+        _Response([WAV[:1500]], headers={"Content-Length": str(len(WAV))}),
+        _Response([b"<html>oops</html>" + b"\0" * 2000]),
+    ]
+    monkeypatch.setattr(tts, "_cache", TTSCache(tmp_path / "cache"))
+    monkeypatch.setattr(tts.requests, "post", lambda *args, **kwargs: responses.pop(0))
+
+    errors = [tts.text_to_speech("Hello.", tmp_path / "out" / "line.wav", voice="forbin")[1] for _ in range(3)]
+
+    assert errors[0].startswith("download failed") and errors[1].startswith("truncated")
+    assert errors[2] == "invalid WAV header"
+    assert [path for path in tmp_path.rglob("*") if path.is_file()] == []
+
+
+def _wav_for(text: str) -> bytes:
+    import io
+    import wave
+
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as out:
+        out.setnchannels(1)
+        out.setsampwidth(2)
+        out.setframerate(8000)
+        out.writeframes(text.encode("utf-8").ljust(1200, b"\0"))
+    return buffer.getvalue()
+
+
+def test_line_level_tts_routes_voices_and_keeps_script_order(tmp_path, monkeypatch):
+    import json
+    import threading
+    import time
+    import wave
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    requests_seen: list[tuple[str, str]] = []
+    failed_once: set[str] = set()
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            with lock:
+                requests_seen.append((payload["voice"], payload["text"]))
+                flaky = "flaky" in payload["text"] and payload["text"] not in failed_once
+                failed_once.add(payload["text"])
+            time.sleep(0.02)
+            body = b"busy" if flaky else _wav_for(payload["text"])
+            self.send_response(503 if flaky else 200)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    monkeypatch.setattr(tts, "TTS_URL", f"http://127.0.0.1:{httpd.server_address[1]}/speak")
+    monkeypatch.setattr(tts, "_cache", TTSCache(tmp_path / "cache"))
+
+    script = "STEPHEN: Good evening.\nPHILIP: A flaky question,\nwith a second line.\nSTEPHEN: Indeed."
+    try:
+        wavs, failures = tts.text_to_speech_parallel(
+            [("01_-_script_01", script), ("00_-_intro", "Welcome.")],
+            tmp_path / "audio",
+            voice="forbin",
+            backoff=0.01,
+        )
+    finally:
+        httpd.shutdown()
+        httpd.server_close()
+
+    assert failures == {}
+    assert [path.name for path in wavs] == ["01_-_script_01.wav", "00_-_intro.wav"]
+    voices = {text: voice for voice, text in requests_seen}
+    assert voices[tts.prepare_text_for_tts("Good evening.")] == "stephen_fry"
+    assert voices[tts.prepare_text_for_tts("A flaky question,\nwith a second line.")] == "philip_fry"
+    assert voices[tts.prepare_text_for_tts("Welcome.")] == "forbin"
+    assert len(requests_seen) == 5  # four lines plus one retry
+
+    with wave.open(str(wavs[0]), "rb") as stitched:
+        frames = stitched.readframes(stitched.getnframes())
+    lines = ["Good evening.", "A flaky question,\nwith a second line.", "Indeed."]
+    expected = b"".join(
+        tts.prepare_text_for_tts(line).encode("utf-8").ljust(1200, b"\0") for line in lines
+    )
+    assert frames == expected
@@ -0,0 +1,29 @@
+from __future__ import annotations
+
+from src.tts_scheduler import AIMDLimiter, parse_script_lines
+
+
+def test_parse_script_lines_routes_prefixes_and_continuations():
+    script = "Cold open.\nSTEPHEN: Hello.\n\nphilip: Hi!\nStill Philip.\nNote: not a speaker."
+    assert parse_script_lines(script, ["STEPHEN", "PHILIP"]) == [
+        (None, "Cold open."),
+        ("STEPHEN", "Hello."),
+        ("PHILIP", "Hi!\nStill Philip.\nNote: not a speaker."),
+    ]
+
+
+def test_aimd_limiter_grows_on_fast_responses_and_halves_on_trouble():
+    limiter = AIMDLimiter(initial=4, minimum=1, maximum=8)
+    for _ in range(20):
+        limiter.acquire()
+        limiter.release(True, latency=1.0, chars=100)
+    assert int(limiter.limit) > 4
+
+    grown = limiter.limit
+    limiter.acquire()
+    limiter.release(False)
+    assert limiter.limit == grown / 2
+
+    limiter.acquire()
+    limiter.release(True, latency=10.0, chars=100)  # 10x slower per character
+    assert limiter.limit == max(1.0, grown / 4)
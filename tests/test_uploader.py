@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+import os
+
+import pytest
+
+boto3 = pytest.importorskip("boto3")
+moto = pytest.importorskip("moto")
+
+from src.uploader import UploadJob, Uploader, episode_upload_jobs, upload_feed  # noqa: E402
+
+PART = 5 * 1024 * 1024
+BUCKET = "dtfftl"
+
+
+@pytest.fixture
+def client(monkeypatch):
+    for name in ("AWS_ACCESS_KEY_ID", "AWS_SECRET_ACCESS_KEY"):
+        monkeypatch.setenv(name, "testing")
+    with moto.mock_aws():
+        s3 = boto3.client("s3", region_name="us-east-1")
+        s3.create_bucket(Bucket=BUCKET)
+        yield s3
+
+
+class _Flaky:
+    """Client proxy whose upload_part fails for chosen part numbers, once each."""
+
+    def __init__(self, client, fail_parts=()):
+        self._client = client
+        self.fail_parts = set(fail_parts)
+        self.sent_parts: list[int] = []
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+    def upload_part(self, **kwargs):
+        if kwargs["PartNumber"] in self.fail_parts:
+            self.fail_parts.discard(kwargs["PartNumber"])
+            raise ConnectionError("connection reset")
+        self.sent_parts.append(kwargs["PartNumber"])
+        return self._client.upload_part(**kwargs)
+
+
+class _Recorder:
+    """Client proxy that records the order objects are written in."""
+
+    def __init__(self, client):
+        self._client = client
+        self.put_keys: list[str] = []
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+    def put_object(self, **kwargs):
+        self.put_keys.append(kwargs["Key"])
+        return self._client.put_object(**kwargs)
+
+
+def test_small_files_are_skipped_when_the_remote_hash_matches(client, tmp_path):
+    path = tmp_path / "chapters.json"
+    path.write_text('{"chapters": []}')
+    uploader = Uploader(client, BUCKET, state_dir=tmp_path / "state")
+    job = UploadJob(path, "episodes/2026-01-01/chapters.json", "application/json")
+
+    assert uploader.upload(job).status == "uploaded"
+    assert uploader.upload(job).status == "skipped"
+    path.write_text('{"chapters": [1]}')
+    assert uploader.upload(job).status == "uploaded"
+    body = client.get_object(Bucket=BUCKET, Key=job.key)
+    assert body["Body"].read() == b'{"chapters": [1]}'
+    assert body["ContentType"] == "application/json"
+
+
+def test_interrupted_multipart_upload_resumes_from_recorded_parts(client, tmp_path):
+    path = tmp_path / "episode.mp3"
+    data = os.urandom(3 * PART + 1234)
+    path.write_bytes(data)
+    job = UploadJob(path, "episodes/2026-01-01/episode.mp3", "audio/mpeg")
+
+    flaky = _Flaky(client, fail_parts={3})
+    with pytest.raises(ConnectionError):
+        Uploader(flaky, BUCKET, state_dir=tmp_path / "state", part_size=PART, part_workers=1).upload(job)
+    assert list((tmp_path / "state").glob("*.json"))
+
+    retry = _Flaky(client)
+    result = Uploader(retry, BUCKET, state_dir=tmp_path / "state", part_size=PART, part_workers=4).upload(job)
+
+    assert result.status == "resumed"
+    assert sorted(retry.sent_parts) == [part for part in (1, 2, 3, 4) if part not in flaky.sent_parts]
+    assert result.bytes_sent < len(data)
+    assert client.get_object(Bucket=BUCKET, Key=job.key)["Body"].read() == data
+    assert not list((tmp_path / "state").glob("*.json"))
+    assert Uploader(client, BUCKET, state_dir=tmp_path / "state", part_size=PART).upload(job).status == "skipped"
+
+
+def test_episode_then_feed_files_upload_in_order(client, tmp_path):
+    episode_dir = tmp_path / "episode"
+    episode_dir.mkdir()
+    (episode_dir / "episode.mp3").write_bytes(os.urandom(PART + 10))
+    (episode_dir / "chapters.json").write_text("{}")
+    (episode_dir / "episode.txt").write_text("STEPHEN: Hello.")
+    (episode_dir / "00_-_intro.txt").write_text("STEPHEN: Hello.")
+    (episode_dir / "episode.wav").write_bytes(b"not uploaded")
+    feed_dir = tmp_path / "feed"
+    (feed_dir / "archive").mkdir(parents=True)
+    (feed_dir / "feed.xml").write_text("<rss/>")
+    (feed_dir / "archive" / "feed-0001.xml").write_text("<rss/>")
+    (feed_dir / "archive" / "feed-0002.xml").write_text("<rss/>")
+
+    recorder = _Recorder(client)
+    uploader = Uploader(recorder, BUCKET, state_dir=tmp_path / "state", part_size=PART)
+    jobs = episode_upload_jobs(episode_dir, "2026-01-01")
+    results = uploader.upload_all(jobs) + upload_feed(uploader, feed_dir)
+
+    assert sorted(result.key for result in results) == [
+        "archive/feed-0001.xml",
+        "archive/feed-0002.xml",
+        "episodes/2026-01-01/00_-_intro.txt",
+        "episodes/2026-01-01/chapters.json",
+        "episodes/2026-01-01/episode.mp3",
+        "episodes/2026-01-01/episode.txt",
+        "feed.xml",
+    ]
+    assert {result.status for result in results} == {"uploaded"}
+    # The feed goes up last, after every archive page it links to.
+    assert recorder.put_keys[-1] == "feed.xml"
+    head = client.head_object(Bucket=BUCKET, Key="feed.xml")
+    assert head["CacheControl"] == "public, max-age=300"
+    assert {result.status for result in uploader.upload_all(jobs) + upload_feed(uploader, feed_dir)} == {"skipped"}